@@ -0,0 +1,24 @@
+"""Add stars_delta_7d to trend_snapshots (time-anchored 7-day star delta).
+
+Revision ID: 20250210000000
+Revises: 20250209200000
+Create Date: 2025-02-10
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = "20250210000000"
+down_revision: Union[str, None] = "20250209200000"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("trend_snapshots", sa.Column("stars_delta_7d", sa.Integer(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("trend_snapshots", "stars_delta_7d")
@@ -0,0 +1,26 @@
+"""Add readme_sha to repositories and generated_content (README change detection by blob sha).
+
+Revision ID: 20250211000000
+Revises: 20250210000000
+Create Date: 2025-02-11
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = "20250211000000"
+down_revision: Union[str, None] = "20250210000000"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("repositories", sa.Column("readme_sha", sa.String(40), nullable=True))
+    op.add_column("generated_content", sa.Column("readme_sha", sa.String(40), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("generated_content", "readme_sha")
+    op.drop_column("repositories", "readme_sha")
@@ -0,0 +1,53 @@
+"""Add ingestion_runs and ingestion_run_items (checkpointed, resumable ingestion).
+
+Revision ID: 20250212000000
+Revises: 20250211000000
+Create Date: 2025-02-12
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = "20250212000000"
+down_revision: Union[str, None] = "20250211000000"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "ingestion_runs",
+        sa.Column("id", sa.String(64), nullable=False),
+        sa.Column("kind", sa.String(32), nullable=False),
+        sa.Column("status", sa.String(16), nullable=False),
+        sa.Column("params", sa.dialects.postgresql.JSONB(astext_type=sa.Text()), nullable=True),
+        sa.Column("planned_count", sa.Integer(), nullable=False),
+        sa.Column("done_count", sa.Integer(), nullable=False),
+        sa.Column("attempts", sa.Integer(), nullable=False),
+        sa.Column("error", sa.String(1024), nullable=True),
+        sa.Column("started_at", sa.DateTime(timezone=True), server_default=sa.text("now()"), nullable=False),
+        sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.text("now()"), nullable=False),
+        sa.Column("finished_at", sa.DateTime(timezone=True), nullable=True),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_table(
+        "ingestion_run_items",
+        sa.Column("id", sa.BigInteger(), autoincrement=True, nullable=False),
+        sa.Column("run_id", sa.String(64), nullable=False),
+        sa.Column("full_name", sa.String(255), nullable=False),
+        sa.Column("payload", sa.dialects.postgresql.JSONB(astext_type=sa.Text()), nullable=True),
+        sa.Column("status", sa.String(16), nullable=False),
+        sa.Column("completed_at", sa.DateTime(timezone=True), nullable=True),
+        sa.ForeignKeyConstraint(["run_id"], ["ingestion_runs.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("run_id", "full_name", name="uq_ingestion_run_items_run_repo"),
+    )
+    op.create_index("ix_ingestion_run_items_run_status", "ingestion_run_items", ["run_id", "status"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_ingestion_run_items_run_status", table_name="ingestion_run_items")
+    op.drop_table("ingestion_run_items")
+    op.drop_table("ingestion_runs")
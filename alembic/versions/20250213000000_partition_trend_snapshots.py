@@ -0,0 +1,109 @@
+"""Range-partition trend_snapshots by day on snapshot_at.
+
+Rebuilds trend_snapshots as a partitioned table (primary key (id, snapshot_at)), creates a
+daily partition for every day with existing snapshots plus a week ahead, copies the rows
+over and drops the old heap. Ids keep coming from the original sequence. Later partitions
+are created by the ingestion service.
+
+Revision ID: 20250213000000
+Revises: 20250212000000
+Create Date: 2025-02-13
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = "20250213000000"
+down_revision: Union[str, None] = "20250212000000"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+COLUMNS = (
+    "id, repository_id, stars_count, forks_count, open_issues_count, watchers_count, "
+    "stars_delta_1h, stars_delta_24h, forks_delta_24h, stars_delta_7d, commits_7d, "
+    "issue_events_7d, computed_trend_score, snapshot_at"
+)
+DAYS_AHEAD = 7
+
+
+def _snapshot_columns() -> list[sa.Column]:
+    return [
+        # Keep drawing ids from the original bigserial sequence
+        sa.Column("id", sa.BigInteger(), server_default=sa.text("nextval('trend_snapshots_id_seq'::regclass)"), nullable=False),
+        sa.Column("repository_id", sa.BigInteger(), nullable=False),
+        sa.Column("stars_count", sa.Integer(), nullable=False),
+        sa.Column("forks_count", sa.Integer(), nullable=False),
+        sa.Column("open_issues_count", sa.Integer(), nullable=False),
+        sa.Column("watchers_count", sa.Integer(), nullable=False),
+        sa.Column("stars_delta_1h", sa.Integer(), nullable=True),
+        sa.Column("stars_delta_24h", sa.Integer(), nullable=True),
+        sa.Column("forks_delta_24h", sa.Integer(), nullable=True),
+        sa.Column("stars_delta_7d", sa.Integer(), nullable=True),
+        sa.Column("commits_7d", sa.Integer(), nullable=True),
+        sa.Column("issue_events_7d", sa.Integer(), nullable=True),
+        sa.Column("computed_trend_score", sa.Float(), nullable=True),
+        sa.Column("snapshot_at", sa.DateTime(timezone=True), server_default=sa.text("now()"), nullable=False),
+        sa.ForeignKeyConstraint(["repository_id"], ["repositories.id"], ondelete="CASCADE"),
+    ]
+
+
+def upgrade() -> None:
+    op.drop_index("ix_trend_snapshots_snapshot_at", table_name="trend_snapshots")
+    op.drop_index("ix_trend_snapshots_repo_snapshot", table_name="trend_snapshots")
+    op.rename_table("trend_snapshots", "trend_snapshots_unpartitioned")
+    op.execute("ALTER TABLE trend_snapshots_unpartitioned RENAME CONSTRAINT trend_snapshots_pkey TO trend_snapshots_unpartitioned_pkey")
+
+    op.create_table(
+        "trend_snapshots",
+        *_snapshot_columns(),
+        sa.PrimaryKeyConstraint("id", "snapshot_at"),
+        postgresql_partition_by="RANGE (snapshot_at)",
+    )
+    op.create_index("ix_trend_snapshots_repo_snapshot", "trend_snapshots", ["repository_id", "snapshot_at"])
+    op.create_index("ix_trend_snapshots_snapshot_at", "trend_snapshots", ["snapshot_at"])
+
+    # One partition per UTC day from the oldest snapshot through DAYS_AHEAD days from now
+    op.execute(
+        f"""
+        DO $$
+        DECLARE
+            d date;
+            last_day date := (now() AT TIME ZONE 'UTC')::date + {DAYS_AHEAD};
+        BEGIN
+            SELECT COALESCE(min((snapshot_at AT TIME ZONE 'UTC')::date), (now() AT TIME ZONE 'UTC')::date)
+              INTO d FROM trend_snapshots_unpartitioned;
+            WHILE d <= last_day LOOP
+                EXECUTE format(
+                    'CREATE TABLE trend_snapshots_p%s PARTITION OF trend_snapshots FOR VALUES FROM (%L) TO (%L)',
+                    to_char(d, 'YYYYMMDD'),
+                    d::timestamp AT TIME ZONE 'UTC',
+                    (d + 1)::timestamp AT TIME ZONE 'UTC'
+                );
+                d := d + 1;
+            END LOOP;
+        END $$;
+        """
+    )
+    op.execute(f"INSERT INTO trend_snapshots ({COLUMNS}) SELECT {COLUMNS} FROM trend_snapshots_unpartitioned")
+    op.execute("ALTER SEQUENCE trend_snapshots_id_seq OWNED BY trend_snapshots.id")
+    op.drop_table("trend_snapshots_unpartitioned")
+
+
+def downgrade() -> None:
+    op.rename_table("trend_snapshots", "trend_snapshots_partitioned")
+    op.execute("ALTER INDEX ix_trend_snapshots_repo_snapshot RENAME TO ix_trend_snapshots_partitioned_repo_snapshot")
+    op.execute("ALTER INDEX ix_trend_snapshots_snapshot_at RENAME TO ix_trend_snapshots_partitioned_snapshot_at")
+    op.execute("ALTER TABLE trend_snapshots_partitioned RENAME CONSTRAINT trend_snapshots_pkey TO trend_snapshots_partitioned_pkey")
+    op.create_table(
+        "trend_snapshots",
+        *_snapshot_columns(),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_trend_snapshots_repo_snapshot", "trend_snapshots", ["repository_id", "snapshot_at"])
+    op.create_index("ix_trend_snapshots_snapshot_at", "trend_snapshots", ["snapshot_at"])
+    op.execute(f"INSERT INTO trend_snapshots ({COLUMNS}) SELECT {COLUMNS} FROM trend_snapshots_partitioned")
+    op.execute("ALTER SEQUENCE trend_snapshots_id_seq OWNED BY trend_snapshots.id")
+    # Drops every daily partition with the parent
+    op.drop_table("trend_snapshots_partitioned")
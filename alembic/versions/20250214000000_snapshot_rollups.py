@@ -0,0 +1,56 @@
+"""Add trend_snapshots_daily and trend_snapshots_weekly rollup tiers.
+
+Both tables are filled by the rollup job (trend_ingestion/rollups.py); its first run rolls
+up every raw snapshot still retained.
+
+Revision ID: 20250214000000
+Revises: 20250213000000
+Create Date: 2025-02-14
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = "20250214000000"
+down_revision: Union[str, None] = "20250213000000"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TIERS = ("trend_snapshots_daily", "trend_snapshots_weekly")
+
+
+def upgrade() -> None:
+    for table in TIERS:
+        op.create_table(
+            table,
+            sa.Column("repository_id", sa.BigInteger(), nullable=False),
+            sa.Column("bucket_start", sa.Date(), nullable=False),
+            sa.Column("snapshot_count", sa.Integer(), nullable=False),
+            sa.Column("first_snapshot_at", sa.DateTime(timezone=True), nullable=False),
+            sa.Column("last_snapshot_at", sa.DateTime(timezone=True), nullable=False),
+            sa.Column("stars_first", sa.Integer(), nullable=False),
+            sa.Column("stars_last", sa.Integer(), nullable=False),
+            sa.Column("stars_min", sa.Integer(), nullable=False),
+            sa.Column("stars_max", sa.Integer(), nullable=False),
+            sa.Column("forks_first", sa.Integer(), nullable=False),
+            sa.Column("forks_last", sa.Integer(), nullable=False),
+            sa.Column("forks_min", sa.Integer(), nullable=False),
+            sa.Column("forks_max", sa.Integer(), nullable=False),
+            sa.Column("open_issues_last", sa.Integer(), nullable=False),
+            sa.Column("watchers_last", sa.Integer(), nullable=False),
+            sa.Column("stars_delta_24h_last", sa.Integer(), nullable=True),
+            sa.Column("stars_delta_7d_last", sa.Integer(), nullable=True),
+            sa.Column("commits_7d_last", sa.Integer(), nullable=True),
+            sa.Column("computed_trend_score_last", sa.Float(), nullable=True),
+            sa.ForeignKeyConstraint(["repository_id"], ["repositories.id"], ondelete="CASCADE"),
+            sa.PrimaryKeyConstraint("repository_id", "bucket_start"),
+        )
+        op.create_index(f"ix_{table}_bucket_start", table, ["bucket_start"], unique=False)
+
+
+def downgrade() -> None:
+    for table in reversed(TIERS):
+        op.drop_index(f"ix_{table}_bucket_start", table_name=table)
+        op.drop_table(table)
@@ -0,0 +1,39 @@
+"""Add scoring_feature_sketches and a partial index on unscored snapshots (incremental scoring).
+
+Revision ID: 20250215000000
+Revises: 20250214000000
+Create Date: 2025-02-15
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = "20250215000000"
+down_revision: Union[str, None] = "20250214000000"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "scoring_feature_sketches",
+        sa.Column("feature", sa.String(32), nullable=False),
+        sa.Column("quantiles", sa.dialects.postgresql.JSONB(astext_type=sa.Text()), nullable=False),
+        sa.Column("sample_count", sa.Integer(), nullable=False),
+        sa.Column("refreshed_at", sa.DateTime(timezone=True), server_default=sa.text("now()"), nullable=False),
+        sa.PrimaryKeyConstraint("feature"),
+    )
+    op.create_index(
+        "ix_trend_snapshots_unscored",
+        "trend_snapshots",
+        ["snapshot_at"],
+        unique=False,
+        postgresql_where=sa.text("computed_trend_score IS NULL"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_trend_snapshots_unscored", table_name="trend_snapshots")
+    op.drop_table("scoring_feature_sketches")
@@ -0,0 +1,31 @@
+"""Add repository_categories.category_trend_score (per-category cohort scoring).
+
+Revision ID: 20250216000000
+Revises: 20250215000000
+Create Date: 2025-02-16
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = "20250216000000"
+down_revision: Union[str, None] = "20250215000000"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("repository_categories", sa.Column("category_trend_score", sa.Float(), nullable=True))
+    op.create_index(
+        "ix_repository_categories_category_score",
+        "repository_categories",
+        ["category_id", "category_trend_score"],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_repository_categories_category_score", table_name="repository_categories")
+    op.drop_column("repository_categories", "category_trend_score")
@@ -0,0 +1,29 @@
+"""Add a DEFAULT partition to trend_snapshots.
+
+Without one, a snapshot for a day whose partition hasn't been created yet fails the whole
+insert. Rows that land here are moved into their day's partition the next time partitions are
+ensured (each ingestion pass and cleanup run).
+
+Revision ID: 20250217000000
+Revises: 20250216000000
+Create Date: 2025-02-17
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+revision: str = "20250217000000"
+down_revision: Union[str, None] = "20250216000000"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute("CREATE TABLE trend_snapshots_default PARTITION OF trend_snapshots DEFAULT")
+
+
+def downgrade() -> None:
+    # Rows still in the default partition (days without a partition of their own) are dropped
+    op.execute("ALTER TABLE trend_snapshots DETACH PARTITION trend_snapshots_default")
+    op.drop_table("trend_snapshots_default")
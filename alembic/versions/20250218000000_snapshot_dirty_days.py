@@ -0,0 +1,32 @@
+"""Add trend_snapshot_dirty_days (days to re-roll after in-place snapshot changes).
+
+Writers that change snapshots after they were inserted (commit stats backfill, scoring) mark
+the snapshot's UTC day here; the rollup job re-aggregates those days and their weeks.
+
+Revision ID: 20250218000000
+Revises: 20250217000000
+Create Date: 2025-02-18
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = "20250218000000"
+down_revision: Union[str, None] = "20250217000000"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "trend_snapshot_dirty_days",
+        sa.Column("day", sa.Date(), nullable=False),
+        sa.Column("marked_at", sa.DateTime(timezone=True), server_default=sa.text("now()"), nullable=False),
+        sa.PrimaryKeyConstraint("day"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("trend_snapshot_dirty_days")
@@ -0,0 +1,90 @@
+#!/usr/bin/env -S python3
+"""Benchmark trending-page parsers (lxml vs BeautifulSoup html.parser) on saved HTML fixtures.
+
+Runs offline against the pages committed in scripts/fixtures/trending (one file per
+since/language view); --fetch overwrites them with live pages first:
+
+    python scripts/bench_trending_parser.py --iterations 20
+    python scripts/bench_trending_parser.py --fetch
+"""
+
+import argparse
+import asyncio
+import glob
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.services.trend_ingestion.http_pool import aclose_http_clients
+from src.services.trend_ingestion.scrapers import (
+    LANGUAGE_OPTIONS,
+    SINCE_OPTIONS,
+    fetch_trending_page,
+    parse_trending_page,
+    parse_trending_page_bs4,
+)
+
+DEFAULT_FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "trending")
+
+
+async def fetch_fixtures(out_dir: str) -> int:
+    os.makedirs(out_dir, exist_ok=True)
+    saved = 0
+    for since in SINCE_OPTIONS:
+        for language in LANGUAGE_OPTIONS:
+            html = await fetch_trending_page(since=since, language=language)
+            path = os.path.join(out_dir, f"{since}_{language or 'all'}.html")
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(html)
+            saved += 1
+    await aclose_http_clients()
+    return saved
+
+
+def bench(name: str, parse, pages: list[str], iterations: int) -> None:
+    repos = 0
+    start = time.perf_counter()
+    for _ in range(iterations):
+        for html in pages:
+            repos += len(parse(html))
+    elapsed = time.perf_counter() - start
+    n_pages = len(pages) * iterations
+    print(
+        f"{name:<10} {n_pages / elapsed:8.1f} pages/s  {repos / elapsed:9.1f} repos/s  "
+        f"({elapsed * 1000 / n_pages:.2f} ms/page)"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark trending-page parsers on saved HTML")
+    parser.add_argument("--fixtures", default=DEFAULT_FIXTURES, help="Directory of saved trending *.html pages")
+    parser.add_argument("--fetch", action="store_true", help="Download all trending views into --fixtures first")
+    parser.add_argument("--iterations", type=int, default=10, help="Passes over the fixture set per parser")
+    args = parser.parse_args()
+
+    if args.fetch:
+        n = asyncio.run(fetch_fixtures(args.fixtures))
+        print(f"Saved {n} trending pages to {args.fixtures}")
+
+    paths = sorted(glob.glob(os.path.join(args.fixtures, "*.html")))
+    if not paths:
+        parser.error(f"No *.html fixtures in {args.fixtures}; run with --fetch to download them")
+    pages = []
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            pages.append(f.read())
+
+    # Same input must give the same output, or the comparison is meaningless
+    for path, html in zip(paths, pages):
+        if parse_trending_page(html) != parse_trending_page_bs4(html):
+            print(f"WARNING: parsers disagree on {os.path.basename(path)}")
+
+    print(f"{len(pages)} pages, {args.iterations} iterations")
+    bench("lxml", parse_trending_page, pages, args.iterations)
+    bench("bs4", parse_trending_page_bs4, pages, args.iterations)
+
+
+if __name__ == "__main__":
+    main()
@@ -8,10 +8,24 @@ import sys
 
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from src.database import session_scope
+from src.database import dispose_loop_engine, session_scope
+from src.services.trend_ingestion.http_pool import aclose_http_clients
 from src.services.trend_ingestion.service import TrendIngestionService
 
 
+def _run(coro):
+    """asyncio.run(coro), closing the loop's pooled DB and HTTP connections before the loop goes."""
+
+    async def run_and_close():
+        try:
+            return await coro
+        finally:
+            await aclose_http_clients()
+            await dispose_loop_engine()
+
+    return asyncio.run(run_and_close())
+
+
 async def run_topic_search() -> int:
     async with session_scope() as session:
         svc = TrendIngestionService(session)
@@ -29,7 +43,7 @@ async def run_search() -> int:
     return await run_topic_search()
 
 
-async def run_cleanup(days: int = 30) -> int:
+async def run_cleanup(days: int | None = None) -> int:
     async with session_scope() as session:
         svc = TrendIngestionService(session)
         return await svc.cleanup_old_snapshots(older_than_days=days)
@@ -48,28 +62,28 @@ def main() -> None:
     parser.add_argument("--topic", action="store_true", help="Topic search (AI, agent, MCP, crypto), languages Go/Python/TS/JS")
     parser.add_argument("--search", action="store_true", help="Same as --topic (legacy)")
     parser.add_argument("--trending", action="store_true", help="Scrape github.com/trending (legacy)")
-    parser.add_argument("--cleanup", action="store_true", help="Delete snapshots older than 30 days")
-    parser.add_argument("--cleanup-days", type=int, default=30, help="Cleanup snapshots older than N days")
+    parser.add_argument("--cleanup", action="store_true", help="Roll up snapshots, then drop raw snapshot partitions past SNAPSHOT_RAW_RETENTION_DAYS")
+    parser.add_argument("--cleanup-days", type=int, default=None, help="Drop raw snapshots older than N days (default SNAPSHOT_RAW_RETENTION_DAYS)")
     args = parser.parse_args()
 
     if not (args.reset or args.topic or args.search or args.trending or args.cleanup):
         parser.error("At least one of --reset, --topic, --search, --trending, --cleanup required")
 
     if args.reset:
-        n = asyncio.run(run_reset())
+        n = _run(run_reset())
         print(f"Reset: {n} repositories (and related data) deleted.")
         if not (args.topic or args.search or args.trending):
             print("Run with --topic (or trigger the pipeline) to re-ingest and see updated counts.")
 
     if args.topic or args.search:
-        n = asyncio.run(run_topic_search())
+        n = _run(run_topic_search())
         print(f"Topic search ingestion: {n} repos processed")
     if args.trending:
-        n = asyncio.run(run_trending())
+        n = _run(run_trending())
         print(f"Trending ingestion: {n} repos processed")
     if args.cleanup:
-        n = asyncio.run(run_cleanup(args.cleanup_days))
-        print(f"Cleanup: {n} snapshots deleted")
+        n = _run(run_cleanup(args.cleanup_days))
+        print(f"Cleanup: {n} daily snapshot partitions dropped")
 
 
 if __name__ == "__main__":
@@ -1,15 +1,18 @@
 """Pipeline control: trigger ingestion → scoring → classification → content on demand.
 
-When you run the pipeline (POST /pipeline/run), a Celery chain runs four steps in order:
+When you run the pipeline (POST /pipeline/run), a Celery chain runs five steps in order:
   1. Ingest topic search — GitHub search by topics (AI, agent, MCP, crypto), languages (Go, Python, TypeScript, JavaScript).
   2. Score & filter — compute trend score, set quality_passed on repos that pass filters.
   3. Classify — keyword + embedding + language → assign repository_categories.
-  4. Generate content — LLM generates learning content for top repos per category.
+  4. Score categories — trend score relative to each category's cohort (repository_categories.category_trend_score).
+  5. Generate content — LLM generates learning content for top repos per category.
 
 Use ?reset_first=true to clear all repo data (repos, snapshots, content, etc.) before running, so tracked/added counts reflect the new run.
 See LOCAL_SETUP.md "How the pipeline works" for details.
 """
 
+from typing import Any
+
 from fastapi import APIRouter, Body, HTTPException, Query
 from celery import chain
 from pydantic import BaseModel
@@ -19,7 +22,7 @@ from src.config import Settings
 from src.database import session_scope
 from src.services.trend_ingestion.service import TrendIngestionService
 from src.tasks.ingestion_tasks import ingest_topic_search_repos
-from src.tasks.scoring_tasks import score_and_filter_all_task
+from src.tasks.scoring_tasks import score_and_filter_all_task, score_categories_task
 from src.tasks.classification_tasks import classify_new_repos_task
 from src.tasks.content_tasks import generate_content_for_top_repos_task
 
@@ -29,6 +32,7 @@ PIPELINE_STEP_NAMES = [
     "Ingest topic search",
     "Score & filter",
     "Classify",
+    "Score categories",
     "Generate content",
 ]
 
@@ -37,6 +41,7 @@ class PipelineRunBody(BaseModel):
     """Optional body for POST /pipeline/run. Restrict ingestion to these category slugs (uses each category's search_topic)."""
 
     categories: list[str] | None = None
+    resume_run_id: str | None = None  # ingestion run id (the ingest task id) to resume from its checkpoint
 
 
 class PipelineTriggerResponse(BaseModel):
@@ -123,20 +128,27 @@ async def trigger_pipeline(
     Optionally pass body with categories: list of slugs to scrape only those (uses each category's search_topic)."""
     if reset_first:
         deleted = await _reset_all_repo_data()
-        message = f"Cleared {deleted} repositories. Pipeline started: ingest → score → classify → content."
+        message = f"Cleared {deleted} repositories. Pipeline started: ingest → score → classify → category scores → content."
     else:
-        message = "Pipeline started. Tasks run in order: ingest topic search → score → classify → generate content."
+        message = "Pipeline started. Tasks run in order: ingest topic search → score → classify → score categories → generate content."
     topic_terms: list[str] | None = None
     if body and body.categories:
         topic_terms = _topic_terms_for_categories(body.categories)
         if topic_terms:
             message += f" Ingestion limited to topics: {', '.join(topic_terms)}."
+    ingest_kwargs: dict[str, Any] = {}
+    if topic_terms:
+        ingest_kwargs["topic_terms"] = topic_terms
+    if body and body.resume_run_id:
+        ingest_kwargs["run_id"] = body.resume_run_id
+        message += f" Resuming ingestion run {body.resume_run_id}."
     # Use .si() (immutable) so each task gets no args; otherwise chain passes previous result as first arg
-    first_task = ingest_topic_search_repos.si(topic_terms=topic_terms) if topic_terms else ingest_topic_search_repos.si()
+    first_task = ingest_topic_search_repos.si(**ingest_kwargs)
     workflow = chain(
         first_task,
         score_and_filter_all_task.si(),
         classify_new_repos_task.si(),
+        score_categories_task.si(),
         generate_content_for_top_repos_task.si(),
     )
     result = workflow.apply_async()
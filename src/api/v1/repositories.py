@@ -1,5 +1,7 @@
 """GET /repositories/{id} and GET /repositories/{id}/similar."""
 
+from datetime import date, datetime, timedelta, timezone
+
 from fastapi import APIRouter, Depends, HTTPException, Query
 
 from sqlalchemy import select
@@ -7,39 +9,77 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 
 from src.api.deps import get_db
-from src.models.repository import Repository
+from src.models.repository import Repository, TrendSnapshot
 from src.models.content import GeneratedContent
+from src.models.snapshot_rollup import TrendSnapshotDaily, TrendSnapshotWeekly
 from src.schemas.repository import ContentBlock, RepositoryDetail, SimilarRepo, TrendHistoryPoint
+from src.services.trend_ingestion.rollups import RAW_HISTORY_POINTS, history_tier
 
 router = APIRouter()
 
 
+def _raw_point(s: TrendSnapshot) -> TrendHistoryPoint:
+    return TrendHistoryPoint(
+        snapshot_at=s.snapshot_at,
+        stars_count=s.stars_count,
+        stars_delta_24h=s.stars_delta_24h,
+        computed_trend_score=s.computed_trend_score,
+    )
+
+
+async def _trend_history(session: AsyncSession, repo_id: int, days: int) -> list[TrendHistoryPoint]:
+    """Newest-first history over the last `days` days from the coarsest tier that covers it: raw
+    hourly snapshots for short ranges, else daily or weekly rollups (one point per bucket, at its
+    last snapshot) topped up with one point per day from raw snapshots newer than the newest bucket."""
+    since = datetime.now(timezone.utc) - timedelta(days=days)
+    latest_raw = (
+        select(TrendSnapshot)
+        .where(TrendSnapshot.repository_id == repo_id, TrendSnapshot.snapshot_at >= since)
+        .order_by(TrendSnapshot.snapshot_at.desc())
+    )
+    tier = history_tier(days)
+    if tier == "raw":
+        result = await session.execute(latest_raw.limit(RAW_HISTORY_POINTS))
+        return [_raw_point(s) for s in result.scalars().all()]
+    model = TrendSnapshotDaily if tier == "daily" else TrendSnapshotWeekly
+    result = await session.execute(
+        select(model)
+        .where(model.repository_id == repo_id, model.bucket_start >= since.date())
+        .order_by(model.bucket_start.desc())
+    )
+    history = [
+        TrendHistoryPoint(
+            snapshot_at=b.last_snapshot_at,
+            stars_count=b.stars_last,
+            stars_delta_24h=b.stars_delta_24h_last,
+            computed_trend_score=b.computed_trend_score_last,
+        )
+        for b in result.scalars().all()
+    ]
+    newest = history[0].snapshot_at if history else since
+    result = await session.execute(latest_raw.where(TrendSnapshot.snapshot_at > newest))
+    # Days the rollup hasn't reached yet: the last snapshot of each UTC day
+    unrolled: dict[date, TrendHistoryPoint] = {}
+    for s in result.scalars().all():
+        unrolled.setdefault(s.snapshot_at.astimezone(timezone.utc).date(), _raw_point(s))
+    return [*unrolled.values(), *history]
+
+
 @router.get("/repositories/{repo_id}", response_model=RepositoryDetail)
 async def get_repository(
     repo_id: int,
     session: AsyncSession = Depends(get_db),
+    history_days: int = Query(2, ge=1, le=730, description="Trend history range; ranges over 2 days use daily, over 90 weekly rollups"),
 ) -> RepositoryDetail:
     result = await session.execute(
         select(Repository)
         .where(Repository.id == repo_id)
-        .options(
-            selectinload(Repository.trend_snapshots),
-            selectinload(Repository.generated_content),
-        )
+        .options(selectinload(Repository.generated_content))
     )
     repo = result.scalar_one_or_none()
     if not repo:
         raise HTTPException(status_code=404, detail="Repository not found")
-    snapshots = sorted(repo.trend_snapshots, key=lambda s: s.snapshot_at, reverse=True)[:48]
-    trend_history = [
-        TrendHistoryPoint(
-            snapshot_at=s.snapshot_at,
-            stars_count=s.stars_count,
-            stars_delta_24h=s.stars_delta_24h,
-            computed_trend_score=s.computed_trend_score,
-        )
-        for s in snapshots
-    ]
+    trend_history = await _trend_history(session, repo_id, history_days)
     content: dict[str, ContentBlock] = {}
     for gc in repo.generated_content:
         content[gc.content_type] = ContentBlock(markdown=gc.content_markdown, generated_at=gc.generated_at)
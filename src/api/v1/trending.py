@@ -52,6 +52,12 @@ async def get_trending(
         q = q.where(Repository.primary_language == language)
     if mode == "recent":
         q = q.order_by(Repository.stars_gained_30d.desc().nullslast())
+    elif sort_by == "score" and category:
+        # Rank against the category's own cohort; corpus-wide score breaks ties / fills unscored rows
+        q = q.order_by(
+            RepositoryCategory.category_trend_score.desc().nullslast(),
+            Repository.current_trend_score.desc().nullslast(),
+        )
     elif sort_by == "score":
         q = q.order_by(Repository.current_trend_score.desc().nullslast())
     else:
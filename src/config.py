@@ -32,9 +32,82 @@ class Settings(BaseSettings):
 
     # GitHub
     github_token: str | None = Field(default=None, description="GitHub PAT with public_repo scope")
-    github_request_delay_seconds: float = Field(
-        default=1.0, ge=0, le=60,
-        description="Delay in seconds between processing each repo (avoids rate limits and 503s)",
+    github_tokens_raw: str | None = Field(
+        default=None,
+        alias="GITHUB_TOKENS",
+        description="Extra GitHub PATs (comma-separated); requests are spread across all tokens by remaining budget",
+    )
+    github_max_burst: int = Field(
+        default=20, ge=1, le=500,
+        description="Max requests per token a rate-limit bucket may send back to back before pacing kicks in",
+    )
+    github_ingest_concurrency: int = Field(
+        default=5, ge=1, le=50,
+        description="Repos fetched in parallel during ingestion; pacing follows GitHub rate-limit headers",
+    )
+    github_fetch_mode: Literal["rest", "graphql"] = Field(
+        default="rest",
+        description="How to fetch repo details: 'rest' (4 core requests per repo) or 'graphql' (one aliased query per batch; requires GITHUB_TOKEN)",
+    )
+    github_graphql_batch_size: int = Field(
+        default=50, ge=1, le=50,
+        description="Repos per GraphQL query when github_fetch_mode=graphql",
+    )
+    github_response_cache_enabled: bool = Field(
+        default=True,
+        description="Send If-None-Match / If-Modified-Since using ETags cached in Redis; 304s don't count against the rate limit",
+    )
+    github_response_cache_ttl_seconds: int = Field(
+        default=7 * 24 * 3600, ge=60,
+        description="How long cached GitHub response bodies and validators are kept in Redis",
+    )
+    http2_enabled: bool = Field(
+        default=True,
+        description="Use HTTP/2 for GitHub API and github.com requests (needs httpx[http2]; falls back to HTTP/1.1)",
+    )
+    http_max_connections: int = Field(
+        default=20, ge=1, le=200,
+        description="Max open connections per host in the shared per-worker HTTP client pool",
+    )
+    http_max_keepalive_connections: int = Field(
+        default=10, ge=0, le=200,
+        description="Idle connections kept open per host for reuse across tasks",
+    )
+    http_keepalive_expiry_seconds: float = Field(
+        default=60.0, ge=0, le=3600,
+        description="Seconds an idle pooled connection is kept before closing",
+    )
+    ingest_write_batch_size: int = Field(
+        default=100, ge=1, le=500,
+        description="Repos upserted (with their snapshots) per multi-row statement and commit during ingestion",
+    )
+    scoring_full_refresh_hours: float = Field(
+        default=24.0, ge=0, le=720,
+        description="Re-normalize and re-score every repo at most this often; runs in between score only repos with new snapshots (0 = always full)",
+    )
+    category_scoring_by_language: bool = Field(
+        default=False,
+        description="Split each category's scoring cohort by primary_language, so repos are ranked against same-language peers",
+    )
+    snapshot_partitions_ahead_days: int = Field(
+        default=7, ge=1, le=90,
+        description="Daily trend_snapshots partitions created ahead of time before each ingestion pass",
+    )
+    snapshot_raw_retention_days: int = Field(
+        default=14, ge=8, le=365,
+        description="Days of raw hourly snapshots kept; older history lives in the daily/weekly rollups",
+    )
+    snapshot_daily_retention_days: int = Field(
+        default=180, ge=30, le=3650,
+        description="Days of daily snapshot rollups kept",
+    )
+    snapshot_weekly_retention_days: int = Field(
+        default=730, ge=90, le=3650,
+        description="Days of weekly snapshot rollups kept",
+    )
+    ingestion_run_retention_days: int = Field(
+        default=14, ge=1, le=365,
+        description="Days finished (completed or failed) ingestion run checkpoints are kept before cleanup deletes them",
     )
     repo_metadata_cache_hours: float = Field(
         default=24.0, ge=0, le=720,
@@ -71,6 +144,10 @@ class Settings(BaseSettings):
         default=25, ge=1, le=100,
         description="Max repos to fetch from trending scrape (total across all views)",
     )
+    topic_search_max_repos: int = Field(
+        default=0, ge=0, le=100_000,
+        description="If > 0, cover whole topics by sharding searches past GitHub's 1000-result cap, up to this many repos per run (0 = page 1 per topic, capped by MAX_REPOS_PER_CATEGORY)",
+    )
 
     # Categories: optional JSON array of {slug, name, description, keywords}; if not set use defaults from constants
     categories_json: str | None = Field(
@@ -110,3 +187,10 @@ class Settings(BaseSettings):
     def cors_origins(self) -> list[str]:
         """Parse comma-separated CORS_ORIGINS into a list."""
         return [x.strip() for x in self.cors_origins_raw.split(",") if x.strip()] or ["http://localhost:3000"]
+
+    @computed_field
+    @property
+    def github_token_pool(self) -> list[str]:
+        """GITHUB_TOKEN plus GITHUB_TOKENS, deduped, in order."""
+        tokens = [self.github_token or ""] + (self.github_tokens_raw or "").split(",")
+        return list(dict.fromkeys(t.strip() for t in tokens if t.strip()))
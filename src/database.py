@@ -2,10 +2,12 @@
 
 from __future__ import annotations
 
+import asyncio
+import weakref
 from collections.abc import AsyncGenerator
 from contextlib import asynccontextmanager
 
-from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
 
 from src.config import Settings
 from src.models.base import Base
@@ -40,6 +42,12 @@ def get_session_factory(engine=None):
 engine = get_engine()
 SessionLocal = get_session_factory(engine)
 
+# session_scope's engines and session factories, one per event loop (asyncpg connections are
+# bound to the loop that opened them)
+_loop_sessions: weakref.WeakKeyDictionary[
+    asyncio.AbstractEventLoop, tuple[AsyncEngine, async_sessionmaker[AsyncSession]]
+] = weakref.WeakKeyDictionary()
+
 
 async def get_db() -> AsyncGenerator[AsyncSession, None]:
     """Dependency that yields an async session and closes it after use."""
@@ -54,23 +62,36 @@ async def get_db() -> AsyncGenerator[AsyncSession, None]:
             await session.close()
 
 
+def _loop_session_factory() -> async_sessionmaker[AsyncSession]:
+    loop = asyncio.get_running_loop()
+    entry = _loop_sessions.get(loop)
+    if entry is None:
+        _engine = get_engine()
+        entry = _loop_sessions[loop] = (_engine, get_session_factory(_engine))
+    return entry[1]
+
+
 @asynccontextmanager
 async def session_scope():
     """Context manager for use outside FastAPI (e.g. scripts, Celery tasks).
 
-    Creates a new engine and session in the current event loop so it is safe
-    to use from forked Celery workers (where the global engine is bound to
-    the parent's loop and would raise 'Future attached to a different loop').
+    Uses an engine owned by the current event loop, created on first use, so it is safe
+    to use from forked Celery workers (where the global engine is bound to the parent's
+    loop and would raise 'Future attached to a different loop'). The engine and its
+    connection pool outlive the session: later scopes on the same loop (the next task on
+    a worker's persistent loop) reuse its connections. dispose_loop_engine() closes it.
     """
-    _engine = get_engine()
-    _session_factory = get_session_factory(_engine)
-    try:
-        async with _session_factory() as session:
-            try:
-                yield session
-                await session.commit()
-            except Exception:
-                await session.rollback()
-                raise
-    finally:
-        await _engine.dispose()
+    async with _loop_session_factory()() as session:
+        try:
+            yield session
+            await session.commit()
+        except Exception:
+            await session.rollback()
+            raise
+
+
+async def dispose_loop_engine() -> None:
+    """Dispose session_scope's engine for the running loop (worker shutdown, end of a script)."""
+    entry = _loop_sessions.pop(asyncio.get_running_loop(), None)
+    if entry is not None:
+        await entry[0].dispose()
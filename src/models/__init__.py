@@ -4,14 +4,23 @@ from src.models.base import Base
 from src.models.category import Category, RepositoryCategory
 from src.models.content import GeneratedContent
 from src.models.embedding import RepoEmbedding
+from src.models.ingestion_run import IngestionRun, IngestionRunItem
 from src.models.repository import Repository, TrendSnapshot
+from src.models.scoring import ScoringFeatureSketch
+from src.models.snapshot_rollup import SnapshotRollupDirtyDay, TrendSnapshotDaily, TrendSnapshotWeekly
 
 __all__ = [
     "Base",
     "Category",
     "GeneratedContent",
+    "IngestionRun",
+    "IngestionRunItem",
     "RepoEmbedding",
     "Repository",
     "RepositoryCategory",
+    "ScoringFeatureSketch",
+    "SnapshotRollupDirtyDay",
     "TrendSnapshot",
+    "TrendSnapshotDaily",
+    "TrendSnapshotWeekly",
 ]
@@ -5,7 +5,7 @@ from __future__ import annotations
 from datetime import datetime
 from typing import TYPE_CHECKING
 
-from sqlalchemy import BigInteger, DateTime, Float, ForeignKey, Integer, String, Text, UniqueConstraint, func
+from sqlalchemy import BigInteger, DateTime, Float, ForeignKey, Index, Integer, String, Text, UniqueConstraint, func
 from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
@@ -48,10 +48,13 @@ class RepositoryCategory(Base):
     assigned_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True), server_default=func.now(), nullable=False
     )
+    # Trend score normalized within the category's cohort (set by category scoring)
+    category_trend_score: Mapped[float | None] = mapped_column(Float, nullable=True)
 
     repository: Mapped["Repository"] = relationship("Repository", back_populates="repository_categories")
     category: Mapped["Category"] = relationship("Category", back_populates="repository_categories")
 
     __table_args__ = (
         UniqueConstraint("repository_id", "category_id", name="uq_repository_category_repo_cat"),
+        Index("ix_repository_categories_category_score", "category_id", "category_trend_score"),
     )
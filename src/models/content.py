@@ -38,6 +38,8 @@ class GeneratedContent(Base):
     llm_model: Mapped[str] = mapped_column(String(64), nullable=False)
     prompt_version: Mapped[str] = mapped_column(String(16), default="v1", nullable=False)
     token_usage: Mapped[dict | None] = mapped_column(JSONB, nullable=True)
+    # README blob sha the content was generated from (NULL: generated before shas were tracked)
+    readme_sha: Mapped[str | None] = mapped_column(String(40), nullable=True)
     generated_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True), server_default=func.now(), nullable=False
     )
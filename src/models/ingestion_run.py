@@ -0,0 +1,62 @@
+"""IngestionRun and IngestionRunItem models — checkpoints for resumable ingestion."""
+
+from __future__ import annotations
+
+from datetime import datetime
+
+from sqlalchemy import BigInteger, DateTime, ForeignKey, Index, Integer, String, UniqueConstraint, func
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm import Mapped, mapped_column, relationship
+
+from src.models.base import Base
+
+RUN_STATUSES = ("planning", "running", "completed", "failed")
+ITEM_STATUSES = ("pending", "done")
+
+
+class IngestionRun(Base):
+    """One ingestion run; the id is the Celery task id, which stays the same across retries."""
+
+    __tablename__ = "ingestion_runs"
+
+    id: Mapped[str] = mapped_column(String(64), primary_key=True)
+    kind: Mapped[str] = mapped_column(String(32), nullable=False)
+    status: Mapped[str] = mapped_column(String(16), default="planning", nullable=False)
+    params: Mapped[dict | None] = mapped_column(JSONB, nullable=True)
+    planned_count: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    done_count: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    attempts: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    error: Mapped[str | None] = mapped_column(String(1024), nullable=True)
+    started_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), nullable=False
+    )
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False
+    )
+    finished_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+
+    items: Mapped[list["IngestionRunItem"]] = relationship(
+        "IngestionRunItem", back_populates="run", cascade="all, delete-orphan"
+    )
+
+
+class IngestionRunItem(Base):
+    """One planned repo of a run, with the discovery payload so a resume needs no re-search."""
+
+    __tablename__ = "ingestion_run_items"
+
+    id: Mapped[int] = mapped_column(BigInteger, primary_key=True, autoincrement=True)
+    run_id: Mapped[str] = mapped_column(
+        String(64), ForeignKey("ingestion_runs.id", ondelete="CASCADE"), nullable=False
+    )
+    full_name: Mapped[str] = mapped_column(String(255), nullable=False)
+    payload: Mapped[dict | None] = mapped_column(JSONB, nullable=True)
+    status: Mapped[str] = mapped_column(String(16), default="pending", nullable=False)
+    completed_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+
+    run: Mapped["IngestionRun"] = relationship("IngestionRun", back_populates="items")
+
+    __table_args__ = (
+        UniqueConstraint("run_id", "full_name", name="uq_ingestion_run_items_run_repo"),
+        Index("ix_ingestion_run_items_run_status", "run_id", "status"),
+    )
@@ -16,6 +16,7 @@ from sqlalchemy import (
     String,
     Text,
     func,
+    text,
 )
 from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import Mapped, mapped_column, relationship
@@ -46,7 +47,11 @@ class Repository(Base):
     topics: Mapped[list | None] = mapped_column(JSONB, nullable=True)
     license_spdx: Mapped[str | None] = mapped_column(String(64), nullable=True)
     has_readme: Mapped[bool] = mapped_column(Boolean, default=False, nullable=False)
-    readme_content: Mapped[str | None] = mapped_column(Text, nullable=True)
+    # Up to 15k chars: deferred and raise-on-access so list/scan queries never carry it; the
+    # services that read it (classification, embeddings, content generation) undefer it
+    readme_content: Mapped[str | None] = mapped_column(Text, nullable=True, deferred=True, deferred_raiseload=True)
+    # Git blob sha of the README; a change is what triggers re-download, re-embed and regeneration
+    readme_sha: Mapped[str | None] = mapped_column(String(40), nullable=True)
     stars_count: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
     forks_count: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
     open_issues_count: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
@@ -94,7 +99,8 @@ class Repository(Base):
 
 
 class TrendSnapshot(Base):
-    """Hourly time-series of repo metrics."""
+    """Hourly time-series of repo metrics. Range-partitioned by day on snapshot_at (see
+    trend_ingestion/partitions.py), so the primary key includes snapshot_at."""
 
     __tablename__ = "trend_snapshots"
 
@@ -109,15 +115,23 @@ class TrendSnapshot(Base):
     stars_delta_1h: Mapped[int | None] = mapped_column(Integer, nullable=True)
     stars_delta_24h: Mapped[int | None] = mapped_column(Integer, nullable=True)
     forks_delta_24h: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    stars_delta_7d: Mapped[int | None] = mapped_column(Integer, nullable=True)
     commits_7d: Mapped[int | None] = mapped_column(Integer, nullable=True)
     issue_events_7d: Mapped[int | None] = mapped_column(Integer, nullable=True)
     computed_trend_score: Mapped[float | None] = mapped_column(Float, nullable=True)
     snapshot_at: Mapped[datetime] = mapped_column(
-        DateTime(timezone=True), server_default=func.now(), index=True, nullable=False
+        DateTime(timezone=True), server_default=func.now(), primary_key=True, index=True, nullable=False
     )
 
     repository: Mapped["Repository"] = relationship("Repository", back_populates="trend_snapshots")
 
     __table_args__ = (
         Index("ix_trend_snapshots_repo_snapshot", "repository_id", "snapshot_at"),
+        # Snapshots incremental scoring hasn't scored yet
+        Index(
+            "ix_trend_snapshots_unscored",
+            "snapshot_at",
+            postgresql_where=text("computed_trend_score IS NULL"),
+        ),
+        {"postgresql_partition_by": "RANGE (snapshot_at)"},
     )
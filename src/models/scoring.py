@@ -0,0 +1,25 @@
+"""ScoringFeatureSketch model — stored per-feature distributions for incremental scoring."""
+
+from __future__ import annotations
+
+from datetime import datetime
+
+from sqlalchemy import DateTime, Integer, String, func
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm import Mapped, mapped_column
+
+from src.models.base import Base
+
+
+class ScoringFeatureSketch(Base):
+    """Quantile sketch of one trend-score feature over the last full scoring cohort."""
+
+    __tablename__ = "scoring_feature_sketches"
+
+    feature: Mapped[str] = mapped_column(String(32), primary_key=True)
+    # Evenly spaced quantiles p0..p100 of the feature's raw values
+    quantiles: Mapped[list] = mapped_column(JSONB, nullable=False)
+    sample_count: Mapped[int] = mapped_column(Integer, nullable=False)
+    refreshed_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), nullable=False
+    )
@@ -0,0 +1,64 @@
+"""Daily and weekly rollups of TrendSnapshot (downsampled history kept past raw retention)."""
+
+from __future__ import annotations
+
+from datetime import date, datetime
+
+from sqlalchemy import BigInteger, Date, DateTime, Float, ForeignKey, Integer, func
+from sqlalchemy.orm import Mapped, mapped_column
+
+from src.models.base import Base
+
+
+class SnapshotRollupMixin:
+    """One row per repo per bucket: first/last/min/max counters over the bucket's snapshots.
+    bucket_start is the UTC day (daily) or the Monday of the ISO week (weekly)."""
+
+    repository_id: Mapped[int] = mapped_column(
+        BigInteger, ForeignKey("repositories.id", ondelete="CASCADE"), primary_key=True
+    )
+    bucket_start: Mapped[date] = mapped_column(Date, primary_key=True, index=True)
+    snapshot_count: Mapped[int] = mapped_column(Integer, nullable=False)
+    first_snapshot_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+    last_snapshot_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+    stars_first: Mapped[int] = mapped_column(Integer, nullable=False)
+    stars_last: Mapped[int] = mapped_column(Integer, nullable=False)
+    stars_min: Mapped[int] = mapped_column(Integer, nullable=False)
+    stars_max: Mapped[int] = mapped_column(Integer, nullable=False)
+    forks_first: Mapped[int] = mapped_column(Integer, nullable=False)
+    forks_last: Mapped[int] = mapped_column(Integer, nullable=False)
+    forks_min: Mapped[int] = mapped_column(Integer, nullable=False)
+    forks_max: Mapped[int] = mapped_column(Integer, nullable=False)
+    open_issues_last: Mapped[int] = mapped_column(Integer, nullable=False)
+    watchers_last: Mapped[int] = mapped_column(Integer, nullable=False)
+    stars_delta_24h_last: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    stars_delta_7d_last: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    commits_7d_last: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    computed_trend_score_last: Mapped[float | None] = mapped_column(Float, nullable=True)
+
+    @property
+    def stars_gained(self) -> int:
+        """Stars gained between the bucket's first and last snapshot."""
+        return self.stars_last - self.stars_first
+
+
+class TrendSnapshotDaily(SnapshotRollupMixin, Base):
+    """Per-day rollup of hourly snapshots."""
+
+    __tablename__ = "trend_snapshots_daily"
+
+
+class TrendSnapshotWeekly(SnapshotRollupMixin, Base):
+    """Per-week rollup, built from the daily tier."""
+
+    __tablename__ = "trend_snapshots_weekly"
+
+
+class SnapshotRollupDirtyDay(Base):
+    """A UTC day whose raw snapshots were changed in place after it may have been rolled up;
+    the next rollup re-aggregates it (and its week)."""
+
+    __tablename__ = "trend_snapshot_dirty_days"
+
+    day: Mapped[date] = mapped_column(Date, primary_key=True)
+    marked_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now(), nullable=False)
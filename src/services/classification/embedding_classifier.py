@@ -6,7 +6,7 @@ import hashlib
 import logging
 from typing import Any
 
-from sqlalchemy import select
+from sqlalchemy import inspect, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.llm import embeddings as emb
@@ -28,20 +28,28 @@ def _source_hash(readme: str | None) -> str:
 
 
 async def ensure_repo_embedding(session: AsyncSession, repo: Repository) -> RepoEmbedding | None:
-    """Create or reuse repo_embedding for README. Returns None if no README."""
-    if not repo.readme_content:
-        return None
-    source_hash = _source_hash(repo.readme_content)
+    """Create or reuse repo_embedding for README. Returns None if no README. The README blob sha is
+    the source hash when known, so an unchanged README is never re-embedded (nor even loaded)."""
     existing = await session.execute(
         select(RepoEmbedding).where(RepoEmbedding.repository_id == repo.id)
     )
     row = existing.scalar_one_or_none()
+    if row and repo.readme_sha and row.source_text_hash == repo.readme_sha:
+        return row
+    # readme_content is deferred (raiseload); fetch it here unless the caller undeferred it
+    if "readme_content" in inspect(repo).unloaded:
+        readme = await session.scalar(select(Repository.readme_content).where(Repository.id == repo.id))
+    else:
+        readme = repo.readme_content
+    if not readme:
+        return None
+    source_hash = repo.readme_sha or _source_hash(readme)
     from src.config import Settings
     settings = Settings()
     model = settings.embedding_model
     if row and row.source_text_hash == source_hash:
         return row
-    vec = await emb.embed_text(repo.readme_content)
+    vec = await emb.embed_text(readme)
     if row:
         row.embedding = vec
         row.source_text_hash = source_hash
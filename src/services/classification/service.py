@@ -8,7 +8,7 @@ from datetime import datetime, timezone
 from sqlalchemy import select
 from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import selectinload
+from sqlalchemy.orm import selectinload, undefer
 
 from src.models.category import Category, RepositoryCategory
 from src.models.repository import Repository
@@ -46,6 +46,12 @@ async def classify_new_repos(session: AsyncSession, limit: int = 500) -> int:
     to_process = unclassified[:limit] if unclassified else repos[:limit]
     if not to_process:
         return 0
+    # README text is deferred; load it only for the repos being classified (fills in the same objects)
+    await session.execute(
+        select(Repository)
+        .where(Repository.id.in_([r.id for r in to_process]))
+        .options(undefer(Repository.readme_content))
+    )
 
     assigned = 0
     for repo in to_process:
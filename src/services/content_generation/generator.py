@@ -5,7 +5,7 @@ from __future__ import annotations
 import logging
 from datetime import datetime, timezone
 
-from sqlalchemy import select
+from sqlalchemy import func, select
 from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncSession
 
@@ -64,6 +64,7 @@ async def generate_one(
         llm_model=response.model,
         prompt_version=PROMPT_VERSION,
         token_usage=token_usage,
+        readme_sha=repo.readme_sha,
     )
     stmt = ins.on_conflict_do_update(
         index_elements=["repository_id", "content_type", "prompt_version"],
@@ -72,6 +73,9 @@ async def generate_one(
             GeneratedContent.llm_provider: ins.excluded.llm_provider,
             GeneratedContent.llm_model: ins.excluded.llm_model,
             GeneratedContent.token_usage: ins.excluded.token_usage,
+            GeneratedContent.readme_sha: ins.excluded.readme_sha,
+            # Regenerated rows count toward today's cap
+            GeneratedContent.generated_at: func.now(),
         },
     )
     await session.execute(stmt)
@@ -5,9 +5,9 @@ from __future__ import annotations
 import logging
 from datetime import datetime, timezone
 
-from sqlalchemy import func, select
+from sqlalchemy import and_, func, or_, select
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import selectinload
+from sqlalchemy.orm import selectinload, undefer
 
 from src.config import Settings
 from src.llm.factory import create_llm
@@ -19,6 +19,15 @@ from src.services.content_generation.generator import generate_one
 logger = logging.getLogger(__name__)
 
 
+def _content_is_current():
+    """SQL predicate: the content row was generated from the repo's current README (rows from
+    before README shas were tracked count as current)."""
+    return or_(
+        GeneratedContent.readme_sha.is_(None),
+        GeneratedContent.readme_sha == Repository.readme_sha,
+    )
+
+
 async def generate_content_for_top_repos(session: AsyncSession) -> int:
     """
     Select up to max_repos_per_category repos per category (quality_passed, in that category,
@@ -39,10 +48,14 @@ async def generate_content_for_top_repos(session: AsyncSession) -> int:
         logger.info("Daily content cap reached (%s)", max_per_day)
         return 0
 
+    # Content generated from an older README (sha changed since) doesn't count: it gets regenerated
     subq = (
         select(Repository.id.label("rid"), func.count(GeneratedContent.id).label("cnt"))
         .select_from(Repository)
-        .outerjoin(GeneratedContent, Repository.id == GeneratedContent.repository_id)
+        .outerjoin(
+            GeneratedContent,
+            and_(Repository.id == GeneratedContent.repository_id, _content_is_current()),
+        )
         .where(Repository.quality_passed == True)
         .group_by(Repository.id)
     )
@@ -72,7 +85,7 @@ async def generate_content_for_top_repos(session: AsyncSession) -> int:
         select(Repository)
         .where(Repository.id.in_(top_repo_ids))
         .order_by(Repository.current_trend_score.desc().nullslast())
-        .options(selectinload(Repository.generated_content))
+        .options(selectinload(Repository.generated_content), undefer(Repository.readme_content))
     )
     repos = list(repos_result.scalars().unique().all())
 
@@ -81,7 +94,11 @@ async def generate_content_for_top_repos(session: AsyncSession) -> int:
     for repo in repos:
         if created >= remaining_today:
             break
-        existing_types = {gc.content_type for gc in repo.generated_content}
+        existing_types = {
+            gc.content_type
+            for gc in repo.generated_content
+            if gc.readme_sha is None or gc.readme_sha == repo.readme_sha
+        }
         for content_type in CONTENT_TYPES:
             if content_type in existing_types:
                 continue
@@ -0,0 +1,27 @@
+"""Cohort-relative scoring: min-max normalize each cohort (a category, optionally split by
+primary_language) on its own, so a repo is ranked against its peers rather than the corpus.
+
+Cohorts are scored in-process with the vectorized kernel: one gather and a few array
+operations per cohort. A process pool can't start inside Celery's daemonic prefork workers,
+which is where category scoring runs.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Mapping
+
+import numpy as np
+
+from src.services.repo_scoring.scorer import score_features
+
+# (category_id, primary_language); language is None unless cohorts are split by language
+CohortKey = tuple[int, str | None]
+
+
+def score_cohorts(
+    features: Mapping[str, np.ndarray], members: Mapping[CohortKey, np.ndarray]
+) -> dict[CohortKey, np.ndarray]:
+    """Unrounded scores per cohort. features: kernel feature columns over all rows; members:
+    each cohort's row indexes into them (a row may sit in several cohorts). Scores come back
+    aligned with each cohort's indexes."""
+    return {key: score_features({name: col[idx] for name, col in features.items()}) for key, idx in members.items()}
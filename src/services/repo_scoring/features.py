@@ -0,0 +1,120 @@
+"""Windowed trend features computed in SQL: 7d/30d star gains, star acceleration, fork velocity.
+
+Each feature is "current counter minus the counter at the first observation on or after an
+anchor" (now-7d, now-14d, now-30d). The anchors come from one aggregate over the daily rollup
+tier (array_agg ... FILTER per anchor, so one pass per repo), plus one aggregate over raw
+snapshots newer than the rolled-up days for repos the rollup hasn't seen yet. No snapshot rows
+are loaded into Python.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Any
+
+from sqlalchemy import func, select
+from sqlalchemy.dialects.postgresql import aggregate_order_by
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.models.repository import Repository, TrendSnapshot
+from src.models.snapshot_rollup import TrendSnapshotDaily
+
+ANCHOR_DAYS = (7, 14, 30)
+
+
+@dataclass
+class RepoWindowFeatures:
+    stars_gained_7d: int | None = None
+    stars_gained_30d: int | None = None
+    # This week's star gain minus the previous week's (stars/week per week)
+    star_acceleration: int | None = None
+    # Forks gained per day over the last 7 days
+    fork_velocity: float | None = None
+
+
+def _first_since(col: Any, order: Any, start: Any) -> Any:
+    """Value of col at the earliest row with order >= start (per group)."""
+    return func.array_agg(aggregate_order_by(col, order)).filter(order >= start)[1]
+
+
+def _anchor_columns(stars: Any, forks: Any, order: Any, starts: dict[int, Any]) -> list[Any]:
+    return [
+        *(_first_since(stars, order, starts[days]).label(f"stars_{days}d") for days in ANCHOR_DAYS),
+        _first_since(forks, order, starts[7]).label("forks_7d"),
+    ]
+
+
+async def _daily_anchors(
+    session: AsyncSession, now: datetime, repo_ids: list[int] | None
+) -> dict[int, tuple[Any, ...]]:
+    d = TrendSnapshotDaily
+    starts: dict[int, date] = {days: (now - timedelta(days=days)).date() for days in ANCHOR_DAYS}
+    stmt = (
+        select(d.repository_id, *_anchor_columns(d.stars_first, d.forks_first, d.bucket_start, starts))
+        .where(d.bucket_start >= starts[max(ANCHOR_DAYS)])
+        .group_by(d.repository_id)
+    )
+    if repo_ids is not None:
+        stmt = stmt.where(d.repository_id.in_(repo_ids))
+    result = await session.execute(stmt)
+    return {row[0]: tuple(row[1:]) for row in result.all()}
+
+
+async def _raw_anchors(
+    session: AsyncSession, now: datetime, since: datetime, repo_ids: list[int] | None
+) -> dict[int, tuple[Any, ...]]:
+    s = TrendSnapshot
+    starts: dict[int, datetime] = {days: max(since, now - timedelta(days=days)) for days in ANCHOR_DAYS}
+    stmt = (
+        select(s.repository_id, *_anchor_columns(s.stars_count, s.forks_count, s.snapshot_at, starts))
+        .where(s.snapshot_at >= starts[max(ANCHOR_DAYS)])
+        .group_by(s.repository_id)
+    )
+    if repo_ids is not None:
+        stmt = stmt.where(s.repository_id.in_(repo_ids))
+    result = await session.execute(stmt)
+    return {row[0]: tuple(row[1:]) for row in result.all()}
+
+
+def _gain(current: int, anchor: int | None) -> int | None:
+    return None if anchor is None else max(0, current - anchor)
+
+
+async def compute_window_features(
+    session: AsyncSession,
+    repo_ids: list[int] | None = None,
+    now: datetime | None = None,
+) -> dict[int, RepoWindowFeatures]:
+    """{repo_id: RepoWindowFeatures} for all repos (or repo_ids) with observations in the last 30 days."""
+    now = now or datetime.now(timezone.utc)
+    anchors = await _daily_anchors(session, now, repo_ids)
+    rolled_through = await session.scalar(select(func.max(TrendSnapshotDaily.bucket_start)))
+    raw_since = now - timedelta(days=max(ANCHOR_DAYS))
+    if rolled_through is not None:
+        raw_since = max(raw_since, datetime.combine(rolled_through, time.min, tzinfo=timezone.utc))
+    for rid, raw in (await _raw_anchors(session, now, raw_since, repo_ids)).items():
+        daily = anchors.get(rid)
+        # Fill anchors the daily tier doesn't have (repo first seen after the last rollup)
+        anchors[rid] = raw if daily is None else tuple(a if a is not None else b for a, b in zip(daily, raw))
+    if not anchors:
+        return {}
+
+    current_stmt = select(Repository.id, Repository.stars_count, Repository.forks_count).where(
+        Repository.id.in_(list(anchors))
+    )
+    current = {rid: (stars, forks) for rid, stars, forks in (await session.execute(current_stmt)).all()}
+    out: dict[int, RepoWindowFeatures] = {}
+    for rid, (stars_7d, stars_14d, stars_30d, forks_7d) in anchors.items():
+        if rid not in current:
+            continue
+        stars_now, forks_now = current[rid]
+        gained_7d = _gain(stars_now, stars_7d)
+        prev_week = None if stars_7d is None or stars_14d is None else max(0, stars_7d - stars_14d)
+        out[rid] = RepoWindowFeatures(
+            stars_gained_7d=gained_7d,
+            stars_gained_30d=_gain(stars_now, stars_30d),
+            star_acceleration=None if gained_7d is None or prev_week is None else gained_7d - prev_week,
+            fork_velocity=None if forks_7d is None else round(max(0, forks_now - forks_7d) / 7, 4),
+        )
+    return out
@@ -1,8 +1,19 @@
-"""Quality filters — all must pass for quality_passed=True."""
+"""Quality filters — all must pass for quality_passed=True.
+
+The same rules exist twice: passes_quality_filters checks one loaded row in Python, and
+quality_filter_clause is the equivalent SQL predicate, so refresh_quality_passed can
+re-evaluate the whole table in one UPDATE without loading any Repository rows. Change both
+together.
+"""
 
 from __future__ import annotations
 
 from datetime import datetime, timezone, timedelta
+from typing import Any
+
+from sqlalchemy import and_, func, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql.elements import ColumnElement
 
 from src.models.repository import Repository
 
@@ -10,15 +21,21 @@ ACTIVE_DAYS = 14
 MIN_DESCRIPTION_LEN = 20
 MIN_STARS = 5
 
+# Every character str.strip() removes, so btrim() in SQL trims exactly what Python does
+_WHITESPACE = "".join(chr(c) for c in range(0x3001) if chr(c).isspace())
+
 
-def passes_quality_filters(repo: Repository) -> bool:
-    """Return True if repo passes all quality filters."""
+def _active_cutoff(now: datetime | None) -> datetime:
+    return (now or datetime.now(timezone.utc)) - timedelta(days=ACTIVE_DAYS)
+
+
+def passes_quality_filters(repo: Any, now: datetime | None = None) -> bool:
+    """Return True if repo (a Repository, or any row with the same columns) passes all quality filters."""
     if not repo.has_readme:
         return False
     if repo.license_spdx is None or repo.license_spdx.strip() == "":
         return False
-    cutoff = datetime.now(timezone.utc) - timedelta(days=ACTIVE_DAYS)
-    if repo.pushed_at_gh < cutoff:
+    if repo.pushed_at_gh < _active_cutoff(now):
         return False
     if repo.is_fork or repo.is_archived or repo.is_mirror:
         return False
@@ -28,3 +45,34 @@ def passes_quality_filters(repo: Repository) -> bool:
     if (repo.stars_count or 0) < MIN_STARS:
         return False
     return True
+
+
+def _trimmed_length(col: Any) -> Any:
+    return func.char_length(func.btrim(func.coalesce(col, ""), _WHITESPACE))
+
+
+def quality_filter_clause(now: datetime | None = None) -> ColumnElement[bool]:
+    """SQL predicate over repositories equivalent to passes_quality_filters (never NULL)."""
+    return and_(
+        Repository.has_readme.is_(True),
+        _trimmed_length(Repository.license_spdx) > 0,
+        Repository.pushed_at_gh >= _active_cutoff(now),
+        Repository.is_fork.is_(False),
+        Repository.is_archived.is_(False),
+        Repository.is_mirror.is_(False),
+        _trimmed_length(Repository.description) >= MIN_DESCRIPTION_LEN,
+        func.coalesce(Repository.stars_count, 0) >= MIN_STARS,
+    )
+
+
+async def refresh_quality_passed(
+    session: AsyncSession, now: datetime | None = None, repo_ids: list[int] | None = None
+) -> int:
+    """Re-evaluate quality_passed for every repo (or just repo_ids) in one UPDATE; only rows whose
+    outcome changes are written. Caller commits. Returns number of repos changed."""
+    passed = quality_filter_clause(now)
+    stmt = update(Repository).where(Repository.quality_passed.is_distinct_from(passed)).values(quality_passed=passed)
+    if repo_ids is not None:
+        stmt = stmt.where(Repository.id.in_(repo_ids))
+    result = await session.execute(stmt)
+    return result.rowcount or 0
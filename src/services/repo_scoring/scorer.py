@@ -1,9 +1,19 @@
-"""Trend score: weighted formula with min-max normalization over cohort."""
+"""Trend score: weighted formula with min-max normalization over cohort.
+
+The kernel (trend_score_array) works on columnar NumPy arrays so a whole cohort is scored in a
+handful of vector operations; compute_trend_scores keeps the row-tuple API on top of it. With
+`quantiles`, features are normalized by their quantile rank in the stored distribution sketches
+instead of against the cohort's min/max, so one outlier doesn't rescale every other repo and
+scoring a subset gives the same scores it would get as part of the full cohort.
+"""
 
 from __future__ import annotations
 
+from collections.abc import Mapping, Sequence
 from datetime import datetime, timezone, timedelta
 
+import numpy as np
+
 # Weights per spec: stars_24h 0.4, forks_24h 0.2, commits_7d 0.15, issue_activity 0.15, recency 0.1
 W_STARS_24H = 0.4
 W_FORKS_24H = 0.2
@@ -12,6 +22,15 @@ W_ISSUE_ACTIVITY = 0.15
 W_RECENCY = 0.1
 RECENCY_DECAY_DAYS = 10
 
+# Kernel feature names, in weight order (also the keys of stored distribution sketches)
+FEATURE_WEIGHTS: dict[str, float] = {
+    "stars_delta_24h": W_STARS_24H,
+    "forks_delta_24h": W_FORKS_24H,
+    "commits_7d": W_COMMITS_7D,
+    "issue_events_7d": W_ISSUE_ACTIVITY,
+    "recency": W_RECENCY,
+}
+
 
 def _normalize(values: list[float], min_val: float | None = None, max_val: float | None = None) -> list[float]:
     """Normalize to 0-100 via min-max. If all same or empty, return 0s."""
@@ -25,6 +44,93 @@ def _normalize(values: list[float], min_val: float | None = None, max_val: float
     return [max(0, min(100, (v - lo) / span * 100)) for v in values]
 
 
+def _normalize_array(values: np.ndarray, min_val: float | None = None, max_val: float | None = None) -> np.ndarray:
+    """Vectorized _normalize: min-max to 0-100 (clipped); all zeros if there is no spread."""
+    if values.size == 0:
+        return values.astype(np.float64)
+    lo = min_val if min_val is not None else values.min()
+    hi = max_val if max_val is not None else values.max()
+    span = hi - lo
+    if span <= 0:
+        return np.zeros(values.shape, dtype=np.float64)
+    return np.clip((values - lo) / span * 100, 0, 100)
+
+
+def _rank_normalize(values: np.ndarray, quantiles: Sequence[float] | np.ndarray) -> np.ndarray:
+    """Quantile rank (0-100) of each value in a sketch of evenly spaced quantiles, interpolated
+    linearly between sketch points. A run of tied points ranks at its lowest (so the minimum
+    maps to 0); values past the sketch clip to 0 / 100."""
+    q = np.asarray(quantiles, dtype=np.float64)
+    xp, first = np.unique(q, return_index=True)
+    if xp.size < 2:
+        return np.zeros(values.shape, dtype=np.float64)
+    fp = np.linspace(0.0, 100.0, q.size)[first]
+    return np.interp(values, xp, fp, right=100.0)
+
+
+def _feature(values: Sequence[float | None] | np.ndarray) -> np.ndarray:
+    """Float64 column with missing values (None / NaN) as 0."""
+    arr = np.asarray(values, dtype=np.float64)
+    return np.nan_to_num(arr, nan=0.0)
+
+
+def feature_columns(
+    stars_delta_24h: Sequence[float | None] | np.ndarray,
+    forks_delta_24h: Sequence[float | None] | np.ndarray,
+    commits_7d: Sequence[float | None] | np.ndarray,
+    issue_events_7d: Sequence[float | None] | np.ndarray,
+    pushed_at_epoch: Sequence[float] | np.ndarray,
+    now_epoch: float | None = None,
+) -> dict[str, np.ndarray]:
+    """Raw (unnormalized) kernel features keyed as in FEATURE_WEIGHTS; pushed_at as Unix epoch seconds."""
+    now = datetime.now(timezone.utc).timestamp() if now_epoch is None else now_epoch
+    days = (now - np.asarray(pushed_at_epoch, dtype=np.float64)) / 86400
+    return {
+        "stars_delta_24h": _feature(stars_delta_24h),
+        "forks_delta_24h": _feature(forks_delta_24h),
+        "commits_7d": _feature(commits_7d),
+        "issue_events_7d": _feature(issue_events_7d),
+        "recency": np.maximum(0.0, RECENCY_DECAY_DAYS - days),
+    }
+
+
+def score_features(
+    features: Mapping[str, np.ndarray],
+    quantiles: Mapping[str, Sequence[float]] | None = None,
+) -> np.ndarray:
+    """Weighted sum of normalized features. A feature with a quantile sketch is normalized by
+    its rank in it; otherwise min-max against the cohort."""
+    total: np.ndarray | float = 0.0
+    for name, weight in FEATURE_WEIGHTS.items():
+        if quantiles and name in quantiles:
+            normalized = _rank_normalize(features[name], quantiles[name])
+        else:
+            normalized = _normalize_array(features[name])
+        total = total + normalized * weight
+    return np.asarray(total, dtype=np.float64)
+
+
+def trend_score_array(
+    stars_delta_24h: Sequence[float | None] | np.ndarray,
+    forks_delta_24h: Sequence[float | None] | np.ndarray,
+    commits_7d: Sequence[float | None] | np.ndarray,
+    issue_events_7d: Sequence[float | None] | np.ndarray,
+    pushed_at_epoch: Sequence[float] | np.ndarray,
+    now_epoch: float | None = None,
+    quantiles: Mapping[str, Sequence[float]] | None = None,
+) -> np.ndarray:
+    """Unrounded trend scores (0-100) for a cohort given as equal-length columns; pushed_at as
+    Unix epoch seconds. Same formula and normalization as the per-repo version."""
+    features = feature_columns(stars_delta_24h, forks_delta_24h, commits_7d, issue_events_7d, pushed_at_epoch, now_epoch)
+    return score_features(features, quantiles)
+
+
+def _epoch(dt: datetime) -> float:
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt.timestamp()
+
+
 def recency_boost(pushed_at: datetime) -> float:
     """max(0, 10 - days_since_last_push)."""
     now = datetime.now(timezone.utc)
@@ -43,27 +149,6 @@ def compute_trend_scores(
     """
     if not repo_snapshots:
         return []
-
-    stars_24h = [(s[1] or 0) for s in repo_snapshots]
-    forks_24h = [(s[2] or 0) for s in repo_snapshots]
-    commits_7d = [(s[3] or 0) for s in repo_snapshots]
-    issue_activity = [(s[4] or 0) for s in repo_snapshots]
-    recency = [recency_boost(s[5]) for s in repo_snapshots]
-
-    n_star = _normalize(stars_24h)
-    n_fork = _normalize(forks_24h)
-    n_commit = _normalize(commits_7d)
-    n_issue = _normalize(issue_activity)
-    n_rec = _normalize(recency)
-
-    out: list[tuple[int, float]] = []
-    for i, (repo_id, *_) in enumerate(repo_snapshots):
-        score = (
-            n_star[i] * W_STARS_24H
-            + n_fork[i] * W_FORKS_24H
-            + n_commit[i] * W_COMMITS_7D
-            + n_issue[i] * W_ISSUE_ACTIVITY
-            + n_rec[i] * W_RECENCY
-        )
-        out.append((repo_id, round(score, 4)))
-    return out
+    ids, stars, forks, commits, issues, pushed = zip(*repo_snapshots)
+    scores = trend_score_array(stars, forks, commits, issues, [_epoch(p) for p in pushed])
+    return [(repo_id, round(score, 4)) for repo_id, score in zip(ids, scores.tolist())]
@@ -1,84 +1,267 @@
-"""Scoring service: compute trend scores and set quality_passed on repositories."""
+"""Scoring service: compute trend scores and set quality_passed on repositories.
+
+Set-based: one query pulls each repo's latest snapshot features (LATERAL probe on
+ix_trend_snapshots_repo_snapshot), scores are computed for the whole cohort in memory, and
+results go back in a few UPDATE ... FROM (VALUES ...) statements committed as one
+transaction, together with a single UPDATE re-evaluating quality_passed from the SQL form of
+the quality filters (every repo on a full run, just the scored batch on an incremental one).
+
+Full runs refresh the per-feature distribution sketches and score every repo against them;
+incremental runs score only repos with an unscored latest snapshot against the stored
+sketches, so their cost follows the batch size rather than the corpus. score_repos picks
+the mode (full every SCORING_FULL_REFRESH_HOURS).
+
+score_categories writes a second, category-relative score per repository_categories row,
+normalizing each category (optionally per language) as its own cohort.
+"""
 
 from __future__ import annotations
 
 import logging
+from collections import defaultdict
+from collections.abc import Sequence
 from datetime import datetime, timezone, timedelta
+from typing import Any
 
-from sqlalchemy import select
+import numpy as np
+from sqlalchemy import BigInteger, DateTime, Float, Integer, column, func, select, true, update, values
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import selectinload
 
+from src.config import Settings
+from src.models.category import RepositoryCategory
 from src.models.repository import Repository, TrendSnapshot
-from src.services.repo_scoring.quality_filters import passes_quality_filters
-from src.services.repo_scoring.scorer import compute_trend_scores
+from src.models.scoring import ScoringFeatureSketch
+from src.services.repo_scoring.cohorts import CohortKey, score_cohorts
+from src.services.repo_scoring.features import compute_window_features
+from src.services.repo_scoring.quality_filters import refresh_quality_passed
+from src.services.repo_scoring.scorer import FEATURE_WEIGHTS, feature_columns, score_features
+from src.services.repo_scoring.sketches import build_sketch, load_sketches, save_sketches, sketch_quantiles
+from src.services.trend_ingestion.rollups import mark_days_dirty
 
 logger = logging.getLogger(__name__)
 
 SNAPSHOT_LOOKBACK_HOURS = 48
-RECENT_DAYS = 30
+# Rows per UPDATE ... FROM (VALUES ...) statement (keeps bind parameters under the driver limit)
+UPDATE_CHUNK_SIZE = 5000
 
 
-def _stars_gained_in_window(snapshots: list[TrendSnapshot], days: int) -> int | None:
-    """Stars gained in the last `days` days from snapshot time-series."""
-    if not snapshots:
-        return None
-    now = datetime.now(timezone.utc)
-    cutoff = now - timedelta(days=days)
-    sorted_snaps = sorted(snapshots, key=lambda s: s.snapshot_at)
-    in_window = [s for s in sorted_snaps if s.snapshot_at >= cutoff]
-    if not in_window:
-        return None
-    oldest = in_window[0]
-    latest = in_window[-1]
-    return max(0, latest.stars_count - oldest.stars_count)
+def _chunks(rows: list[tuple[Any, ...]], size: int = UPDATE_CHUNK_SIZE) -> Sequence[list[tuple[Any, ...]]]:
+    return [rows[i : i + size] for i in range(0, len(rows), size)]
+
+
+async def _changed_repo_ids(session: AsyncSession) -> list[int]:
+    """Repos with a snapshot not scored yet (new ingestion, backfilled commits) within the
+    lookback window; the partial index ix_trend_snapshots_unscored keeps this a small scan."""
+    since = datetime.now(timezone.utc) - timedelta(hours=SNAPSHOT_LOOKBACK_HOURS)
+    result = await session.execute(
+        select(TrendSnapshot.repository_id)
+        .where(TrendSnapshot.computed_trend_score.is_(None), TrendSnapshot.snapshot_at >= since)
+        .distinct()
+    )
+    return list(result.scalars().all())
+
+
+async def _load_scoring_rows(session: AsyncSession, repo_ids: list[int] | None = None) -> list[Any]:
+    """One row per repo that has snapshots (all repos, or just repo_ids): pushed_at_gh plus
+    latest snapshot features."""
+    latest = (
+        select(
+            TrendSnapshot.id,
+            TrendSnapshot.snapshot_at,
+            TrendSnapshot.stars_delta_24h,
+            TrendSnapshot.forks_delta_24h,
+            TrendSnapshot.commits_7d,
+            TrendSnapshot.issue_events_7d,
+            TrendSnapshot.computed_trend_score,
+        )
+        .where(TrendSnapshot.repository_id == Repository.id)
+        .order_by(TrendSnapshot.snapshot_at.desc())
+        .limit(1)
+        .lateral("latest")
+    )
+    stmt = (
+        select(
+            Repository.id,
+            Repository.pushed_at_gh,
+            latest.c.id.label("snapshot_id"),
+            latest.c.snapshot_at,
+            latest.c.stars_delta_24h,
+            latest.c.forks_delta_24h,
+            latest.c.commits_7d,
+            latest.c.issue_events_7d,
+            latest.c.computed_trend_score,
+        )
+        .select_from(Repository)
+        .join(latest, true())
+    )
+    if repo_ids is not None:
+        stmt = stmt.where(Repository.id.in_(repo_ids))
+    result = await session.execute(stmt)
+    return list(result.all())
+
+
+def _row_features(rows: list[Any], now: datetime) -> dict[str, Any]:
+    pushed = [r.pushed_at_gh if r.pushed_at_gh.tzinfo else r.pushed_at_gh.replace(tzinfo=timezone.utc) for r in rows]
+    return feature_columns(
+        [r.stars_delta_24h for r in rows],
+        [r.forks_delta_24h for r in rows],
+        [r.commits_7d for r in rows],
+        [r.issue_events_7d for r in rows],
+        [p.timestamp() for p in pushed],
+        now_epoch=now.timestamp(),
+    )
 
 
 async def score_and_filter_all(session: AsyncSession) -> int:
     """
-    Load repos with their latest snapshot data, compute trend scores,
-    update current_trend_score, stars_gained_30d, and quality_passed.
+    Full run: score every repo from its latest snapshot, refresh the feature sketches from this
+    cohort and normalize against them, then write current_trend_score, stars_gained_30d,
+    quality_passed and the snapshot's computed_trend_score in bulk, in one transaction.
     Returns number of repos updated.
     """
-    # Load all repos with their snapshots for latest metrics
-    repos = await session.execute(
-        select(Repository).where(Repository.id.isnot(None)).options(selectinload(Repository.trend_snapshots))
-    )
-    repos_list = list(repos.scalars().unique().all())
-    if not repos_list:
+    rows = await _load_scoring_rows(session)
+    if not rows:
         return 0
+    now = datetime.now(timezone.utc)
+    features = _row_features(rows, now)
+    sketches = {name: build_sketch(features[name]) for name in FEATURE_WEIGHTS}
+    await save_sketches(session, sketches, now)
+    return await _write_scores(session, rows, score_features(features, sketch_quantiles(sketches)), now, full_cohort=True)
 
-    # Build cohort: (repo_id, stars_delta_24h, forks_delta_24h, commits_7d, issue_events_7d, pushed_at_gh)
-    cohort: list[tuple[int, int | None, int | None, int | None, int | None, datetime]] = []
-    for repo in repos_list:
-        snapshots = sorted(repo.trend_snapshots, key=lambda s: s.snapshot_at, reverse=True)
-        latest = snapshots[0] if snapshots else None
-        if not latest:
-            continue
-        cohort.append((
-            repo.id,
-            latest.stars_delta_24h,
-            latest.forks_delta_24h,
-            latest.commits_7d,
-            latest.issue_events_7d,
-            repo.pushed_at_gh,
-        ))
-
-    if not cohort:
+
+async def score_changed_repos(session: AsyncSession) -> int:
+    """
+    Incremental run: score only repos with an unscored latest snapshot, normalized against the
+    stored sketches (falls back to a full run when there are none). Other repos keep their
+    scores until the next full run. Returns number of repos updated.
+    """
+    sketches = await load_sketches(session)
+    if set(sketches) != set(FEATURE_WEIGHTS):
+        return await score_and_filter_all(session)
+    repo_ids = await _changed_repo_ids(session)
+    if not repo_ids:
+        return 0
+    rows = await _load_scoring_rows(session, repo_ids)
+    if not rows:
         return 0
+    now = datetime.now(timezone.utc)
+    scores = score_features(_row_features(rows, now), sketch_quantiles(sketches))
+    return await _write_scores(session, rows, scores, now)
+
 
-    scores = compute_trend_scores(cohort)
-    score_by_id = {r_id: s for r_id, s in scores}
+async def score_repos(session: AsyncSession, full: bool | None = None) -> int:
+    """Full run when forced or when the sketches are older than SCORING_FULL_REFRESH_HOURS,
+    else incremental."""
+    if full is None:
+        refreshed = await session.scalar(select(func.min(ScoringFeatureSketch.refreshed_at)))
+        max_age = timedelta(hours=Settings().scoring_full_refresh_hours)
+        full = refreshed is None or datetime.now(timezone.utc) - refreshed >= max_age
+    if full:
+        return await score_and_filter_all(session)
+    return await score_changed_repos(session)
+
+
+async def score_categories(session: AsyncSession) -> int:
+    """Score every repo-category assignment against its category's cohort (per primary_language
+    with CATEGORY_SCORING_BY_LANGUAGE) and write repository_categories.category_trend_score in
+    bulk, in one transaction. Returns number of assignments updated."""
+    settings = Settings()
+    rows = await _load_scoring_rows(session)
+    if not rows:
+        return 0
+    now = datetime.now(timezone.utc)
+    features = _row_features(rows, now)
+    row_index = {r.id: i for i, r in enumerate(rows)}
 
-    for repo in repos_list:
-        if repo.id not in score_by_id:
+    result = await session.execute(
+        select(
+            RepositoryCategory.id,
+            RepositoryCategory.repository_id,
+            RepositoryCategory.category_id,
+            Repository.primary_language,
+        ).join(Repository, Repository.id == RepositoryCategory.repository_id)
+    )
+    # cohort -> (assignment ids, indexes into rows / feature columns)
+    members: dict[CohortKey, tuple[list[int], list[int]]] = defaultdict(lambda: ([], []))
+    for assignment_id, repo_id, category_id, language in result.all():
+        i = row_index.get(repo_id)
+        if i is None:  # no snapshots yet
             continue
-        score = score_by_id[repo.id]
-        snapshots = sorted(repo.trend_snapshots, key=lambda s: s.snapshot_at, reverse=True)
-        if snapshots:
-            snapshots[0].computed_trend_score = score
-        repo.current_trend_score = score
-        repo.stars_gained_30d = _stars_gained_in_window(repo.trend_snapshots, RECENT_DAYS)
-        repo.quality_passed = passes_quality_filters(repo)
+        ids, idx = members[(category_id, language if settings.category_scoring_by_language else None)]
+        ids.append(assignment_id)
+        idx.append(i)
+    if not members:
+        return 0
+
+    scores = score_cohorts(features, {key: np.asarray(idx, dtype=np.intp) for key, (_, idx) in members.items()})
+    updates = [
+        (assignment_id, round(score, 4))
+        for key, (ids, _) in members.items()
+        for assignment_id, score in zip(ids, scores[key].tolist())
+    ]
+    try:
+        for chunk in _chunks(updates):
+            v = values(column("id", BigInteger), column("score", Float), name="v").data(chunk)
+            await session.execute(
+                update(RepositoryCategory)
+                .where(RepositoryCategory.id == v.c.id)
+                .values(category_trend_score=v.c.score)
+            )
+        await session.commit()
+    except Exception:
+        await session.rollback()
+        raise
+    logger.info("score_categories: %s assignments in %s cohorts", len(updates), len(members))
+    return len(updates)
+
+
+async def _write_scores(
+    session: AsyncSession, rows: list[Any], scores: Any, now: datetime, full_cohort: bool = False
+) -> int:
+    """Bulk-write scores (array aligned with rows) and stars_gained_30d, and re-evaluate
+    quality_passed (all repos on a full run, else just these); one commit."""
+    windows = await compute_window_features(session, None if full_cohort else [r.id for r in rows], now)
+
+    repo_updates: list[tuple[Any, ...]] = []
+    snapshot_updates: list[tuple[Any, ...]] = []
+    for r, raw_score in zip(rows, scores.tolist()):
+        score = round(raw_score, 4)
+        repo_updates.append((r.id, score, windows[r.id].stars_gained_30d if r.id in windows else None))
+        if score != r.computed_trend_score:
+            snapshot_updates.append((r.snapshot_id, r.snapshot_at, score))
+
+    try:
+        for chunk in _chunks(repo_updates):
+            v = values(
+                column("id", BigInteger),
+                column("score", Float),
+                column("gained", Integer),
+                name="v",
+            ).data(chunk)
+            await session.execute(
+                update(Repository)
+                .where(Repository.id == v.c.id)
+                .values(current_trend_score=v.c.score, stars_gained_30d=v.c.gained)
+            )
+        for chunk in _chunks(snapshot_updates):
+            v = values(
+                column("id", BigInteger),
+                column("snapshot_at", DateTime(timezone=True)),
+                column("score", Float),
+                name="v",
+            ).data(chunk)
+            # snapshot_at in the predicate prunes to the partitions holding these snapshots
+            await session.execute(
+                update(TrendSnapshot)
+                .where(TrendSnapshot.id == v.c.id, TrendSnapshot.snapshot_at == v.c.snapshot_at)
+                .values(computed_trend_score=v.c.score)
+            )
+        # Rolled-up days carry the last snapshot score; re-aggregate the days whose score changed
+        await mark_days_dirty(session, {snapshot_at for _, snapshot_at, _ in snapshot_updates})
+        changed = await refresh_quality_passed(session, now, None if full_cohort else [r.id for r in rows])
         await session.commit()
-    return len(score_by_id)
+    except Exception:
+        await session.rollback()
+        raise
+    logger.info("quality_passed changed for %s repos", changed)
+    return len(repo_updates)
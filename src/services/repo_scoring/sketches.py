@@ -0,0 +1,67 @@
+"""Per-feature distribution sketches for incremental scoring (scoring_feature_sketches).
+
+A full scoring run stores 101 evenly spaced quantiles of each kernel feature, and every run
+normalizes a value by its quantile rank in the sketch, interpolated between stored points
+(scorer._rank_normalize). A single repo's star spike only moves the top sketch point, so it no
+longer rescales every other repo, and repos inside the top percentile still get distinct
+scores. Incremental runs rank against the stored sketch (values past it clip to 0 / 100), so
+a batch can be scored on its own.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import datetime
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.models.scoring import ScoringFeatureSketch
+
+SKETCH_POINTS = 101
+
+
+@dataclass
+class FeatureSketch:
+    quantiles: list[float]
+    sample_count: int
+    refreshed_at: datetime | None = None
+
+
+def build_sketch(values: np.ndarray) -> FeatureSketch:
+    quantiles = np.quantile(values, np.linspace(0.0, 1.0, SKETCH_POINTS)) if values.size else np.zeros(SKETCH_POINTS)
+    return FeatureSketch(quantiles=[float(q) for q in quantiles], sample_count=int(values.size))
+
+
+def sketch_quantiles(sketches: dict[str, FeatureSketch]) -> dict[str, list[float]]:
+    return {name: sk.quantiles for name, sk in sketches.items()}
+
+
+async def load_sketches(session: AsyncSession) -> dict[str, FeatureSketch]:
+    result = await session.execute(select(ScoringFeatureSketch))
+    return {
+        row.feature: FeatureSketch(list(row.quantiles), row.sample_count, row.refreshed_at)
+        for row in result.scalars().all()
+    }
+
+
+async def save_sketches(session: AsyncSession, sketches: dict[str, FeatureSketch], now: datetime) -> None:
+    """Upsert sketches (caller commits, together with the scores computed against them)."""
+    if not sketches:
+        return
+    ins = pg_insert(ScoringFeatureSketch).values([
+        {"feature": name, "quantiles": sk.quantiles, "sample_count": sk.sample_count, "refreshed_at": now}
+        for name, sk in sketches.items()
+    ])
+    await session.execute(
+        ins.on_conflict_do_update(
+            index_elements=["feature"],
+            set_={
+                "quantiles": ins.excluded.quantiles,
+                "sample_count": ins.excluded.sample_count,
+                "refreshed_at": ins.excluded.refreshed_at,
+            },
+        )
+    )
@@ -0,0 +1,99 @@
+"""Time-anchored snapshot deltas for a batch of repos in one query.
+
+For each repo we look up, as of now-1h, now-24h and now-7d, the latest snapshot at or before
+that instant (one LATERAL index probe on ix_trend_snapshots_repo_snapshot per anchor) and
+subtract it from the current counters. Deltas therefore mean "change over the last 24h"
+whatever the snapshot cadence, instead of "change since two snapshots ago". The probe only
+accepts a snapshot near the anchor, so a repo last seen days ago gets None rather than a
+multi-day gain reported as an hourly or daily delta.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import BigInteger, cast, func, select, true
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.models.repository import TrendSnapshot
+
+WINDOW_1H = timedelta(hours=1)
+WINDOW_24H = timedelta(hours=24)
+WINDOW_7D = timedelta(days=7)
+# Snapshots land a little early or late; accept one up to 10% younger than the window
+ANCHOR_TOLERANCE = 0.1
+# ... or up to 50% older (an hourly pass can start late or run long), but no older than that
+ANCHOR_STALE_TOLERANCE = 0.5
+
+
+@dataclass
+class SnapshotDeltas:
+    stars_delta_1h: int | None = None
+    stars_delta_24h: int | None = None
+    forks_delta_24h: int | None = None
+    stars_delta_7d: int | None = None
+
+
+def _anchor(now: datetime, window: timedelta) -> datetime:
+    return now - window * (1 - ANCHOR_TOLERANCE)
+
+
+def _anchor_floor(now: datetime, window: timedelta) -> datetime:
+    return now - window * (1 + ANCHOR_STALE_TOLERANCE)
+
+
+async def compute_snapshot_deltas(
+    session: AsyncSession,
+    current: dict[int, tuple[int, int]],
+    now: datetime | None = None,
+) -> dict[int, SnapshotDeltas]:
+    """current: {repo_id: (stars_count, forks_count)}. Returns {repo_id: SnapshotDeltas};
+    a delta is None when the repo has no snapshot near that window's anchor."""
+    if not current:
+        return {}
+    now = now or datetime.now(timezone.utc)
+    ids = (
+        func.unnest(cast(list(current), ARRAY(BigInteger)))
+        .table_valued("repo_id")
+        .render_derived(name="r")
+    )
+
+    def as_of(window: timedelta, name: str):
+        return (
+            select(TrendSnapshot.stars_count, TrendSnapshot.forks_count)
+            .where(
+                TrendSnapshot.repository_id == ids.c.repo_id,
+                TrendSnapshot.snapshot_at <= _anchor(now, window),
+                TrendSnapshot.snapshot_at >= _anchor_floor(now, window),
+            )
+            .order_by(TrendSnapshot.snapshot_at.desc())
+            .limit(1)
+            .lateral(name)
+        )
+
+    a1h = as_of(WINDOW_1H, "a1h")
+    a24h = as_of(WINDOW_24H, "a24h")
+    a7d = as_of(WINDOW_7D, "a7d")
+    stmt = select(
+        ids.c.repo_id,
+        a1h.c.stars_count,
+        a24h.c.stars_count,
+        a24h.c.forks_count,
+        a7d.c.stars_count,
+    ).select_from(
+        ids.outerjoin(a1h, true()).outerjoin(a24h, true()).outerjoin(a7d, true())
+    )
+    result = await session.execute(stmt)
+
+    out: dict[int, SnapshotDeltas] = {}
+    for repo_id, stars_1h, stars_24h, forks_24h, stars_7d in result.all():
+        stars, forks = current[repo_id]
+        out[repo_id] = SnapshotDeltas(
+            stars_delta_1h=stars - stars_1h if stars_1h is not None else None,
+            stars_delta_24h=stars - stars_24h if stars_24h is not None else None,
+            forks_delta_24h=forks - forks_24h if forks_24h is not None else None,
+            stars_delta_7d=stars - stars_7d if stars_7d is not None else None,
+        )
+    return out
@@ -1,84 +1,149 @@
-"""Async GitHub API client with rate-limit tracking, retry, and semaphore-based concurrency."""
+"""Async GitHub API client with token-pool rate-limit scheduling, retry, and semaphore-based concurrency."""
 
 from __future__ import annotations
 
 import asyncio
 import logging
-import time
+from datetime import datetime, timedelta, timezone
 from typing import Any
 
 import httpx
 
 from src.config import Settings
+from src.services.trend_ingestion.http_pool import get_http_client
+from src.services.trend_ingestion.rate_limiter import RateLimitScheduler
+from src.services.trend_ingestion.response_cache import CachedResponse, ResponseCache
 
 logger = logging.getLogger(__name__)
 
 GITHUB_API_BASE = "https://api.github.com"
-CORE_LOW_THRESHOLD = 50
-SEARCH_LOW_THRESHOLD = 1
 MAX_CONCURRENT = 5
 RETRY_STATUSES = (403, 429)
-INITIAL_BACKOFF = 60
-MAX_BACKOFF = 600
+GRAPHQL_MAX_BATCH = 50
+GRAPHQL_LANGUAGES_FIRST = 20
+GRAPHQL_TOPICS_FIRST = 20
+COMMIT_HISTORY_DAYS = 7
+# GraphQL has no /readme equivalent; probe the common README blob names in order (repos
+# matching none of them fall back to REST /readme, which resolves any name and location).
+README_CANDIDATES = ("README.md", "readme.md", "README.rst", "README.txt", "README")
+
+GRAPHQL_REPO_FIELDS = """
+fragment RepoFields on Repository {
+  databaseId
+  name
+  nameWithOwner
+  owner { login }
+  description
+  url
+  homepageUrl
+  primaryLanguage { name }
+  repositoryTopics(first: %(topics)d) { nodes { topic { name } } }
+  licenseInfo { spdxId }
+  stargazerCount
+  forkCount
+  openIssues: issues(states: OPEN) { totalCount }
+  openPullRequests: pullRequests(states: OPEN) { totalCount }
+  createdAt
+  pushedAt
+  isFork
+  isArchived
+  mirrorUrl
+  defaultBranchRef {
+    name
+    target { ... on Commit { history(since: $since) { totalCount } } }
+  }
+  languages(first: %(languages)d, orderBy: {field: SIZE, direction: DESC}) {
+    edges { size node { name } }
+  }
+%(readmes)s
+}
+""" % {
+    "topics": GRAPHQL_TOPICS_FIRST,
+    "languages": GRAPHQL_LANGUAGES_FIRST,
+    "readmes": "\n".join(
+        f'  readme{i}: object(expression: "HEAD:{fname}") {{ ... on Blob {{ oid }} }}'
+        for i, fname in enumerate(README_CANDIDATES)
+    ),
+}
+
+
+def _resource_for(path: str, is_search: bool) -> str:
+    if is_search:
+        return "search"
+    if path == "/graphql":
+        return "graphql"
+    return "core"
 
 
 class GitHubClient:
-    """Async httpx client for GitHub API with rate-limit handling and retries."""
+    """Async httpx client for GitHub API with rate-limit handling and retries.
+
+    Requests are spread over a pool of tokens (GITHUB_TOKEN plus GITHUB_TOKENS) by a
+    RateLimitScheduler, which admits each request on the token whose core/search/graphql
+    bucket allows it soonest, paced to last until x-ratelimit-reset.
+    """
 
     def __init__(
         self,
         token: str | None = None,
         max_concurrent: int = MAX_CONCURRENT,
+        tokens: list[str] | None = None,
     ) -> None:
         settings = Settings()
-        self._token = token or settings.github_token
+        self._settings = settings
+        if tokens is None:
+            tokens = [token] if token else settings.github_token_pool
+        self._scheduler = RateLimitScheduler(list(tokens) or [None], max_burst=settings.github_max_burst)
         self._semaphore = asyncio.Semaphore(max_concurrent)
-        self._core_remaining: int | None = None
-        self._core_reset: int | None = None
-        self._search_remaining: int | None = None
-        self._search_reset: int | None = None
         self._client: httpx.AsyncClient | None = None
+        self._cache: ResponseCache | None = None
+        # Repos whose /stats endpoints answered 202 (GitHub still computing); see stats_queue
+        self.stats_pending: set[str] = set()
+
+    @property
+    def has_token(self) -> bool:
+        """True if requests are authenticated (required for the GraphQL API)."""
+        return any(self._scheduler.tokens)
+
+    @property
+    def token_budgets(self) -> list[dict[str, Any]]:
+        """Per-token remaining/reset snapshot (tokens masked) for logging and metrics."""
+        return self._scheduler.budgets()
+
+    @property
+    def rate_limit_stats(self) -> dict[str, dict[str, Any]]:
+        """Scheduler state per resource: tokens available, queue depth, wait time."""
+        return self._scheduler.stats()
 
     async def __aenter__(self) -> "GitHubClient":
         headers: dict[str, str] = {
             "Accept": "application/vnd.github.v3+json",
             "User-Agent": "github-intel-ingestion",
         }
-        if self._token:
-            headers["Authorization"] = f"Bearer {self._token}"
-        self._client = httpx.AsyncClient(
-            base_url=GITHUB_API_BASE,
-            headers=headers,
-            timeout=30.0,
-        )
+        # Pooled per event loop and shared with other GitHubClients: reuses warm connections
+        self._client = get_http_client(GITHUB_API_BASE, headers=headers, timeout=30.0)
+        if self._settings.github_response_cache_enabled:
+            self._cache = ResponseCache(
+                self._settings.redis_url, self._settings.github_response_cache_ttl_seconds
+            )
         return self
 
     async def __aexit__(self, *args: Any) -> None:
-        if self._client:
-            await self._client.aclose()
-            self._client = None
-
-    def _update_rate_limits(self, response: httpx.Response) -> None:
-        def parse_int(name: str) -> int | None:
-            v = response.headers.get(name)
-            return int(v) if v is not None else None
-
-        self._core_remaining = parse_int("x-ratelimit-remaining")
-        self._core_reset = parse_int("x-ratelimit-reset")
-        # Search has its own limit; same headers but for search endpoint
-        if "/search/" in str(response.request.url):
-            self._search_remaining = parse_int("x-ratelimit-remaining")
-            self._search_reset = parse_int("x-ratelimit-reset")
-
-    async def _wait_if_low_limit(self, is_search: bool) -> None:
-        remaining = self._search_remaining if is_search else self._core_remaining
-        reset = self._search_reset if is_search else self._core_reset
-        threshold = SEARCH_LOW_THRESHOLD if is_search else CORE_LOW_THRESHOLD
-        if remaining is not None and remaining < threshold and reset is not None:
-            wait = max(0, reset - int(time.time())) + 5
-            if wait > 0:
-                logger.warning("Rate limit low (%s): sleeping %ds", "search" if is_search else "core", wait)
-                await asyncio.sleep(min(wait, 300))
+        logger.debug("GitHub rate-limit scheduler: %s", self.rate_limit_stats)
+        self._client = None
+        if self._cache:
+            stats = self.cache_stats
+            if stats["hits"] or stats["misses"]:
+                logger.info("GitHub response cache: %s hits, %s misses", stats["hits"], stats["misses"])
+            await self._cache.aclose()
+            self._cache = None
+
+    @property
+    def cache_stats(self) -> dict[str, int]:
+        """Conditional-request cache hits (304 served from cache) and misses for this client."""
+        if not self._cache:
+            return {"hits": 0, "misses": 0}
+        return {"hits": self._cache.hits, "misses": self._cache.misses}
 
     async def _request(
         self,
@@ -86,18 +151,38 @@ class GitHubClient:
         path: str,
         *,
         is_search: bool = False,
+        conditional: bool = False,
         **kwargs: Any,
     ) -> httpx.Response:
         if not self._client:
             raise RuntimeError("Client not started; use async with GitHubClient()")
-        await self._semaphore.acquire()
-        try:
-            await self._wait_if_low_limit(is_search)
+        resource = _resource_for(path, is_search)
+        token = await self._scheduler.acquire(resource)
+        headers = dict(kwargs.get("headers") or {})
+        cache_key: str | None = None
+        cached: CachedResponse | None = None
+        if conditional and self._cache is not None:
+            # Keyed on the token actually used: a retry may be admitted on a different token
+            cache_key = ResponseCache.key(path, kwargs.get("params"), token)
+            cached = await self._cache.get(cache_key)
+            if cached is not None:
+                headers.update(cached.validators())
+        if token:
+            headers["Authorization"] = f"Bearer {token}"
+        kwargs["headers"] = headers
+        async with self._semaphore:
             response = await self._client.request(method, path, **kwargs)
-            self._update_rate_limits(response)
-            return response
-        finally:
-            self._semaphore.release()
+        rate_limited = self._scheduler.observe(token, resource, response)
+        if cache_key is not None and self._cache is not None:
+            if response.status_code == 304 and cached is not None:
+                await self._cache.record(hit=True)
+                response = cached.to_response(response.request)
+            else:
+                await self._cache.record(hit=False)
+                if response.status_code == 200:
+                    await self._cache.put(cache_key, response)
+        response.extensions["rate_limited"] = rate_limited
+        return response
 
     async def get_with_retry(
         self,
@@ -107,20 +192,39 @@ class GitHubClient:
         max_retries: int = 3,
         **kwargs: Any,
     ) -> httpx.Response:
-        backoff = INITIAL_BACKOFF
+        # Conditional request when the cache is on: a 304 costs no rate limit and is answered
+        # from the entry cached for the same token
+        return await self._request_with_retry(
+            "GET",
+            path,
+            is_search=is_search,
+            max_retries=max_retries,
+            conditional=self._cache is not None,
+            **kwargs,
+        )
+
+    async def _request_with_retry(
+        self,
+        method: str,
+        path: str,
+        *,
+        is_search: bool = False,
+        max_retries: int = 3,
+        conditional: bool = False,
+        **kwargs: Any,
+    ) -> httpx.Response:
         for attempt in range(max_retries + 1):
-            response = await self._request("GET", path, is_search=is_search, **kwargs)
-            if response.status_code not in RETRY_STATUSES:
-                response.raise_for_status()
-                return response
-            if attempt == max_retries:
-                response.raise_for_status()
+            response = await self._request(
+                method, path, is_search=is_search, conditional=conditional, **kwargs
+            )
+            if response.status_code == 304:
                 return response
-            reset = self._core_reset or (int(time.time()) + 60)
-            wait = max(backoff, reset - int(time.time()) + 5)
-            logger.warning("GitHub rate limit (attempt %s): sleeping %ds", attempt + 1, wait)
-            await asyncio.sleep(min(wait, MAX_BACKOFF))
-            backoff = min(backoff * 2, MAX_BACKOFF)
+            if response.status_code in RETRY_STATUSES and response.extensions.get("rate_limited"):
+                if attempt < max_retries:
+                    # The scheduler has blocked that bucket; the next acquire waits or switches token
+                    continue
+            response.raise_for_status()
+            return response
         return response
 
     async def get_repo(self, owner: str, repo: str) -> dict[str, Any]:
@@ -128,14 +232,18 @@ class GitHubClient:
         r = await self.get_with_retry(f"/repos/{owner}/{repo}")
         return r.json()
 
-    async def get_readme(self, owner: str, repo: str) -> tuple[str | None, str | None]:
-        """GET /repos/{owner}/{repo}/readme. Returns (content_base64_or_none, encoding)."""
-        r = await self.get_with_retry(f"/repos/{owner}/{repo}/readme")
-        if r.status_code == 404:
-            return None, None
-        r.raise_for_status()
+    async def get_readme(self, owner: str, repo: str) -> tuple[str | None, str | None, str | None]:
+        """GET /repos/{owner}/{repo}/readme. Returns (content_base64_or_none, encoding, blob_sha);
+        all None when the repo has no README (404). Other errors raise."""
+        try:
+            r = await self.get_with_retry(f"/repos/{owner}/{repo}/readme")
+        except httpx.HTTPStatusError as e:
+            # get_with_retry raises for 4xx; a 404 is an answer (README deleted or never added)
+            if e.response.status_code == 404:
+                return None, None, None
+            raise
         data = r.json()
-        return data.get("content"), data.get("encoding")
+        return data.get("content"), data.get("encoding"), data.get("sha")
 
     async def get_languages(self, owner: str, repo: str) -> dict[str, int] | None:
         """GET /repos/{owner}/{repo}/languages."""
@@ -146,9 +254,14 @@ class GitHubClient:
         return r.json()
 
     async def get_commit_activity(self, owner: str, repo: str) -> list[dict[str, Any]] | None:
-        """GET /repos/{owner}/{repo}/stats/commit_activity. Returns weekly activity or None."""
+        """GET /repos/{owner}/{repo}/stats/commit_activity. Returns weekly activity or None
+        (on 202 the repo is also added to stats_pending)."""
         r = await self.get_with_retry(f"/repos/{owner}/{repo}/stats/commit_activity")
-        if r.status_code in (202, 204):
+        if r.status_code == 202:
+            # Computing in the background; record it so the caller can retry later
+            self.stats_pending.add(f"{owner}/{repo}")
+            return None
+        if r.status_code == 204:
             return None
         if r.status_code == 404:
             return None
@@ -163,3 +276,78 @@ class GitHubClient:
             is_search=True,
         )
         return r.json()
+
+    async def graphql(self, query: str, variables: dict[str, Any] | None = None) -> dict[str, Any]:
+        """POST /graphql. Returns the `data` object; partial errors (e.g. NOT_FOUND aliases) are logged."""
+        if not self.has_token:
+            raise RuntimeError("GitHub GraphQL API requires a token")
+        r = await self._request_with_retry(
+            "POST", "/graphql", json={"query": query, "variables": variables or {}}
+        )
+        payload = r.json()
+        errors = payload.get("errors") or []
+        data = payload.get("data")
+        if data is None:
+            raise RuntimeError(f"GraphQL query failed: {errors}")
+        for err in errors:
+            logger.debug("GraphQL partial error: %s", err.get("message"))
+        return data
+
+    async def get_repos_graphql(self, full_names: list[str]) -> dict[str, dict[str, Any]]:
+        """Fetch metadata, README blob sha, languages and 7-day commit count for up to
+        GRAPHQL_MAX_BATCH repos in one aliased query. Returns {full_name: repository node};
+        repos that don't exist (or are inaccessible) are omitted."""
+        if len(full_names) > GRAPHQL_MAX_BATCH:
+            raise ValueError(f"At most {GRAPHQL_MAX_BATCH} repos per GraphQL batch")
+        var_defs: list[str] = ["$since: GitTimestamp!"]
+        fields: list[str] = []
+        variables: dict[str, Any] = {
+            "since": (datetime.now(timezone.utc) - timedelta(days=COMMIT_HISTORY_DAYS)).isoformat(),
+        }
+        aliases: dict[str, str] = {}
+        for i, full_name in enumerate(full_names):
+            parts = full_name.split("/", 1)
+            if len(parts) != 2:
+                continue
+            alias = f"r{i}"
+            aliases[alias] = full_name
+            var_defs.extend([f"$o{i}: String!", f"$n{i}: String!"])
+            variables[f"o{i}"], variables[f"n{i}"] = parts
+            fields.append(f"  {alias}: repository(owner: $o{i}, name: $n{i}) {{ ...RepoFields }}")
+        if not aliases:
+            return {}
+        query = f"query({', '.join(var_defs)}) {{\n" + "\n".join(fields) + "\n}\n" + GRAPHQL_REPO_FIELDS
+        data = await self.graphql(query, variables)
+        return {full_name: data[alias] for alias, full_name in aliases.items() if data.get(alias)}
+
+    async def get_blob_texts_graphql(self, blobs: dict[str, str]) -> dict[str, str]:
+        """Fetch blob text by git object id for {full_name: oid} (up to GRAPHQL_MAX_BATCH) in one
+        aliased query. Returns {full_name: text}; binary or missing blobs are omitted."""
+        if len(blobs) > GRAPHQL_MAX_BATCH:
+            raise ValueError(f"At most {GRAPHQL_MAX_BATCH} blobs per GraphQL batch")
+        var_defs: list[str] = []
+        fields: list[str] = []
+        variables: dict[str, Any] = {}
+        aliases: dict[str, str] = {}
+        for i, (full_name, oid) in enumerate(blobs.items()):
+            parts = full_name.split("/", 1)
+            if len(parts) != 2:
+                continue
+            alias = f"b{i}"
+            aliases[alias] = full_name
+            var_defs.extend([f"$o{i}: String!", f"$n{i}: String!", f"$s{i}: GitObjectID!"])
+            variables[f"o{i}"], variables[f"n{i}"] = parts
+            variables[f"s{i}"] = oid
+            fields.append(
+                f"  {alias}: repository(owner: $o{i}, name: $n{i}) {{ object(oid: $s{i}) {{ ... on Blob {{ text }} }} }}"
+            )
+        if not aliases:
+            return {}
+        query = f"query({', '.join(var_defs)}) {{\n" + "\n".join(fields) + "\n}\n"
+        data = await self.graphql(query, variables)
+        out: dict[str, str] = {}
+        for alias, full_name in aliases.items():
+            text = ((data.get(alias) or {}).get("object") or {}).get("text")
+            if text:
+                out[full_name] = text
+        return out
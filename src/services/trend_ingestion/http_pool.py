@@ -0,0 +1,76 @@
+"""Process-level registry of pooled httpx clients: one per base URL per event loop.
+
+Opening an httpx.AsyncClient per task (or per page) pays a TCP + TLS handshake every time
+and never reuses a connection. Clients here live as long as their event loop, are shared
+by every GitHubClient / scraper call on that loop, and speak HTTP/2 when h2 is installed
+so many small API calls multiplex over a few connections. Clients are bound to the loop
+that created them (their connections are), so the registry is keyed by loop too.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import weakref
+
+import httpx
+
+from src.config import Settings
+
+logger = logging.getLogger(__name__)
+
+_clients: weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, dict[str, httpx.AsyncClient]] = (
+    weakref.WeakKeyDictionary()
+)
+_warned_no_http2 = False
+
+
+def _http2_available() -> bool:
+    global _warned_no_http2
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        if not _warned_no_http2:
+            logger.warning("HTTP/2 requested but h2 is not installed (pip install 'httpx[http2]'); using HTTP/1.1")
+            _warned_no_http2 = True
+        return False
+    return True
+
+
+def get_http_client(
+    base_url: str,
+    *,
+    timeout: float = 30.0,
+    headers: dict[str, str] | None = None,
+    follow_redirects: bool = False,
+) -> httpx.AsyncClient:
+    """Shared client for base_url on the running event loop; created on first use. Options only
+    apply to the first call per base URL and loop. Callers must not close the returned client."""
+    loop = asyncio.get_running_loop()
+    per_loop = _clients.setdefault(loop, {})
+    client = per_loop.get(base_url)
+    if client is not None and not client.is_closed:
+        return client
+    settings = Settings()
+    client = httpx.AsyncClient(
+        base_url=base_url,
+        headers=headers,
+        timeout=timeout,
+        follow_redirects=follow_redirects,
+        http2=settings.http2_enabled and _http2_available(),
+        limits=httpx.Limits(
+            max_connections=settings.http_max_connections,
+            max_keepalive_connections=settings.http_max_keepalive_connections,
+            keepalive_expiry=settings.http_keepalive_expiry_seconds,
+        ),
+    )
+    per_loop[base_url] = client
+    return client
+
+
+async def aclose_http_clients() -> None:
+    """Close every pooled client on the running loop (worker shutdown, scripts, tests)."""
+    per_loop = _clients.pop(asyncio.get_running_loop(), {})
+    for client in per_loop.values():
+        await client.aclose()
+
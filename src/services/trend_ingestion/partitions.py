@@ -0,0 +1,144 @@
+"""Daily range partitions of trend_snapshots (partitioned on snapshot_at, UTC days).
+
+Partitions are created ahead of time before each ingestion pass and cleanup run, and retention
+detaches and drops whole expired partitions instead of deleting rows, so it costs the same
+however many snapshots a day holds. Partition names carry their day: trend_snapshots_pYYYYMMDD.
+A DEFAULT partition catches rows for days that have no partition yet (a writer outside
+ingestion, or a pass that starts after its partitions ran out); ensure_snapshot_partitions
+moves them into their day's partition, so retention drops them with it. Partition DDL runs
+under a transaction-scoped advisory lock, so concurrent workers don't race on it, and a
+failure is logged rather than raised: the default partition keeps inserts working meanwhile.
+"""
+
+from __future__ import annotations
+
+import logging
+from datetime import date, datetime, time, timedelta, timezone
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+logger = logging.getLogger(__name__)
+
+PARENT_TABLE = "trend_snapshots"
+PARTITION_PREFIX = "trend_snapshots_p"
+DEFAULT_PARTITION = "trend_snapshots_default"
+# pg_advisory_xact_lock key serializing partition DDL across workers ("tsnp")
+PARTITION_LOCK_KEY = 0x74736E70
+
+
+def partition_name(day: date) -> str:
+    return f"{PARTITION_PREFIX}{day:%Y%m%d}"
+
+
+def partition_day(name: str) -> date | None:
+    """Day covered by a partition named by partition_name(), else None."""
+    if not name.startswith(PARTITION_PREFIX):
+        return None
+    try:
+        return datetime.strptime(name[len(PARTITION_PREFIX):], "%Y%m%d").date()
+    except ValueError:
+        return None
+
+
+def _day_start(day: date) -> datetime:
+    return datetime.combine(day, time.min, tzinfo=timezone.utc)
+
+
+async def list_snapshot_partitions(session: AsyncSession) -> list[str]:
+    result = await session.execute(
+        text(
+            "SELECT c.relname FROM pg_inherits i "
+            "JOIN pg_class c ON c.oid = i.inhrelid "
+            "JOIN pg_class p ON p.oid = i.inhparent "
+            "WHERE p.relname = :parent"
+        ),
+        {"parent": PARENT_TABLE},
+    )
+    return [r[0] for r in result.all()]
+
+
+async def _default_partition_days(session: AsyncSession) -> set[date]:
+    result = await session.execute(
+        text(f"SELECT DISTINCT (snapshot_at AT TIME ZONE 'UTC')::date FROM {DEFAULT_PARTITION}")
+    )
+    return {r[0] for r in result.all()}
+
+
+async def _create_partition(session: AsyncSession, day: date, from_default: bool) -> None:
+    name = partition_name(day)
+    start, end = _day_start(day), _day_start(day + timedelta(days=1))
+    bounds = f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+    if not from_default:
+        await session.execute(text(f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF {PARENT_TABLE} {bounds}"))
+        return
+    # The default partition holds rows for this day, so PARTITION OF would fail: build the table
+    # standalone, move the day's rows out of the default, then attach it (indexes, primary key
+    # and foreign key are cloned from the parent on attach)
+    await session.execute(text(f"CREATE TABLE IF NOT EXISTS {name} (LIKE {PARENT_TABLE} INCLUDING DEFAULTS)"))
+    await session.execute(
+        text(
+            f"WITH moved AS (DELETE FROM {DEFAULT_PARTITION} WHERE snapshot_at >= :start AND snapshot_at < :end "
+            f"RETURNING *) INSERT INTO {name} SELECT * FROM moved"
+        ),
+        {"start": start, "end": end},
+    )
+    await session.execute(text(f"ALTER TABLE {PARENT_TABLE} ATTACH PARTITION {name} {bounds}"))
+
+
+async def _missing_partitions(session: AsyncSession, days_ahead: int, today: date) -> tuple[list[date], set[date]]:
+    """(days needing a partition, days with rows in the default partition)."""
+    existing = set(await list_snapshot_partitions(session))
+    in_default = await _default_partition_days(session) if DEFAULT_PARTITION in existing else set()
+    days = {today + timedelta(days=offset) for offset in range(days_ahead + 1)} | in_default
+    return sorted(day for day in days if partition_name(day) not in existing), in_default
+
+
+async def ensure_snapshot_partitions(session: AsyncSession, days_ahead: int, today: date | None = None) -> int:
+    """Create any missing daily partitions from today through today + days_ahead, plus one for
+    every day with rows in the default partition (moving those rows into it). Existing
+    partitions are looked up first so the common case runs no DDL; otherwise the DDL runs in
+    one transaction under PARTITION_LOCK_KEY (call with no pending work in session). Never
+    raises. Returns partitions created."""
+    today = today or datetime.now(timezone.utc).date()
+    try:
+        missing, _ = await _missing_partitions(session, days_ahead, today)
+        if not missing:
+            return 0
+        await session.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": PARTITION_LOCK_KEY})
+        # Look again under the lock: another worker may have created them while we waited
+        missing, in_default = await _missing_partitions(session, days_ahead, today)
+        for day in missing:
+            await _create_partition(session, day, day in in_default)
+        await session.commit()
+    except Exception as e:
+        await session.rollback()
+        logger.warning("Failed to create trend_snapshots partitions (new rows go to the default partition): %s", e)
+        return 0
+    if missing:
+        logger.info("Created %s trend_snapshots partitions (%s .. %s)", len(missing), missing[0], missing[-1])
+    if in_default:
+        logger.info("Moved trend_snapshots rows for %s days out of the default partition", len(in_default))
+    return len(missing)
+
+
+async def drop_expired_snapshot_partitions(session: AsyncSession, cutoff: datetime) -> list[str]:
+    """Detach and drop partitions whose whole day ends at or before cutoff. Each partition is its
+    own short transaction; the day that straddles cutoff is kept until it fully expires."""
+    dropped: list[str] = []
+    for name in sorted(await list_snapshot_partitions(session)):
+        day = partition_day(name)
+        if day is None or _day_start(day + timedelta(days=1)) > cutoff:
+            continue
+        try:
+            await session.execute(text(f"ALTER TABLE {PARENT_TABLE} DETACH PARTITION {name}"))
+            await session.execute(text(f"DROP TABLE {name}"))
+            await session.commit()
+        except Exception as e:
+            await session.rollback()
+            logger.warning("Failed to drop expired partition %s: %s", name, e)
+            continue
+        dropped.append(name)
+    if dropped:
+        logger.info("Dropped %s expired trend_snapshots partitions (%s .. %s)", len(dropped), dropped[0], dropped[-1])
+    return dropped
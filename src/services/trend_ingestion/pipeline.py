@@ -0,0 +1,467 @@
+"""Staged ingestion pipeline: discover → plan → fetch → transform → write over bounded queues.
+
+Stages run concurrently and hand work downstream through bounded asyncio queues, so GitHub
+fetches overlap DB writes, and a run that discovers tens of thousands of repos only holds a
+few batches in memory: a full queue blocks the stage feeding it.
+
+  discover   iterable / async iterable of RepoJob (trending names, search items, planner stream)
+  plan       batches jobs, reads stored state in one query per batch and routes each job:
+               stored metadata still fresh  -> write (snapshot from stored counters)
+               search item, no push since   -> transform (no API calls; stored commits_7d)
+               everything else              -> fetch
+  fetch      network only: REST per repo, or one GraphQL query per batch
+  transform  payloads -> (row, commits_7d) via repo_from_api / decode_readme
+  write      multi-row upserts in batches
+
+The AsyncSession isn't safe for concurrent use, so plan and write take turns on one lock.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from collections.abc import AsyncIterable, Awaitable, Callable, Iterable
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Any
+
+from src.config import Settings
+from src.services.trend_ingestion.github_client import GitHubClient
+from src.services.trend_ingestion.transform import (
+    README_MAX_CHARS,
+    commits_7d_from_activity,
+    decode_readme,
+    keep_stored_readme,
+    parse_iso,
+    repo_from_api,
+    repo_from_graphql,
+)
+
+logger = logging.getLogger(__name__)
+
+# A stage with a partial batch flushes it after this long without new input
+FLUSH_INTERVAL_SECONDS = 0.5
+STATS_LOG_INTERVAL_SECONDS = 30.0
+GRAPHQL_FETCH_WORKERS = 2
+
+_DONE = object()
+
+RepoRow = tuple[dict[str, Any], int | None]
+
+
+@dataclass
+class StoredRepoState:
+    """Stored columns the plan stage routes on; enough to snapshot a fresh repo without the ORM."""
+
+    id: int
+    full_name: str
+    stars_count: int
+    forks_count: int
+    open_issues_count: int
+    watchers_count: int
+    pushed_at_gh: datetime
+    readme_sha: str | None
+    updated_at: datetime
+    commits_7d: int | None = None  # latest known from the last week's snapshots
+
+
+@dataclass
+class RepoJob:
+    """One repo moving through the pipeline; fetch fills in the raw payloads transform reads."""
+
+    full_name: str
+    item: dict[str, Any] | None = None  # search payload (same shape as /repos) if discovered via search
+    stored: StoredRepoState | None = None
+    enrich: bool = True  # False: upsert the payload only, keep stored README / languages
+    repo: dict[str, Any] | None = None
+    node: dict[str, Any] | None = None
+    readme: tuple[str | None, str | None, str | None] | None = None
+    readme_failed: bool = False
+    readme_text: str | None = None
+    languages: dict[str, int] | None = None
+    activity: list[dict[str, Any]] | None = None
+
+
+@dataclass
+class StageStats:
+    name: str
+    workers: int
+    queue: asyncio.Queue[Any] | None = field(default=None, repr=False)  # the stage's inbox
+    processed: int = 0
+    failed: int = 0
+    busy_seconds: float = 0.0
+    max_queue_depth: int = 0
+
+    @property
+    def queue_depth(self) -> int:
+        return self.queue.qsize() if self.queue is not None else 0
+
+    def sample(self) -> None:
+        self.max_queue_depth = max(self.max_queue_depth, self.queue_depth)
+
+    def as_dict(self, elapsed: float) -> dict[str, Any]:
+        return {
+            "workers": self.workers,
+            "processed": self.processed,
+            "failed": self.failed,
+            "queue_depth": self.queue_depth,
+            "max_queue_depth": self.max_queue_depth,
+            "busy_seconds": round(self.busy_seconds, 2),
+            "per_second": round(self.processed / elapsed, 2) if elapsed > 0 else 0.0,
+        }
+
+
+class IngestionPipeline:
+    """One ingestion run. The service supplies the DB side: state lookup, batch writers that return
+    the full names they committed, and an optional checkpoint called with those names."""
+
+    def __init__(
+        self,
+        client: GitHubClient,
+        settings: Settings,
+        load_state: Callable[[list[str]], Awaitable[dict[str, StoredRepoState]]],
+        write_rows: Callable[[list[RepoRow]], Awaitable[list[str]]],
+        write_snapshots: Callable[[list[StoredRepoState]], Awaitable[list[str]]],
+        checkpoint: Callable[[list[str]], Awaitable[None]] | None = None,
+    ) -> None:
+        self._client = client
+        self._load_state = load_state
+        self._write_rows = write_rows
+        self._write_snapshots = write_snapshots
+        self._checkpoint = checkpoint
+        self._batch_size = settings.ingest_write_batch_size
+        self._cache_hours = settings.repo_metadata_cache_hours
+        self._use_graphql = settings.github_fetch_mode == "graphql"
+        if self._use_graphql and not settings.github_token_pool:
+            logger.warning("github_fetch_mode=graphql requires GITHUB_TOKEN; falling back to REST")
+            self._use_graphql = False
+        self._graphql_batch = settings.github_graphql_batch_size
+        self._fetch_workers = GRAPHQL_FETCH_WORKERS if self._use_graphql else settings.github_ingest_concurrency
+        self._db_lock = asyncio.Lock()
+        self._stages: dict[str, StageStats] = {}
+        self._started = 0.0
+        self.written = 0
+
+    def stats(self) -> dict[str, dict[str, Any]]:
+        """Per-stage counters: items processed/failed, queue depth, busy time and throughput."""
+        elapsed = time.monotonic() - self._started if self._started else 0.0
+        return {name: st.as_dict(elapsed) for name, st in self._stages.items()}
+
+    async def run(self, jobs: Iterable[RepoJob] | AsyncIterable[RepoJob]) -> int:
+        """Drive jobs through every stage; returns repos written (upserted or snapshotted)."""
+        self._started = time.monotonic()
+        discovered: asyncio.Queue[Any] = asyncio.Queue(maxsize=self._batch_size * 2)
+        to_fetch: asyncio.Queue[Any] = asyncio.Queue(
+            maxsize=max(self._fetch_workers * 4, self._graphql_batch * 2 if self._use_graphql else 0)
+        )
+        to_transform: asyncio.Queue[Any] = asyncio.Queue(maxsize=self._batch_size * 2)
+        to_write: asyncio.Queue[Any] = asyncio.Queue(maxsize=self._batch_size * 2)
+        self._stages = {
+            "discover": StageStats("discover", 1),
+            "plan": StageStats("plan", 1, discovered),
+            "fetch": StageStats("fetch", self._fetch_workers, to_fetch),
+            "transform": StageStats("transform", 1, to_transform),
+            "write": StageStats("write", 1, to_write),
+        }
+        fetch_worker = self._fetch_graphql_worker if self._use_graphql else self._fetch_rest_worker
+
+        async def fetch_stage() -> None:
+            async with asyncio.TaskGroup() as workers:
+                for _ in range(self._fetch_workers):
+                    workers.create_task(fetch_worker(to_fetch, to_transform))
+            await to_transform.put(_DONE)
+
+        monitor = asyncio.create_task(self._monitor())
+        try:
+            async with asyncio.TaskGroup() as tg:
+                tg.create_task(self._discover(jobs, discovered))
+                tg.create_task(self._plan(discovered, to_fetch, to_transform, to_write))
+                tg.create_task(fetch_stage())
+                tg.create_task(self._transform(to_transform, to_write))
+                tg.create_task(self._write(to_write))
+        finally:
+            monitor.cancel()
+        logger.info("Ingestion pipeline stages: %s", self.stats())
+        return self.written
+
+    async def _monitor(self) -> None:
+        elapsed = 0.0
+        while True:
+            await asyncio.sleep(1.0)
+            for st in self._stages.values():
+                st.sample()
+            elapsed += 1.0
+            if elapsed >= STATS_LOG_INTERVAL_SECONDS:
+                elapsed = 0.0
+                logger.info(
+                    "Ingestion pipeline: %s",
+                    ", ".join(
+                        f"{name} {st.processed} (q {st.queue_depth})" for name, st in self._stages.items()
+                    ),
+                )
+
+    async def _discover(self, jobs: Iterable[RepoJob] | AsyncIterable[RepoJob], out: asyncio.Queue[Any]) -> None:
+        st = self._stages["discover"]
+        if isinstance(jobs, AsyncIterable):
+            async for job in jobs:
+                await out.put(job)
+                st.processed += 1
+        else:
+            for job in jobs:
+                await out.put(job)
+                st.processed += 1
+        await out.put(_DONE)
+
+    async def _take_batch(self, inbox: asyncio.Queue[Any], size: int) -> tuple[list[Any], bool]:
+        """Wait for one item, then keep collecting until size items or FLUSH_INTERVAL_SECONDS of
+        silence. Returns (items, done) where done means the end-of-stream marker was reached."""
+        first = await inbox.get()
+        if first is _DONE:
+            return [], True
+        batch = [first]
+        while len(batch) < size:
+            try:
+                item = await asyncio.wait_for(inbox.get(), FLUSH_INTERVAL_SECONDS)
+            except TimeoutError:
+                break
+            if item is _DONE:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    async def _plan(
+        self,
+        inbox: asyncio.Queue[Any],
+        to_fetch: asyncio.Queue[Any],
+        to_transform: asyncio.Queue[Any],
+        to_write: asyncio.Queue[Any],
+    ) -> None:
+        st = self._stages["plan"]
+        seen: set[str] = set()
+        cutoff = datetime.now(timezone.utc) - timedelta(hours=self._cache_hours)
+        week_ago = datetime.now(timezone.utc) - timedelta(days=7)
+        done = False
+        while not done:
+            batch, done = await self._take_batch(inbox, self._batch_size)
+            jobs: list[RepoJob] = []
+            for job in batch:
+                if job.full_name not in seen and "/" in job.full_name:
+                    seen.add(job.full_name)
+                    jobs.append(job)
+            if not jobs:
+                continue
+            started = time.monotonic()
+            async with self._db_lock:
+                states = await self._load_state([j.full_name for j in jobs])
+            st.busy_seconds += time.monotonic() - started
+            for job in jobs:
+                job.stored = stored = states.get(job.full_name)
+                st.processed += 1
+                if job.item is not None:
+                    pushed = parse_iso(job.item.get("pushed_at"))
+                    if (
+                        stored is not None
+                        and pushed is not None
+                        and stored.pushed_at_gh == pushed
+                        and (pushed < week_ago or stored.commits_7d is not None)
+                    ):
+                        # Nothing pushed since the stored row (and commits_7d known): the search
+                        # payload is all we need
+                        job.enrich = False
+                        await to_transform.put(job)
+                    else:
+                        await to_fetch.put(job)
+                elif stored is not None and self._cache_hours > 0 and stored.updated_at >= cutoff:
+                    await to_write.put(stored)
+                else:
+                    await to_fetch.put(job)
+        for _ in range(self._fetch_workers):
+            await to_fetch.put(_DONE)
+
+    async def _fetch_rest_worker(self, inbox: asyncio.Queue[Any], out: asyncio.Queue[Any]) -> None:
+        st = self._stages["fetch"]
+        while (job := await inbox.get()) is not _DONE:
+            started = time.monotonic()
+            try:
+                ok = await self._fetch_rest(job)
+            except Exception as e:
+                logger.warning("Failed to process %s: %s", job.full_name, e)
+                ok = False
+            st.busy_seconds += time.monotonic() - started
+            if not ok:
+                st.failed += 1
+                continue
+            st.processed += 1
+            await out.put(job)
+
+    async def _fetch_rest(self, job: RepoJob) -> bool:
+        """Repo (unless the search payload has it), README, languages and commit activity."""
+        client = self._client
+        owner, name = job.full_name.split("/", 1)
+        if job.item is None:
+            job.repo = await client.get_repo(owner, name)
+            if not job.repo or job.repo.get("id") is None:
+                return False
+        # Optional extras: a failure leaves the stored values alone
+        await self._fetch_readme_rest(job)
+        try:
+            job.languages = await client.get_languages(owner, name)
+        except Exception:
+            pass
+        try:
+            job.activity = await client.get_commit_activity(owner, name)
+        except Exception:
+            pass
+        return True
+
+    async def _fetch_readme_rest(self, job: RepoJob) -> None:
+        owner, name = job.full_name.split("/", 1)
+        try:
+            # (None, None, None) for a repo without a README, which clears the stored one
+            job.readme = await self._client.get_readme(owner, name)
+        except Exception:
+            # Transient failure: keep the stored README rather than dropping it
+            job.readme_failed = True
+
+    async def _fetch_graphql_worker(self, inbox: asyncio.Queue[Any], out: asyncio.Queue[Any]) -> None:
+        st = self._stages["fetch"]
+        done = False
+        while not done:
+            # plan sends one end-of-stream marker per worker
+            jobs, done = await self._take_batch(inbox, self._graphql_batch)
+            if not jobs:
+                continue
+            started = time.monotonic()
+            try:
+                await self._fetch_graphql(jobs)
+            except Exception as e:
+                logger.warning("GraphQL batch of %s repos failed: %s", len(jobs), e)
+                st.failed += len(jobs)
+                continue
+            finally:
+                st.busy_seconds += time.monotonic() - started
+            for job in jobs:
+                if job.node is None or job.node.get("databaseId") is None:
+                    st.failed += 1
+                    continue
+                st.processed += 1
+                await out.put(job)
+
+    async def _fetch_graphql(self, jobs: list[RepoJob]) -> None:
+        """One aliased query for metadata and README shas; a second for README text, only where
+        the sha differs from the stored one. Repos whose README isn't one of the probed root
+        names (Readme.md, docs/README.md, ...) fall back to REST /readme."""
+        nodes = await self._client.get_repos_graphql([j.full_name for j in jobs])
+        changed: dict[str, str] = {}
+        no_candidate: list[RepoJob] = []
+        for job in jobs:
+            job.node = nodes.get(job.full_name)
+            sha = _graphql_readme_sha(job.node)
+            if sha and sha != (job.stored.readme_sha if job.stored else None):
+                changed[job.full_name] = sha
+            elif sha is None and job.node is not None:
+                no_candidate.append(job)
+        if no_candidate:
+            await asyncio.gather(*(self._fetch_readme_rest(job) for job in no_candidate))
+        if not changed:
+            return
+        try:
+            texts = await self._client.get_blob_texts_graphql(changed)
+        except Exception as e:
+            logger.warning("README text fetch for %s repos failed: %s", len(changed), e)
+            return
+        for job in jobs:
+            job.readme_text = texts.get(job.full_name)
+
+    async def _transform(self, inbox: asyncio.Queue[Any], out: asyncio.Queue[Any]) -> None:
+        st = self._stages["transform"]
+        week_ago = datetime.now(timezone.utc) - timedelta(days=7)
+        while (job := await inbox.get()) is not _DONE:
+            started = time.monotonic()
+            try:
+                row = _transform(job, week_ago)
+            except Exception as e:
+                logger.warning("Failed to process %s: %s", job.full_name, e)
+                st.failed += 1
+                continue
+            finally:
+                st.busy_seconds += time.monotonic() - started
+            st.processed += 1
+            await out.put(row)
+        await out.put(_DONE)
+
+    async def _write(self, inbox: asyncio.Queue[Any]) -> None:
+        st = self._stages["write"]
+        done = False
+        while not done:
+            batch, done = await self._take_batch(inbox, self._batch_size)
+            if not batch:
+                continue
+            rows = [b for b in batch if isinstance(b, tuple)]
+            snapshots = [b for b in batch if isinstance(b, StoredRepoState)]
+            started = time.monotonic()
+            async with self._db_lock:
+                names = (await self._write_rows(rows) if rows else []) + (
+                    await self._write_snapshots(snapshots) if snapshots else []
+                )
+                # Only repos whose write committed are checkpointed
+                if self._checkpoint is not None and names:
+                    await self._checkpoint(names)
+            written = len(names)
+            st.busy_seconds += time.monotonic() - started
+            st.processed += written
+            st.failed += len(batch) - written
+            self.written += written
+
+
+def _graphql_readme_sha(node: dict[str, Any] | None) -> str | None:
+    if not node:
+        return None
+    for key in sorted(node):
+        if key.startswith("readme") and node.get(key) and node[key].get("oid"):
+            return node[key]["oid"]
+    return None
+
+
+def _apply_rest_readme(row: dict[str, Any], job: RepoJob, stored_sha: str | None) -> None:
+    """README columns from a REST /readme result; row starts with has_readme=False and nulls."""
+    content_b64, encoding, sha = job.readme or (None, None, None)
+    if job.readme_failed or (sha and sha == stored_sha):
+        # An unchanged README usually came back as a 304 from the conditional-request cache
+        keep_stored_readme(row)
+    elif content_b64:
+        decoded = decode_readme(content_b64, encoding)
+        if decoded:
+            row["has_readme"] = True
+            row["readme_content"] = decoded[:README_MAX_CHARS]
+            row["readme_sha"] = sha
+
+
+def _transform(job: RepoJob, week_ago: datetime) -> RepoRow:
+    """Build the (row, commits_7d) upsert item for a fetched or payload-only job."""
+    stored_sha = job.stored.readme_sha if job.stored else None
+    if job.node is not None:
+        row, commits_7d = repo_from_graphql(job.node)
+        sha = row.get("readme_sha")
+        if sha and (sha == stored_sha or not job.readme_text):
+            # Unchanged, or the text fetch failed: keep the stored README so the next run retries
+            keep_stored_readme(row)
+        elif sha:
+            row["readme_content"] = job.readme_text[:README_MAX_CHARS]
+        else:
+            # No probed name matched; the REST /readme fallback decides
+            _apply_rest_readme(row, job, stored_sha)
+        return row, commits_7d
+
+    row = repo_from_api(job.repo or job.item or {})
+    if not job.enrich:
+        keep_stored_readme(row)
+        # Nothing pushed for a week means no commits in the window; otherwise nothing was pushed
+        # since the stored count was taken (plan only routes here when one is known)
+        return row, 0 if row["pushed_at_gh"] < week_ago else job.stored.commits_7d
+
+    _apply_rest_readme(row, job, stored_sha)
+    if job.languages:
+        row["languages_json"] = job.languages
+    return row, commits_7d_from_activity(job.activity)
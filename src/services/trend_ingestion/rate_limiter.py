@@ -0,0 +1,221 @@
+"""Adaptive token-bucket scheduler driven by GitHub rate-limit headers.
+
+Each (token, resource) pair gets a bucket that refills at remaining / seconds-until-reset,
+so the budget is spread evenly over the window instead of being burned and then waited
+out. Until a bucket has seen headers (or after its window resets) it is paced at a
+conservative seed rate, so a cold pool doesn't fire every queued request at once.
+Retry-After and secondary-rate-limit responses block a bucket until they expire; a
+rejection without Retry-After or reset headers backs off for a fixed minimum.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Any
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+RESOURCES = ("core", "search", "graphql")
+# Requests kept in reserve per bucket (never scheduled) so other callers aren't starved
+RESERVE = {"core": 50, "search": 1, "graphql": 50}
+DEFAULT_MAX_BURST = 20
+# Pacing for buckets with no known budget (well under GitHub's authenticated limits:
+# 5000/h core and graphql, 30/min search) until the first response reports the real one
+SEED_RATE = {"core": 1.0, "search": 0.25, "graphql": 0.5}
+SEED_BURST = {"core": 5, "search": 2, "graphql": 2}
+# GitHub's guidance when a rate-limit rejection carries no Retry-After / reset: wait a minute
+SECONDARY_LIMIT_BLOCK_SECONDS = 60
+# Floor for Retry-After waits (GitHub occasionally sends Retry-After: 0)
+MIN_BACKOFF_SECONDS = 1
+MAX_SLEEP_SECONDS = 600
+
+
+@dataclass
+class TokenBucket:
+    """Admission state for one token and resource."""
+
+    resource: str
+    max_burst: int = DEFAULT_MAX_BURST
+    remaining: int | None = None
+    reset: int | None = None
+    level: float = field(init=False)
+    rate: float = 0.0
+    last_refill: float = field(default_factory=time.time)
+    blocked_until: float = 0.0
+
+    def __post_init__(self) -> None:
+        self.level = float(self._seed_capacity())
+
+    def _known(self, now: float) -> bool:
+        return self.remaining is not None and self.reset is not None and self.reset > now
+
+    def _seed_capacity(self) -> int:
+        return min(self.max_burst, SEED_BURST[self.resource])
+
+    def refill(self, now: float) -> None:
+        if self._known(now):
+            capacity = min(self.max_burst, max(0, self.remaining - RESERVE[self.resource]))
+            rate = self.rate
+        else:
+            capacity, rate = self._seed_capacity(), SEED_RATE[self.resource]
+        self.level = min(capacity, self.level + (now - self.last_refill) * rate)
+        self.last_refill = now
+
+    def update(self, remaining: int, reset: int | None, now: float) -> None:
+        """Re-derive the refill rate from fresh x-ratelimit-remaining / x-ratelimit-reset values."""
+        self.refill(now)
+        # First headers, or the first after the window reset: the budget is fresh
+        first = not self._known(now)
+        self.remaining = remaining
+        self.reset = reset
+        if not self._known(now):
+            return
+        usable = max(0, remaining - RESERVE[self.resource])
+        capacity = min(self.max_burst, usable)
+        self.rate = usable / max(1.0, self.reset - now)
+        # Start a fresh bucket full so the first burst isn't throttled
+        self.level = capacity if first else min(self.level, capacity)
+        if remaining <= 0:
+            self.block(self.reset + 1, now)
+
+    def block(self, until: float, now: float) -> None:
+        self.blocked_until = max(self.blocked_until, min(until, now + MAX_SLEEP_SECONDS))
+
+    def next_admission(self, now: float) -> float:
+        """Earliest wall-clock time a request may be sent on this bucket."""
+        if self.blocked_until > now:
+            return self.blocked_until
+        self.refill(now)
+        if self.level >= 1:
+            return now
+        if not self._known(now):
+            # No headers yet, or the window has reset: pace at the seed rate until a response arrives
+            return now + (1 - self.level) / SEED_RATE[self.resource]
+        if self.rate <= 0:
+            return float(self.reset) + 1
+        return now + (1 - self.level) / self.rate
+
+    def admit(self, now: float) -> None:
+        self.level -= 1
+        if self._known(now):
+            self.remaining -= 1
+
+
+@dataclass
+class _ResourceStats:
+    waiting: int = 0
+    admitted: int = 0
+    wait_seconds: float = 0.0
+
+
+class RateLimitScheduler:
+    """Admits GitHub requests across a token pool at the highest sustainable rate per resource."""
+
+    def __init__(self, tokens: list[str | None], max_burst: int = DEFAULT_MAX_BURST) -> None:
+        self._tokens = tokens or [None]
+        self._buckets: dict[tuple[str | None, str], TokenBucket] = {
+            (t, r): TokenBucket(resource=r, max_burst=max_burst) for t in self._tokens for r in RESOURCES
+        }
+        self._stats = {r: _ResourceStats() for r in RESOURCES}
+
+    @property
+    def tokens(self) -> list[str | None]:
+        return list(self._tokens)
+
+    async def acquire(self, resource: str) -> str | None:
+        """Wait until some token may send a request for resource; return that token."""
+        candidates = [t for t in self._tokens if t] if resource == "graphql" else self._tokens
+        if not candidates:
+            raise RuntimeError("GitHub GraphQL API requires a token")
+        stats = self._stats[resource]
+        waited = 0.0
+        while True:
+            now = time.time()
+            token, at = min(
+                ((t, self._buckets[(t, resource)].next_admission(now)) for t in candidates),
+                key=lambda x: x[1],
+            )
+            if at <= now:
+                self._buckets[(token, resource)].admit(now)
+                stats.admitted += 1
+                stats.wait_seconds += waited
+                return token
+            delay = min(at - now, MAX_SLEEP_SECONDS)
+            if delay > 30:
+                logger.warning("GitHub %s budget exhausted on all tokens: waiting %ds", resource, int(delay))
+            stats.waiting += 1
+            try:
+                await asyncio.sleep(delay)
+            finally:
+                stats.waiting -= 1
+            waited += delay
+
+    def observe(self, token: str | None, resource: str, response: httpx.Response) -> bool:
+        """Update the bucket from response headers; apply Retry-After and secondary-limit blocks.
+        Returns True if the response was a rate-limit rejection (worth retrying)."""
+        now = time.time()
+        resource = response.headers.get("x-ratelimit-resource", resource)
+        bucket = self._buckets.get((token, resource))
+        remaining = response.headers.get("x-ratelimit-remaining")
+        reset = response.headers.get("x-ratelimit-reset")
+        if bucket is not None and remaining is not None:
+            bucket.update(int(remaining), int(reset) if reset is not None else None, now)
+        if response.status_code not in (403, 429):
+            return False
+        retry_after = response.headers.get("retry-after")
+        if retry_after is not None and retry_after.isdigit():
+            until = max(now + int(retry_after), now + MIN_BACKOFF_SECONDS)
+        elif remaining == "0" and reset is not None and int(reset) > now:
+            until = int(reset) + 1
+        elif remaining == "0" or response.status_code == 429 or _is_secondary_limit(response):
+            # Rejected with no usable Retry-After / reset (missing or already past): don't retry straight away
+            until = now + SECONDARY_LIMIT_BLOCK_SECONDS
+        else:
+            # Plain 403 (e.g. access blocked): not a rate limit
+            return False
+        if bucket is not None:
+            bucket.block(until, now)
+        logger.warning("GitHub rate limit (%s): backing off %ds", resource, int(until - now))
+        return True
+
+    def stats(self) -> dict[str, dict[str, Any]]:
+        """Per-resource scheduler state for metrics: tokens available, queue depth, wait time."""
+        now = time.time()
+        out: dict[str, dict[str, Any]] = {}
+        for resource, st in self._stats.items():
+            buckets = [self._buckets[(t, resource)] for t in self._tokens]
+            for b in buckets:
+                b.refill(now)
+            out[resource] = {
+                "tokens_available": sum(int(b.level) for b in buckets if b._known(now)),
+                "remaining": sum(b.remaining or 0 for b in buckets),
+                "rate_per_s": round(sum(b.rate for b in buckets if b._known(now)), 3),
+                "queue_depth": st.waiting,
+                "admitted": st.admitted,
+                "wait_seconds": round(st.wait_seconds, 3),
+                "blocked_until": max((b.blocked_until for b in buckets), default=0.0) or None,
+            }
+        return out
+
+    def budgets(self) -> list[dict[str, Any]]:
+        """Per-token remaining/reset snapshot (tokens masked)."""
+        out: list[dict[str, Any]] = []
+        for t in self._tokens:
+            entry: dict[str, Any] = {"token": f"...{t[-4:]}" if t else None}
+            for r in RESOURCES:
+                b = self._buckets[(t, r)]
+                entry[r] = {"remaining": b.remaining, "reset": b.reset}
+            out.append(entry)
+        return out
+
+
+def _is_secondary_limit(response: httpx.Response) -> bool:
+    try:
+        return "secondary rate limit" in response.text.lower()
+    except Exception:
+        return False
@@ -0,0 +1,140 @@
+"""Redis-backed conditional-request cache for GitHub API GETs (ETag / Last-Modified).
+
+GitHub answers a conditional request with 304 Not Modified when nothing changed, and 304s
+don't count against the rate limit. We keep the validators and the last 200 body per
+request path so a 304 can be served from the cache. Entries are keyed per token (by a hash,
+never the token itself): what a PAT can see depends on its scopes, so a body cached under
+one token is never replayed to a request sent with another.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import logging
+from dataclasses import dataclass
+from typing import Any
+from urllib.parse import urlencode
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "gh:resp:"
+STATS_KEY = "gh:resp:stats"
+ANONYMOUS_FINGERPRINT = "anon"
+
+
+def token_fingerprint(token: str | None) -> str:
+    """Short stable hash identifying a token in cache keys (unauthenticated requests share one)."""
+    if not token:
+        return ANONYMOUS_FINGERPRINT
+    return hashlib.sha256(token.encode()).hexdigest()[:16]
+
+
+@dataclass
+class CachedResponse:
+    etag: str | None
+    last_modified: str | None
+    body: bytes
+    content_type: str
+
+    def validators(self) -> dict[str, str]:
+        """Conditional request headers for this entry."""
+        headers: dict[str, str] = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+    def to_response(self, request: httpx.Request) -> httpx.Response:
+        """Rebuild a 200 response from the cached body (used when GitHub returns 304)."""
+        return httpx.Response(
+            200,
+            content=self.body,
+            headers={"content-type": self.content_type},
+            request=request,
+        )
+
+
+class ResponseCache:
+    """ETag / Last-Modified store shared across Celery tasks via Redis."""
+
+    def __init__(self, redis_url: str, ttl_seconds: int) -> None:
+        import redis.asyncio as redis
+
+        self._redis = redis.from_url(redis_url)
+        self._ttl = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(path: str, params: dict[str, Any] | None = None, token: str | None = None) -> str:
+        """Cache key for the token + request path + query params (params sorted for stability)."""
+        prefix = f"{KEY_PREFIX}{token_fingerprint(token)}:"
+        if params:
+            return f"{prefix}{path}?{urlencode(sorted(params.items()))}"
+        return f"{prefix}{path}"
+
+    async def get(self, key: str) -> CachedResponse | None:
+        try:
+            data = await self._redis.hgetall(key)
+        except Exception as e:
+            logger.debug("Response cache read failed for %s: %s", key, e)
+            return None
+        if not data or b"body" not in data:
+            return None
+        etag = data.get(b"etag")
+        last_modified = data.get(b"last_modified")
+        return CachedResponse(
+            etag=etag.decode() if etag else None,
+            last_modified=last_modified.decode() if last_modified else None,
+            body=data[b"body"],
+            content_type=(data.get(b"content_type") or b"application/json").decode(),
+        )
+
+    async def put(self, key: str, response: httpx.Response) -> None:
+        """Store validators and body from a 200 response; no-op if GitHub sent no validators."""
+        etag = response.headers.get("etag")
+        last_modified = response.headers.get("last-modified")
+        if not etag and not last_modified:
+            return
+        mapping: dict[str, str | bytes] = {
+            "body": response.content,
+            "content_type": response.headers.get("content-type", "application/json"),
+        }
+        if etag:
+            mapping["etag"] = etag
+        if last_modified:
+            mapping["last_modified"] = last_modified
+        try:
+            async with self._redis.pipeline(transaction=False) as pipe:
+                pipe.delete(key)
+                pipe.hset(key, mapping=mapping)
+                pipe.expire(key, self._ttl)
+                await pipe.execute()
+        except Exception as e:
+            logger.debug("Response cache write failed for %s: %s", key, e)
+
+    async def record(self, hit: bool) -> None:
+        """Count a hit (304 served from cache) or miss; totals persist in Redis across tasks."""
+        field = "hits" if hit else "misses"
+        if hit:
+            self.hits += 1
+        else:
+            self.misses += 1
+        try:
+            await self._redis.hincrby(STATS_KEY, field, 1)
+        except Exception:
+            pass
+
+    async def totals(self) -> dict[str, int]:
+        """All-time hit/miss counters from Redis."""
+        data = await self._redis.hgetall(STATS_KEY)
+        return {
+            "hits": int(data.get(b"hits") or 0),
+            "misses": int(data.get(b"misses") or 0),
+        }
+
+    async def aclose(self) -> None:
+        await self._redis.aclose()
@@ -0,0 +1,199 @@
+"""Downsampling tiers for trend snapshots: raw hourly → daily → weekly.
+
+Raw snapshots are kept for a short window (SNAPSHOT_RAW_RETENTION_DAYS); the rollup job
+aggregates them into trend_snapshots_daily (first/last/min/max counters per UTC day) and
+the daily tier into trend_snapshots_weekly, which are kept much longer. Each run recomputes
+buckets from the newest daily bucket onward, so a partial day is rolled up again once it is
+complete; it runs after every ingestion pass and before raw partitions are dropped. Writers
+that change snapshots in place (commit stats backfill, scoring) mark the snapshots' days
+dirty in the same transaction, and the next run re-aggregates those earlier days and weeks
+too. Readers pick the coarsest tier that still has the resolution they need.
+"""
+
+from __future__ import annotations
+
+import logging
+from collections.abc import Iterable
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Any, Literal
+
+from sqlalchemy import Date, cast, delete, func, select
+from sqlalchemy.dialects.postgresql import aggregate_order_by
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.models.repository import TrendSnapshot
+from src.models.snapshot_rollup import SnapshotRollupDirtyDay, TrendSnapshotDaily, TrendSnapshotWeekly
+
+logger = logging.getLogger(__name__)
+
+HistoryTier = Literal["raw", "daily", "weekly"]
+
+# Trend history ranges up to this many days are served from raw hourly snapshots
+RAW_HISTORY_MAX_DAYS = 2
+# ... and up to this many from the daily tier; longer ranges use the weekly tier
+DAILY_HISTORY_MAX_DAYS = 90
+RAW_HISTORY_POINTS = 48
+
+
+def history_tier(days: int) -> HistoryTier:
+    """Coarsest tier with enough resolution for a trend history of `days` days."""
+    if days <= RAW_HISTORY_MAX_DAYS:
+        return "raw"
+    if days <= DAILY_HISTORY_MAX_DAYS:
+        return "daily"
+    return "weekly"
+
+
+def week_start(day: date) -> date:
+    return day - timedelta(days=day.weekday())
+
+
+def _day_start(day: date) -> datetime:
+    return datetime.combine(day, time.min, tzinfo=timezone.utc)
+
+
+def _first(col: Any, order: Any) -> Any:
+    return func.array_agg(aggregate_order_by(col, order))[1]
+
+
+def _last(col: Any, order: Any) -> Any:
+    return func.array_agg(aggregate_order_by(col, order.desc()))[1]
+
+
+async def _upsert_rollup(session: AsyncSession, model: type, source: Any) -> int:
+    columns = [c.name for c in model.__table__.columns]
+    stmt = pg_insert(model).from_select(columns, source)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["repository_id", "bucket_start"],
+        set_={c: stmt.excluded[c] for c in columns if c not in ("repository_id", "bucket_start")},
+    )
+    result = await session.execute(stmt)
+    return result.rowcount or 0
+
+
+async def rollup_daily(session: AsyncSession, since: date | None, until: date | None = None) -> int:
+    """Aggregate raw snapshots into daily buckets from `since` (all retained days if None) up
+    to, not including, `until`. The snapshot_at bounds prune to the partitions rolled up."""
+    s = TrendSnapshot
+    bucket = cast(func.timezone("UTC", s.snapshot_at), Date)
+    ts = s.snapshot_at
+    source = select(
+        s.repository_id,
+        bucket,
+        func.count(),
+        func.min(ts),
+        func.max(ts),
+        _first(s.stars_count, ts),
+        _last(s.stars_count, ts),
+        func.min(s.stars_count),
+        func.max(s.stars_count),
+        _first(s.forks_count, ts),
+        _last(s.forks_count, ts),
+        func.min(s.forks_count),
+        func.max(s.forks_count),
+        _last(s.open_issues_count, ts),
+        _last(s.watchers_count, ts),
+        _last(s.stars_delta_24h, ts),
+        _last(s.stars_delta_7d, ts),
+        _last(s.commits_7d, ts),
+        _last(s.computed_trend_score, ts),
+    ).group_by(s.repository_id, bucket)
+    if since is not None:
+        source = source.where(s.snapshot_at >= _day_start(since))
+    if until is not None:
+        source = source.where(s.snapshot_at < _day_start(until))
+    return await _upsert_rollup(session, TrendSnapshotDaily, source)
+
+
+async def rollup_weekly(session: AsyncSession, since: date | None, until: date | None = None) -> int:
+    """Aggregate daily buckets into weeks (Monday start), for weeks containing `since` onward
+    and starting before `until`."""
+    d = TrendSnapshotDaily
+    bucket = cast(func.date_trunc("week", d.bucket_start), Date)
+    day = d.bucket_start
+    source = select(
+        d.repository_id,
+        bucket,
+        func.sum(d.snapshot_count),
+        func.min(d.first_snapshot_at),
+        func.max(d.last_snapshot_at),
+        _first(d.stars_first, day),
+        _last(d.stars_last, day),
+        func.min(d.stars_min),
+        func.max(d.stars_max),
+        _first(d.forks_first, day),
+        _last(d.forks_last, day),
+        func.min(d.forks_min),
+        func.max(d.forks_max),
+        _last(d.open_issues_last, day),
+        _last(d.watchers_last, day),
+        _last(d.stars_delta_24h_last, day),
+        _last(d.stars_delta_7d_last, day),
+        _last(d.commits_7d_last, day),
+        _last(d.computed_trend_score_last, day),
+    ).group_by(d.repository_id, bucket)
+    if since is not None:
+        source = source.where(d.bucket_start >= week_start(since))
+    if until is not None:
+        source = source.where(d.bucket_start < until)
+    return await _upsert_rollup(session, TrendSnapshotWeekly, source)
+
+
+async def latest_rollup_day(session: AsyncSession) -> date | None:
+    """Newest daily bucket; raw snapshots from that day on are not (fully) rolled up yet."""
+    return await session.scalar(select(func.max(TrendSnapshotDaily.bucket_start)))
+
+
+async def mark_days_dirty(session: AsyncSession, snapshot_times: Iterable[datetime]) -> None:
+    """Record the UTC days of snapshots changed in place so the next rollup re-aggregates them.
+    Call in the transaction that changes them (caller commits)."""
+    days = {t.astimezone(timezone.utc).date() for t in snapshot_times}
+    if not days:
+        return
+    ins = pg_insert(SnapshotRollupDirtyDay).values([{"day": d} for d in sorted(days)])
+    await session.execute(ins.on_conflict_do_update(index_elements=["day"], set_={"marked_at": func.now()}))
+
+
+async def rollup_snapshots(session: AsyncSession) -> tuple[int, int]:
+    """Roll raw snapshots up into the daily tier and the daily tier into weeks, starting at the
+    newest daily bucket (re-aggregating it in case it was partial), plus each earlier day marked
+    dirty and its week. Returns rows upserted per tier."""
+    since = await latest_rollup_day(session)
+    dirty = (await session.execute(select(SnapshotRollupDirtyDay.day, SnapshotRollupDirtyDay.marked_at))).all()
+    daily = await rollup_daily(session, since)
+    weekly = await rollup_weekly(session, since)
+    earlier = sorted({day for day, _ in dirty if since is not None and day < since})
+    for day in earlier:
+        daily += await rollup_daily(session, day, day + timedelta(days=1))
+    for week in sorted({week_start(day) for day in earlier if week_start(day) < week_start(since)}):
+        weekly += await rollup_weekly(session, week, week + timedelta(days=7))
+    for day, marked_at in dirty:
+        # A day marked again since it was read stays queued for the next run
+        await session.execute(
+            delete(SnapshotRollupDirtyDay).where(
+                SnapshotRollupDirtyDay.day == day, SnapshotRollupDirtyDay.marked_at <= marked_at
+            )
+        )
+    await session.commit()
+    logger.info(
+        "Snapshot rollup from %s (+%s dirty earlier days): %s daily, %s weekly buckets",
+        since or "start", len(earlier), daily, weekly,
+    )
+    return daily, weekly
+
+
+async def prune_rollups(session: AsyncSession, daily_days: int, weekly_days: int) -> tuple[int, int]:
+    """Delete rollup buckets older than each tier's retention. Returns rows deleted per tier."""
+    today = datetime.now(timezone.utc).date()
+    daily = await session.execute(
+        delete(TrendSnapshotDaily).where(TrendSnapshotDaily.bucket_start < today - timedelta(days=daily_days))
+    )
+    weekly = await session.execute(
+        delete(TrendSnapshotWeekly).where(
+            TrendSnapshotWeekly.bucket_start < week_start(today - timedelta(days=weekly_days))
+        )
+    )
+    await session.commit()
+    return daily.rowcount or 0, weekly.rowcount or 0
+
@@ -0,0 +1,152 @@
+"""Checkpoint store for resumable ingestion runs (ingestion_runs / ingestion_run_items).
+
+A run is keyed by the Celery task id, which survives self.retry(), so a retried or manually
+re-run task finds its own record: the planned work list (with discovery payloads, so no
+re-search) and which repos are already written. Items are marked done right after their
+batch commits; a crash between the two only means that batch is written again (upserts are
+idempotent). Finished runs are deleted (items cascade) by cleanup after
+INGESTION_RUN_RETENTION_DAYS.
+"""
+
+from __future__ import annotations
+
+import logging
+from datetime import datetime, timezone
+from typing import Any
+
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.models.ingestion_run import IngestionRun, IngestionRunItem
+
+logger = logging.getLogger(__name__)
+
+# Item rows inserted per statement when persisting a plan
+PLAN_INSERT_CHUNK = 1000
+# Runs in these states are never resumed, so retention may delete them
+FINISHED_STATUSES = ("completed", "failed")
+
+
+class IngestionRunStore:
+    """Run / item checkpoints. Every method commits, so checkpoints survive a later failure."""
+
+    def __init__(self, session: AsyncSession) -> None:
+        self.session = session
+
+    async def start(self, run_id: str, kind: str, params: dict[str, Any] | None = None) -> IngestionRun:
+        """Create the run, or reopen an existing one for resume (attempts counts both)."""
+        run = await self.session.get(IngestionRun, run_id)
+        if run is None:
+            run = IngestionRun(id=run_id, kind=kind, status="planning", params=params, attempts=1)
+            self.session.add(run)
+        else:
+            run.attempts += 1
+            if run.status == "failed":
+                # Resume where the failed attempt stopped; an unfinished plan is re-planned
+                run.status = "running" if run.planned_count else "planning"
+            run.error = None
+        await self.session.commit()
+        return run
+
+    async def plan(self, run_id: str, items: list[tuple[str, dict[str, Any] | None]]) -> None:
+        """Persist the planned work list (full_name, discovery payload) and mark the run running."""
+        for start in range(0, len(items), PLAN_INSERT_CHUNK):
+            chunk = items[start : start + PLAN_INSERT_CHUNK]
+            await self.session.execute(
+                pg_insert(IngestionRunItem)
+                .values([{"run_id": run_id, "full_name": fn, "payload": payload, "status": "pending"} for fn, payload in chunk])
+                .on_conflict_do_nothing(constraint="uq_ingestion_run_items_run_repo")
+            )
+        await self.session.execute(
+            update(IngestionRun)
+            .where(IngestionRun.id == run_id)
+            .values(status="running", planned_count=len(items))
+        )
+        await self.session.commit()
+
+    async def mark_running(self, run_id: str) -> None:
+        """For runs that stream discovery instead of persisting a plan up front."""
+        await self.session.execute(update(IngestionRun).where(IngestionRun.id == run_id).values(status="running"))
+        await self.session.commit()
+
+    async def pending(self, run_id: str) -> list[tuple[str, dict[str, Any] | None]]:
+        """Planned items not yet written, in plan order."""
+        result = await self.session.execute(
+            select(IngestionRunItem.full_name, IngestionRunItem.payload)
+            .where(IngestionRunItem.run_id == run_id, IngestionRunItem.status == "pending")
+            .order_by(IngestionRunItem.id)
+        )
+        return [(fn, payload) for fn, payload in result.all()]
+
+    async def done_names(self, run_id: str) -> set[str]:
+        result = await self.session.execute(
+            select(IngestionRunItem.full_name).where(
+                IngestionRunItem.run_id == run_id, IngestionRunItem.status == "done"
+            )
+        )
+        return set(result.scalars().all())
+
+    async def mark_done(self, run_id: str, full_names: list[str]) -> None:
+        """Checkpoint written repos. Repos that weren't planned up front (streamed discovery)
+        are recorded as done directly."""
+        if not full_names:
+            return
+        now = datetime.now(timezone.utc)
+        ins = pg_insert(IngestionRunItem).values(
+            [{"run_id": run_id, "full_name": fn, "status": "done", "completed_at": now} for fn in full_names]
+        )
+        try:
+            await self.session.execute(
+                ins.on_conflict_do_update(
+                    constraint="uq_ingestion_run_items_run_repo",
+                    set_={"status": "done", "completed_at": now},
+                )
+            )
+            await self.session.commit()
+        except Exception as e:
+            await self.session.rollback()
+            logger.warning("Failed to checkpoint %s repos for run %s: %s", len(full_names), run_id, e)
+
+    async def finish(self, run_id: str, status: str, error: str | None = None) -> None:
+        done = await self.session.scalar(
+            select(func.count(IngestionRunItem.id)).where(
+                IngestionRunItem.run_id == run_id, IngestionRunItem.status == "done"
+            )
+        )
+        await self.session.execute(
+            update(IngestionRun)
+            .where(IngestionRun.id == run_id)
+            .values(
+                status=status,
+                done_count=done or 0,
+                error=error[:1024] if error else None,
+                finished_at=datetime.now(timezone.utc) if status == "completed" else None,
+            )
+        )
+        await self.session.commit()
+
+    async def record_failure(self, run_id: str, exc: BaseException) -> None:
+        """Mark the run failed after exc. Rolls back the failed work first, and never raises, so
+        a second error here (e.g. the connection is gone) can't replace the original one."""
+        try:
+            await self.session.rollback()
+            await self.finish(run_id, "failed", f"{type(exc).__name__}: {exc}")
+        except Exception as e:
+            logger.warning("Failed to record failure of ingestion run %s: %s", run_id, e)
+            try:
+                await self.session.rollback()
+            except Exception:
+                pass
+
+    async def prune(self, finished_before: datetime) -> int:
+        """Delete finished runs last updated before finished_before (their items cascade).
+        Commits. Returns runs deleted."""
+        result = await self.session.execute(
+            delete(IngestionRun).where(
+                IngestionRun.status.in_(FINISHED_STATUSES),
+                IngestionRun.updated_at < finished_before,
+            )
+        )
+        await self.session.commit()
+        return result.rowcount or 0
@@ -1,22 +1,40 @@
-"""Trending page HTML scraper — BeautifulSoup parser for github.com/trending."""
+"""Trending page HTML scraper — concurrent fetch of github.com/trending views over the pooled client, lxml parser."""
 
 from __future__ import annotations
 
+import asyncio
 import logging
 import re
-from typing import Any
+from dataclasses import dataclass
 
 import httpx
 from bs4 import BeautifulSoup
 
+from src.services.trend_ingestion.http_pool import get_http_client
+
 logger = logging.getLogger(__name__)
 
 TRENDING_BASE = "https://github.com/trending"
 SINCE_OPTIONS = ("daily", "weekly")
 LANGUAGE_OPTIONS = ("", "python", "typescript", "rust", "go")
 USER_AGENT = "github-intel-ingestion/1.0"
+GITHUB_WEB_BASE = "https://github.com"
 REQUEST_TIMEOUT = 25.0
 
+_BOX_ROW_XPATH = '//article[contains(concat(" ", normalize-space(@class), " "), " Box-row ")]'
+_PERIOD_STARS_RE = re.compile(r"([\d,]+)\s+stars?\s+(?:today|this week|this month)", re.IGNORECASE)
+
+
+@dataclass
+class TrendingRepo:
+    """One row of a trending page: counts as rendered on the page."""
+
+    full_name: str
+    stars: int | None = None
+    forks: int | None = None
+    stars_period: int | None = None  # "N stars today" (daily) / "this week" (weekly)
+    language: str | None = None
+
 
 def _normalize_full_name(link_text: str) -> str | None:
     """Extract 'owner/repo' from link href (e.g. /owner/repo or /owner/repo?other=1)."""
@@ -29,39 +47,99 @@ def _normalize_full_name(link_text: str) -> str | None:
     return None
 
 
-def parse_trending_html(html: str) -> list[str]:
-    """Parse trending page HTML; return list of repo full_name (owner/repo)."""
+def _parse_count(text: str | None) -> int | None:
+    digits = (text or "").strip().replace(",", "")
+    return int(digits) if digits.isdigit() else None
+
+
+def _parse_period_stars(text: str) -> int | None:
+    m = _PERIOD_STARS_RE.search(text)
+    return _parse_count(m.group(1)) if m else None
+
+
+def parse_trending_page(html: str) -> list[TrendingRepo]:
+    """Parse trending page HTML with lxml (C parser); return repos with page counts, deduped."""
+    try:
+        import lxml.html
+    except ImportError:
+        return parse_trending_page_bs4(html)
+
+    doc = lxml.html.fromstring(html)
+    repos: list[TrendingRepo] = []
+    seen: set[str] = set()
+    for article in doc.xpath(_BOX_ROW_XPATH):
+        hrefs = article.xpath(".//h2//a/@href")
+        name = _normalize_full_name(hrefs[0]) if hrefs else None
+        if not name or name in seen:
+            continue
+        seen.add(name)
+        stars = article.xpath('.//a[contains(@href, "/stargazers")]')
+        forks = article.xpath('.//a[contains(@href, "/forks")]')
+        lang = article.xpath('.//*[@itemprop="programmingLanguage"]/text()')
+        repos.append(TrendingRepo(
+            full_name=name,
+            stars=_parse_count(stars[0].text_content()) if stars else None,
+            forks=_parse_count(forks[0].text_content()) if forks else None,
+            stars_period=_parse_period_stars(" ".join(article.itertext())),
+            language=lang[0].strip() if lang else None,
+        ))
+    return repos
+
+
+def parse_trending_page_bs4(html: str) -> list[TrendingRepo]:
+    """Pure-Python fallback (BeautifulSoup html.parser) with the same output as parse_trending_page."""
     soup = BeautifulSoup(html, "html.parser")
-    full_names: list[str] = []
+    repos: list[TrendingRepo] = []
     seen: set[str] = set()
-    for article in soup.select('article.Box-row'):
+    for article in soup.select("article.Box-row"):
         # h2 contains <a href="/owner/repo"> or similar
-        h2 = article.select_one("h2")
-        if not h2:
-            continue
-        a = h2.select_one("a")
+        a = article.select_one("h2 a")
         if not a or not a.get("href"):
             continue
         name = _normalize_full_name(a["href"])
-        if name and name not in seen:
-            seen.add(name)
-            full_names.append(name)
-    return full_names
+        if not name or name in seen:
+            continue
+        seen.add(name)
+        stars = article.select_one('a[href*="/stargazers"]')
+        forks = article.select_one('a[href*="/forks"]')
+        lang = article.select_one('[itemprop="programmingLanguage"]')
+        repos.append(TrendingRepo(
+            full_name=name,
+            stars=_parse_count(stars.get_text()) if stars else None,
+            forks=_parse_count(forks.get_text()) if forks else None,
+            stars_period=_parse_period_stars(article.get_text(" ")),
+            language=lang.get_text().strip() if lang else None,
+        ))
+    return repos
 
 
-async def fetch_trending_page(since: str = "daily", language: str = "") -> str:
-    """Fetch raw HTML for one trending view."""
+def parse_trending_html(html: str) -> list[str]:
+    """Parse trending page HTML; return list of repo full_name (owner/repo)."""
+    return [r.full_name for r in parse_trending_page(html)]
+
+
+async def fetch_trending_page(
+    since: str = "daily",
+    language: str = "",
+    client: httpx.AsyncClient | None = None,
+) -> str:
+    """Fetch raw HTML for one trending view (pooled github.com client unless one is passed)."""
     params: dict[str, str] = {"since": since}
     if language:
         params["language"] = language
-    async with httpx.AsyncClient(timeout=REQUEST_TIMEOUT, follow_redirects=True) as client:
-        r = await client.get(
-            TRENDING_BASE,
-            params=params,
-            headers={"User-Agent": USER_AGENT},
-        )
-        r.raise_for_status()
-        return r.text
+    if client is None:
+        client = _web_client()
+    r = await client.get(
+        TRENDING_BASE,
+        params=params,
+        headers={"User-Agent": USER_AGENT},
+    )
+    r.raise_for_status()
+    return r.text
+
+
+def _web_client() -> httpx.AsyncClient:
+    return get_http_client(GITHUB_WEB_BASE, timeout=REQUEST_TIMEOUT, follow_redirects=True)
 
 
 def scrape_trending_full_names_sync(html: str) -> list[str]:
@@ -69,6 +147,40 @@ def scrape_trending_full_names_sync(html: str) -> list[str]:
     return parse_trending_html(html)
 
 
+async def scrape_trending(
+    since_options: tuple[str, ...] = SINCE_OPTIONS,
+    language_options: tuple[str, ...] = LANGUAGE_OPTIONS,
+) -> list[TrendingRepo]:
+    """
+    Fetch all configured trending views concurrently over the pooled client and return
+    unique repos with their page counts. Where a repo shows up in several views the
+    daily "stars today" figure wins over weekly.
+    """
+    views = [(since, language) for since in since_options for language in language_options]
+
+    async def fetch_view(client: httpx.AsyncClient, since: str, language: str) -> list[TrendingRepo]:
+        try:
+            html = await fetch_trending_page(since=since, language=language, client=client)
+        except Exception as e:
+            logger.warning("Trending scrape failed since=%s language=%s: %s", since, language or "(all)", e)
+            return []
+        # Parsing is CPU-bound; keep the event loop free for the other fetches
+        return await asyncio.to_thread(parse_trending_page, html)
+
+    client = _web_client()
+    pages = await asyncio.gather(*(fetch_view(client, s, lang) for s, lang in views))
+
+    by_name: dict[str, TrendingRepo] = {}
+    for (since, _), repos in zip(views, pages):
+        for repo in repos:
+            existing = by_name.get(repo.full_name)
+            if existing is None:
+                by_name[repo.full_name] = repo
+            elif since == "daily" and repo.stars_period is not None:
+                existing.stars_period = repo.stars_period
+    return list(by_name.values())
+
+
 async def scrape_trending_full_names(
     since_options: tuple[str, ...] = SINCE_OPTIONS,
     language_options: tuple[str, ...] = LANGUAGE_OPTIONS,
@@ -77,14 +189,5 @@ async def scrape_trending_full_names(
     Scrape all configured trending views and return unique repo full names.
     Uses daily/weekly and multiple languages.
     """
-    seen: set[str] = set()
-    for since in since_options:
-        for language in language_options:
-            try:
-                html = await fetch_trending_page(since=since, language=language)
-                names = parse_trending_html(html)
-                for n in names:
-                    seen.add(n)
-            except Exception as e:
-                logger.warning("Trending scrape failed since=%s language=%s: %s", since, language or "(all)", e)
-    return list(seen)
+    return [r.full_name for r in await scrape_trending(since_options, language_options)]
+
@@ -0,0 +1,182 @@
+"""Search query planner: shard topic searches into disjoint stars:/created: ranges.
+
+GitHub search returns at most 1000 results per query (10 pages of 100). To cover a whole
+topic, each query is split into shards whose total_count fits under that cap: the stars
+range is bisected first (on a log scale, since stars are heavy-tailed), then the created
+date range once a shard is down to a single star count. Page 1 of a shard doubles as the
+probe that sizes it, so shards that fit cost no extra requests. Pacing against the search
+budget (30 req/min) is left to the client's rate-limit scheduler.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import math
+from dataclasses import dataclass, replace
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, AsyncIterator
+
+from src.services.trend_ingestion.github_client import GitHubClient
+
+logger = logging.getLogger(__name__)
+
+SEARCH_RESULT_CAP = 1000
+SEARCH_PAGE_SIZE = 100
+# No public repo was created before GitHub launched
+GITHUB_EPOCH = date(2008, 1, 1)
+DEFAULT_MAX_CONCURRENT_SHARDS = 4
+
+
+@dataclass(frozen=True)
+class SearchShard:
+    """One disjoint slice of a search: base query plus a stars range and optional created range."""
+
+    base_query: str
+    stars_min: int = 0
+    stars_max: int | None = None  # None: open-ended
+    created_from: date | None = None
+    created_to: date | None = None
+
+    @property
+    def query(self) -> str:
+        if self.stars_max is None:
+            stars = f"stars:>={self.stars_min}"
+        else:
+            stars = f"stars:{self.stars_min}..{self.stars_max}"
+        parts = [self.base_query, stars]
+        if self.created_from is not None and self.created_to is not None:
+            parts.append(f"created:{self.created_from.isoformat()}..{self.created_to.isoformat()}")
+        return " ".join(p for p in parts if p)
+
+    def split(self, top_stars: int | None) -> list[SearchShard] | None:
+        """Two disjoint halves that together cover this shard, or None if it can't be narrowed.
+        top_stars is the highest star count seen in the shard (results are sorted by stars)."""
+        hi = self.stars_max if self.stars_max is not None else top_stars
+        if hi is not None and hi > self.stars_min:
+            mid = int(math.sqrt(max(1, self.stars_min) * hi))
+            mid = min(max(mid, self.stars_min), hi - 1)
+            # Upper half keeps an open end so repos that gain stars mid-run aren't lost
+            return [
+                replace(self, stars_max=mid),
+                replace(self, stars_min=mid + 1),
+            ]
+        start = self.created_from or GITHUB_EPOCH
+        end = self.created_to or datetime.now(timezone.utc).date()
+        if start >= end:
+            return None
+        mid_date = start + (end - start) // 2
+        return [
+            replace(self, created_from=start, created_to=mid_date),
+            replace(self, created_from=mid_date + timedelta(days=1), created_to=end),
+        ]
+
+
+class SearchQueryPlanner:
+    """Covers search queries beyond the 1000-result cap; yields each repository once."""
+
+    def __init__(
+        self,
+        client: GitHubClient,
+        max_concurrent_shards: int = DEFAULT_MAX_CONCURRENT_SHARDS,
+        page_size: int = SEARCH_PAGE_SIZE,
+    ) -> None:
+        self._client = client
+        self._max_concurrent = max(1, max_concurrent_shards)
+        self._page_size = page_size
+        self.shards_searched = 0
+        self.shards_split = 0
+        self.requests = 0
+
+    async def _search(self, shard: SearchShard, page: int) -> dict[str, Any]:
+        self.requests += 1
+        return await self._client.search_repositories(shard.query, page=page, per_page=self._page_size)
+
+    async def _run_shard(
+        self,
+        shard: SearchShard,
+        shards: asyncio.Queue[SearchShard],
+        results: asyncio.Queue[dict[str, Any]],
+    ) -> None:
+        data = await self._search(shard, 1)
+        total = data.get("total_count") or 0
+        items = data.get("items") or []
+        if total > SEARCH_RESULT_CAP:
+            top_stars = items[0].get("stargazers_count") if items else None
+            halves = shard.split(top_stars)
+            if halves:
+                self.shards_split += 1
+                for half in halves:
+                    shards.put_nowait(half)
+                return
+            logger.warning(
+                "Search shard %r has %s results and can't be split further; only the first %s are reachable",
+                shard.query, total, SEARCH_RESULT_CAP,
+            )
+        self.shards_searched += 1
+        for item in items:
+            await results.put(item)
+        last_page = math.ceil(min(total, SEARCH_RESULT_CAP) / self._page_size)
+        for page in range(2, last_page + 1):
+            data = await self._search(shard, page)
+            page_items = data.get("items") or []
+            for item in page_items:
+                await results.put(item)
+            if len(page_items) < self._page_size:
+                break
+
+    async def iter_repositories(
+        self, base_queries: list[str], min_stars: int = 0
+    ) -> AsyncIterator[dict[str, Any]]:
+        """Search every base query in full; yield search items deduped by full_name as they arrive."""
+        shards: asyncio.Queue[SearchShard] = asyncio.Queue()
+        results: asyncio.Queue[dict[str, Any] | None] = asyncio.Queue(
+            maxsize=self._page_size * self._max_concurrent
+        )
+        for q in base_queries:
+            shards.put_nowait(SearchShard(base_query=q, stars_min=min_stars))
+
+        async def worker() -> None:
+            while True:
+                shard = await shards.get()
+                try:
+                    await self._run_shard(shard, shards, results)
+                except Exception as e:
+                    logger.warning("Search shard %r failed: %s", shard.query, e)
+                finally:
+                    shards.task_done()
+
+        async def supervise() -> None:
+            workers = [asyncio.create_task(worker()) for _ in range(self._max_concurrent)]
+            try:
+                await shards.join()
+            finally:
+                for w in workers:
+                    w.cancel()
+                await asyncio.gather(*workers, return_exceptions=True)
+            await results.put(None)
+
+        supervisor = asyncio.create_task(supervise())
+        seen: set[str] = set()
+        try:
+            while True:
+                item = await results.get()
+                if item is None:
+                    break
+                full_name = item.get("full_name")
+                if not full_name or full_name in seen:
+                    continue
+                seen.add(full_name)
+                yield item
+        finally:
+            supervisor.cancel()
+            await asyncio.gather(supervisor, return_exceptions=True)
+            logger.info(
+                "Search planner: %s repos from %s shards (%s split), %s search requests",
+                len(seen), self.shards_searched, self.shards_split, self.requests,
+            )
+
+    async def iter_full_names(self, base_queries: list[str], min_stars: int = 0) -> AsyncIterator[str]:
+        """Deduped stream of repo full names for base_queries."""
+        async for item in self.iter_repositories(base_queries, min_stars):
+            yield item["full_name"]
@@ -1,96 +1,47 @@
-"""Orchestration: topic-based search, fetch metadata, upsert repos, create snapshots."""
+"""Orchestration: topic-based search, fetch metadata, upsert repos, create snapshots.
+
+Discovery sources feed the staged pipeline in pipeline.py; this module owns the DB side
+(stored-state lookup, batch upserts, snapshots) and the discovery entry points.
+"""
 
 from __future__ import annotations
 
 import asyncio
-import base64
 import logging
-from datetime import datetime, timezone, timedelta
+import time
+from collections.abc import AsyncIterator, Awaitable, Callable, Iterable
+from contextlib import aclosing
+from datetime import datetime, time as dt_time, timezone, timedelta
 from typing import Any
 
-from sqlalchemy import select
+from sqlalchemy import Integer, String, column, insert, select, true, update, values
 from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
 
 from src.config import Settings
 from src.models.repository import Repository, TrendSnapshot
+from src.services.trend_ingestion.deltas import SnapshotDeltas, compute_snapshot_deltas
 from src.services.trend_ingestion.github_client import GitHubClient
-from src.services.trend_ingestion.scrapers import scrape_trending_full_names
+from src.services.trend_ingestion.partitions import drop_expired_snapshot_partitions, ensure_snapshot_partitions
+from src.services.trend_ingestion.pipeline import IngestionPipeline, RepoJob, StoredRepoState
+from src.services.trend_ingestion.rollups import latest_rollup_day, mark_days_dirty, prune_rollups, rollup_snapshots
+from src.services.trend_ingestion.runs import IngestionRunStore
+from src.services.trend_ingestion.scrapers import TrendingRepo, scrape_trending
+from src.services.trend_ingestion.search_planner import SearchQueryPlanner
+from src.services.trend_ingestion.stats_queue import DeferredCommitStats
+from src.services.trend_ingestion.transform import commits_7d_from_activity
 
 logger = logging.getLogger(__name__)
 
-README_MAX_CHARS = 15_000
-
 # Topic-based discovery (GitHub search: https://github.com/search?q=agent&type=repositories)
 TOPIC_SEARCH_TERMS: list[str] = ["AI", "agent", "MCP", "crypto"]
 ALLOWED_LANGUAGES: frozenset[str] = frozenset({"Go", "Python", "TypeScript", "JavaScript"})
 MIN_STARS_TOPIC = 10
-
-
-def _parse_iso(s: str | None) -> datetime | None:
-    if not s:
-        return None
-    try:
-        return datetime.fromisoformat(s.replace("Z", "+00:00"))
-    except (ValueError, TypeError):
-        return None
-
-
-def _repo_from_api(data: dict[str, Any]) -> dict[str, Any]:
-    """Build Repository row dict from GitHub API repo response."""
-    owner = (data.get("owner") or {}).get("login") or ""
-    name = data.get("name") or ""
-    full_name = data.get("full_name") or f"{owner}/{name}"
-    pushed_at = _parse_iso(data.get("pushed_at")) or datetime.now(timezone.utc)
-    created_at_gh = _parse_iso(data.get("created_at")) or pushed_at
-    license_obj = data.get("license")
-    license_spdx = license_obj.get("spdx_id") if isinstance(license_obj, dict) else None
-    if license_spdx == "NOASSERTION":
-        license_spdx = None
-    return {
-        "github_id": data.get("id"),
-        "full_name": full_name,
-        "owner": owner,
-        "name": name,
-        "description": (data.get("description") or "")[: 2**31 - 1] if data.get("description") else None,
-        "html_url": data.get("html_url") or "",
-        "homepage_url": (data.get("homepage") or "")[:512] if data.get("homepage") else None,
-        "primary_language": (data.get("language") or "")[:64] if data.get("language") else None,
-        "topics": data.get("topics") if isinstance(data.get("topics"), list) else None,
-        "license_spdx": license_spdx,
-        "has_readme": False,
-        "readme_content": None,
-        "stars_count": data.get("stargazers_count") or 0,
-        "forks_count": data.get("forks_count") or 0,
-        "open_issues_count": data.get("open_issues_count") or 0,
-        "watchers_count": data.get("watchers_count") or 0,
-        "default_branch": (data.get("default_branch") or "main")[:64],
-        "created_at_gh": created_at_gh,
-        "pushed_at_gh": pushed_at,
-        "is_fork": bool(data.get("fork")),
-        "is_archived": bool(data.get("archived")),
-        "is_mirror": bool(data.get("mirror_url")),
-    }
-
-
-def _decode_readme(content_b64: str | None, encoding: str | None) -> str | None:
-    if not content_b64:
-        return None
-    try:
-        raw = base64.b64decode(content_b64)
-        if encoding == "base64":
-            return raw.decode("utf-8", errors="replace")
-        return raw.decode(encoding or "utf-8", errors="replace")
-    except Exception:
-        return None
-
-
-def _repo_cache_fresh(repo: Repository, cache_hours: float) -> bool:
-    """True if repo was updated within cache window."""
-    if cache_hours <= 0:
-        return False
-    cutoff = datetime.now(timezone.utc) - timedelta(hours=cache_hours)
-    return repo.updated_at >= cutoff
+# Columns an upsert never overwrites on an existing repository row
+UPSERT_IMMUTABLE_COLUMNS: frozenset[str] = frozenset({"github_id", "created_at_gh"})
+# Deferred commit stats are only backfilled onto snapshots this recent
+BACKFILL_WINDOW = timedelta(days=1)
 
 
 class TrendIngestionService:
@@ -98,68 +49,188 @@ class TrendIngestionService:
 
     def __init__(self, session: AsyncSession) -> None:
         self.session = session
+        # Repos parked for resolve_deferred_commit_stats by the last ingestion pass
+        self.deferred_commit_stats = 0
 
-    async def _get_cached_repo(self, full_name: str) -> Repository | None:
-        """Return repo if it exists and metadata is still fresh (within cache window)."""
-        result = await self.session.execute(
-            select(Repository).where(Repository.full_name == full_name)
-        )
-        repo = result.scalar_one_or_none()
-        if repo is None:
-            return None
-        if not _repo_cache_fresh(repo, Settings().repo_metadata_cache_hours):
-            return None
-        return repo
-
-    async def _add_snapshot_from_cached_repo(self, repo: Repository) -> None:
-        """Create a new TrendSnapshot from cached repo row (no GitHub API calls)."""
-        prev = await self.session.execute(
-            select(TrendSnapshot)
-            .where(TrendSnapshot.repository_id == repo.id)
+    async def _load_stored_state(self, full_names: list[str]) -> dict[str, StoredRepoState]:
+        """Stored state for tracked repos among full_names, in one query on the full_name index
+        that skips the README and other wide columns, plus the newest commits_7d from the last
+        week's snapshots (LATERAL probe, pruned to the newest partitions)."""
+        if not full_names:
+            return {}
+        since = datetime.now(timezone.utc) - timedelta(days=7)
+        latest_commits = (
+            select(TrendSnapshot.commits_7d)
+            .where(
+                TrendSnapshot.repository_id == Repository.id,
+                TrendSnapshot.snapshot_at >= since,
+                TrendSnapshot.commits_7d.is_not(None),
+            )
             .order_by(TrendSnapshot.snapshot_at.desc())
-            .limit(2)
+            .limit(1)
+            .lateral("latest_commits")
         )
-        prev_snapshots = list(prev.scalars().all())
-        stars_delta_1h: int | None = None
-        stars_delta_24h: int | None = None
-        forks_delta_24h: int | None = None
-        if len(prev_snapshots) >= 1:
-            stars_delta_1h = repo.stars_count - prev_snapshots[0].stars_count
-        if len(prev_snapshots) >= 2:
-            stars_delta_24h = repo.stars_count - prev_snapshots[1].stars_count
-            forks_delta_24h = repo.forks_count - prev_snapshots[1].forks_count
-        snapshot = TrendSnapshot(
-            repository_id=repo.id,
-            stars_count=repo.stars_count,
-            forks_count=repo.forks_count,
-            open_issues_count=repo.open_issues_count,
-            watchers_count=repo.watchers_count,
-            stars_delta_1h=stars_delta_1h,
-            stars_delta_24h=stars_delta_24h,
-            forks_delta_24h=forks_delta_24h,
-            commits_7d=None,
+        result = await self.session.execute(
+            select(
+                Repository.id,
+                Repository.full_name,
+                Repository.stars_count,
+                Repository.forks_count,
+                Repository.open_issues_count,
+                Repository.watchers_count,
+                Repository.pushed_at_gh,
+                Repository.readme_sha,
+                Repository.updated_at,
+                latest_commits.c.commits_7d,
+            )
+            .select_from(Repository)
+            .outerjoin(latest_commits, true())
+            .where(Repository.full_name.in_(full_names))
         )
-        self.session.add(snapshot)
+        return {row.full_name: StoredRepoState(*row) for row in result.all()}
+
+    async def _snapshot_stored_repos(self, stored: list[StoredRepoState]) -> list[str]:
+        """Append snapshots for fresh repos from their stored counters (no GitHub API calls)."""
+        try:
+            await self._insert_snapshots([
+                {
+                    "repository_id": c.id,
+                    "stars_count": c.stars_count,
+                    "forks_count": c.forks_count,
+                    "open_issues_count": c.open_issues_count,
+                    "watchers_count": c.watchers_count,
+                    "commits_7d": c.commits_7d,
+                }
+                for c in stored
+            ])
+            await self.session.commit()
+        except Exception as e:
+            await self.session.rollback()
+            logger.warning("Failed to snapshot %s cached repos: %s", len(stored), e)
+            return []
+        return [c.full_name for c in stored]
 
     async def ingest_from_trending_pages(self) -> int:
-        """Scrape trending, fetch each repo (capped), upsert + snapshot. Returns count of repos processed."""
-        full_names = await scrape_trending_full_names()
-        if not full_names:
+        """Scrape trending, snapshot already-tracked repos from page counts (no API calls), fetch the
+        new ones (capped) and tracked ones whose metadata is past REPO_METADATA_CACHE_HOURS, upsert
+        + snapshot. Returns count of repos processed."""
+        await self._ensure_snapshot_partitions()
+        trending = await scrape_trending()
+        if not trending:
             logger.warning("No repos from trending scrape")
             return 0
+        count, unknown, stale = await self._snapshot_from_trending(trending)
         max_trending = Settings().max_trending_repos
-        if len(full_names) > max_trending:
-            full_names = full_names[:max_trending]
-            logger.info("Capping trending repos to %s", max_trending)
-        return await self._fetch_and_upsert_repos(full_names)
+        if len(unknown) > max_trending:
+            unknown = unknown[:max_trending]
+            logger.info("Capping new trending repos to %s", max_trending)
+        return count + await self._fetch_and_upsert_repos(unknown + stale)
+
+    async def _ensure_snapshot_partitions(self) -> None:
+        """Make sure today's and the next few days' trend_snapshots partitions exist before writing
+        (best effort: on failure new rows land in the default partition)."""
+        await ensure_snapshot_partitions(self.session, Settings().snapshot_partitions_ahead_days)
+
+    async def _snapshot_from_trending(self, trending: list[TrendingRepo]) -> tuple[int, list[str], list[str]]:
+        """Snapshot tracked repos with fresh metadata using star/fork counts scraped from the
+        trending page and update their counters. Returns (repos snapshotted, full names not yet
+        tracked, tracked full names whose metadata is stale and needs an API fetch)."""
+        cache_hours = Settings().repo_metadata_cache_hours
+        cutoff = datetime.now(timezone.utc) - timedelta(hours=cache_hours)
+        by_name = {r.full_name: r for r in trending}
+        result = await self.session.execute(
+            select(
+                Repository.id,
+                Repository.full_name,
+                Repository.forks_count,
+                Repository.open_issues_count,
+                Repository.watchers_count,
+                Repository.updated_at,
+            ).where(Repository.full_name.in_(list(by_name)))
+        )
+        known = {row.full_name: row for row in result.all()}
+        snapshots: list[dict[str, Any]] = []
+        counters: list[dict[str, Any]] = []
+        stale: list[str] = []
+        for full_name, row in known.items():
+            page = by_name[full_name]
+            if cache_hours <= 0 or row.updated_at < cutoff:
+                # Page counts never refresh pushed_at / description / README; the fetch stage does
+                stale.append(full_name)
+                continue
+            if page.stars is None:
+                continue
+            forks = page.forks if page.forks is not None else row.forks_count
+            snapshots.append({
+                "repository_id": row.id,
+                "stars_count": page.stars,
+                "forks_count": forks,
+                "open_issues_count": row.open_issues_count,
+                "watchers_count": row.watchers_count,
+                "commits_7d": None,
+            })
+            # Page counts aren't a full metadata refresh: keep updated_at so the freshness cache still applies
+            counters.append({"id": row.id, "stars_count": page.stars, "forks_count": forks, "updated_at": row.updated_at})
+        unknown = [fn for fn in by_name if fn not in known]
+        if not snapshots:
+            return 0, unknown, stale
+        try:
+            await self.session.execute(update(Repository), counters)
+            await self._insert_snapshots(snapshots)
+            await self.session.commit()
+        except Exception as e:
+            await self.session.rollback()
+            logger.warning("Failed to snapshot %s trending repos from page counts: %s", len(snapshots), e)
+            return 0, unknown, stale
+        logger.info(
+            "Trending: %s tracked repos snapshotted from page counts, %s stale to refetch, %s new",
+            len(snapshots), len(stale), len(unknown),
+        )
+        return len(snapshots), unknown, stale
+
+    async def ingest_from_topic_search(self, topic_terms: list[str] | None = None, run_id: str | None = None) -> int:
+        """Discover repos via topic search. Uses topic_terms if provided, else TOPIC_SEARCH_TERMS. Filters by language (Go, Python, TypeScript, JavaScript), then upsert
+        straight from the search payloads (README / languages / commits only for repos pushed since the stored row).
+        With run_id the run is checkpointed in ingestion_runs; calling again with the same run_id resumes it."""
+        settings = Settings()
+        terms = topic_terms if topic_terms else TOPIC_SEARCH_TERMS
+        store = IngestionRunStore(self.session) if run_id else None
+        resume = False
+        if store is not None:
+            run = await store.start(run_id, "topic_search", {"topic_terms": terms})
+            if run.status == "completed":
+                logger.info("Ingestion run %s already completed; nothing to resume", run_id)
+                return 0
+            resume = run.status == "running"
+        try:
+            if settings.topic_search_max_repos > 0:
+                count = await self._ingest_from_sharded_search(terms, settings.topic_search_max_repos, store, run_id)
+            else:
+                count = await self._ingest_from_topic_pages(terms, store, run_id, resume)
+        except Exception as e:
+            if store is not None:
+                await store.record_failure(run_id, e)
+            raise
+        if store is not None:
+            await store.finish(run_id, "completed")
+        return count
 
-    async def ingest_from_topic_search(self, topic_terms: list[str] | None = None) -> int:
-        """Discover repos via topic search. Uses topic_terms if provided, else TOPIC_SEARCH_TERMS. Filters by language (Go, Python, TypeScript, JavaScript), then upsert."""
+    async def _ingest_from_topic_pages(
+        self, terms: list[str], store: IngestionRunStore | None, run_id: str | None, resume: bool = False
+    ) -> int:
+        """First search page per topic, capped at max_trending_repos. A resumed run skips the
+        search and continues from the persisted plan's pending items."""
+        if store is not None and resume:
+            pending = await store.pending(run_id)
+            logger.info("Resuming ingestion run %s: %s repos left", run_id, len(pending))
+            return await self._run_pipeline(
+                lambda client: (RepoJob(fn, item=item) for fn, item in pending),
+                checkpoint=lambda names: store.mark_done(run_id, names),
+            )
         settings = Settings()
         max_per_topic = settings.max_repos_per_category
         total_cap = settings.max_trending_repos
-        terms = topic_terms if topic_terms else TOPIC_SEARCH_TERMS
-        seen: dict[str, int] = {}  # full_name -> stars_count for dedupe and sort
+        seen: dict[str, dict[str, Any]] = {}  # full_name -> search item, deduped by highest stars
         async with GitHubClient() as client:
             for topic in terms:
                 query = f"topic:{topic} stars:>{MIN_STARS_TOPIC}"
@@ -171,153 +242,278 @@ class TrendIngestionService:
                         if lang not in ALLOWED_LANGUAGES:
                             continue
                         fn = item.get("full_name")
-                        if not fn:
+                        if not fn or item.get("id") is None:
                             continue
                         stars = item.get("stargazers_count") or 0
-                        if fn not in seen or seen[fn] < stars:
-                            seen[fn] = stars
+                        if fn not in seen or (seen[fn].get("stargazers_count") or 0) < stars:
+                            seen[fn] = item
                 except Exception as e:
                     logger.warning("Topic search failed %s: %s", query, e)
         if not seen:
             logger.warning("No repos from topic search (topics=%s, languages=%s)", terms, list(ALLOWED_LANGUAGES))
             return 0
         # Sort by stars desc, take up to total_cap
-        full_names = [fn for fn, _ in sorted(seen.items(), key=lambda x: -x[1])[:total_cap]]
-        logger.info("Topic search: %s unique repos (capped at %s)", len(full_names), total_cap)
-        return await self._fetch_and_upsert_repos(full_names)
+        items = sorted(seen.values(), key=lambda x: -(x.get("stargazers_count") or 0))[:total_cap]
+        logger.info("Topic search: %s unique repos (capped at %s)", len(items), total_cap)
+        if store is None:
+            return await self._run_pipeline(lambda client: (RepoJob(i["full_name"], item=i) for i in items))
+        await store.plan(run_id, [(i["full_name"], i) for i in items])
+        return await self._run_pipeline(
+            lambda client: (RepoJob(i["full_name"], item=i) for i in items),
+            checkpoint=lambda names: store.mark_done(run_id, names),
+        )
 
-    async def _fetch_and_upsert_repos(self, full_names: list[str]) -> int:
-        """Fetch each repo from API (or use cached DB row), upsert Repository and create TrendSnapshot."""
-        settings = Settings()
-        delay = settings.github_request_delay_seconds
-        count = 0
-        async with GitHubClient() as client:
-            for i, full_name in enumerate(full_names):
-                if delay > 0 and i > 0:
-                    await asyncio.sleep(delay)
-                try:
-                    # Use persisted repo when fresh to avoid re-scraping GitHub
-                    cached = await self._get_cached_repo(full_name)
-                    if cached is not None:
-                        await self._add_snapshot_from_cached_repo(cached)
-                        await self.session.commit()
-                        count += 1
-                        logger.debug("Used cached repo: %s", full_name)
-                        continue
-                    parts = full_name.split("/", 1)
-                    if len(parts) != 2:
+    async def _ingest_from_sharded_search(
+        self,
+        terms: list[str],
+        max_repos: int,
+        store: IngestionRunStore | None = None,
+        run_id: str | None = None,
+    ) -> int:
+        """Cover whole topics with the search planner (one query per topic and language, sharded
+        past the 1000-result cap), streaming search payloads into the pipeline as they arrive.
+        The stream has no up-front plan to persist, so a resumed run searches again and skips
+        repos its earlier attempts already wrote."""
+        base_queries = [f"topic:{t} language:{lang}" for t in terms for lang in sorted(ALLOWED_LANGUAGES)]
+        done: set[str] = set()
+        if store is not None:
+            await store.mark_running(run_id)
+            done = await store.done_names(run_id)
+        if done:
+            logger.info("Resuming ingestion run %s: skipping %s repos already written", run_id, len(done))
+
+        async def discover(client: GitHubClient) -> AsyncIterator[RepoJob]:
+            planner = SearchQueryPlanner(client)
+            seen = len(done)
+            async with aclosing(planner.iter_repositories(base_queries, min_stars=MIN_STARS_TOPIC + 1)) as items:
+                async for item in items:
+                    if item.get("language") not in ALLOWED_LANGUAGES or item.get("id") is None:
                         continue
-                    owner, name = parts
-                    repo_data = await client.get_repo(owner, name)
-                    if not repo_data or repo_data.get("id") is None:
+                    if item["full_name"] in done:
                         continue
-                    await self._upsert_repo_and_snapshot(client, repo_data)
-                    await self.session.commit()
-                    count += 1
-                except Exception as e:
-                    logger.warning("Failed to process %s: %s", full_name, e)
+                    yield RepoJob(item["full_name"], item=item)
+                    seen += 1
+                    if seen >= max_repos:
+                        logger.info("Topic search: stopping at TOPIC_SEARCH_MAX_REPOS=%s", max_repos)
+                        return
+
+        if store is None:
+            return await self._run_pipeline(discover)
+        return await self._run_pipeline(discover, checkpoint=lambda names: store.mark_done(run_id, names))
+
+    async def _fetch_and_upsert_repos(self, full_names: list[str]) -> int:
+        """Snapshot fresh repos from the DB, fetch the rest from the API, upsert Repository and
+        create TrendSnapshot rows. Returns number of repos processed."""
+        return await self._run_pipeline(lambda client: (RepoJob(fn) for fn in full_names))
+
+    async def _run_pipeline(
+        self,
+        discover: Callable[[GitHubClient], Iterable[RepoJob] | AsyncIterator[RepoJob]],
+        checkpoint: Callable[[list[str]], Awaitable[None]] | None = None,
+    ) -> int:
+        """Run one staged ingestion pass over the jobs discover(client) yields; park commit
+        activity GitHub is still computing for the deferred queue."""
+        settings = Settings()
+        started = time.monotonic()
+        await self._ensure_snapshot_partitions()
+        async with GitHubClient(max_concurrent=settings.github_ingest_concurrency) as client:
+            pipeline = IngestionPipeline(
+                client,
+                settings,
+                load_state=self._load_stored_state,
+                write_rows=self._write_batch,
+                write_snapshots=self._snapshot_stored_repos,
+                checkpoint=checkpoint,
+            )
+            count = await pipeline.run(discover(client))
+        await self._defer_commit_stats(client.stats_pending)
+        await self._rollup_snapshots()
+        elapsed = time.monotonic() - started
+        discovered = pipeline.stats()["discover"]["processed"]
+        logger.info(
+            "Ingested %s/%s repos in %.1fs (%.2f repos/s)",
+            count, discovered, elapsed, count / elapsed if elapsed > 0 else 0.0,
+        )
         return count
 
-    async def _upsert_repo_and_snapshot(self, client: GitHubClient, repo_data: dict[str, Any]) -> None:
-        """Upsert one repository and append a trend snapshot."""
-        row = _repo_from_api(repo_data)
-        github_id = row["github_id"]
-        full_name = row["full_name"]
-        owner = row["owner"]
-        name = row["name"]
+    async def _rollup_snapshots(self) -> None:
+        """Keep the daily/weekly tiers current after each pass (history and windowed features read
+        them); a failure is retried by the next pass, which re-aggregates from the newest bucket."""
+        try:
+            await rollup_snapshots(self.session)
+        except Exception as e:
+            await self.session.rollback()
+            logger.warning("Snapshot rollup failed: %s", e)
 
-        # Optional: README and languages (cost extra requests)
+    async def _defer_commit_stats(self, full_names: set[str]) -> None:
+        """Park repos whose commit activity GitHub is still computing; never waits on them here."""
+        if not full_names:
+            return
+        queue = DeferredCommitStats(Settings().redis_url)
         try:
-            content_b64, encoding = await client.get_readme(owner, name)
-            if content_b64:
-                decoded = _decode_readme(content_b64, encoding)
-                if decoded:
-                    row["has_readme"] = True
-                    row["readme_content"] = decoded[:README_MAX_CHARS] if len(decoded) > README_MAX_CHARS else decoded
-        except Exception:
-            pass
+            added = await queue.defer(full_names)
+            self.deferred_commit_stats = len(full_names)
+            logger.info("Commit activity pending (202) for %s repos; %s newly deferred", len(full_names), added)
+        except Exception as e:
+            logger.warning("Failed to defer commit stats for %s repos: %s", len(full_names), e)
+        finally:
+            await queue.aclose()
+
+    async def resolve_deferred_commit_stats(self) -> tuple[int, float | None]:
+        """Poll the deferred /stats/commit_activity requests that are due now (never waits for
+        the rest) and backfill commits_7d on each repo's latest snapshot. Returns (snapshots
+        backfilled, seconds until the next queued repo is due or None if the queue is empty)."""
+        queue = DeferredCommitStats(Settings().redis_url)
+        backfilled = 0
+        next_due: float | None = None
         try:
-            langs = await client.get_languages(owner, name)
-            if langs:
-                row["languages_json"] = langs
-        except Exception:
-            pass
-
-        # Upsert repository
-        ins = pg_insert(Repository).values(**row)
-        excl = ins.excluded
-        stmt = ins.on_conflict_do_update(
-            index_elements=[Repository.github_id],
-            set_={
-                Repository.full_name: excl.full_name,
-                Repository.owner: excl.owner,
-                Repository.name: excl.name,
-                Repository.description: excl.description,
-                Repository.html_url: excl.html_url,
-                Repository.homepage_url: excl.homepage_url,
-                Repository.primary_language: excl.primary_language,
-                Repository.languages_json: excl.languages_json,
-                Repository.topics: excl.topics,
-                Repository.license_spdx: excl.license_spdx,
-                Repository.has_readme: excl.has_readme,
-                Repository.readme_content: excl.readme_content,
-                Repository.stars_count: excl.stars_count,
-                Repository.forks_count: excl.forks_count,
-                Repository.open_issues_count: excl.open_issues_count,
-                Repository.watchers_count: excl.watchers_count,
-                Repository.default_branch: excl.default_branch,
-                Repository.pushed_at_gh: excl.pushed_at_gh,
-                Repository.is_fork: excl.is_fork,
-                Repository.is_archived: excl.is_archived,
-                Repository.is_mirror: excl.is_mirror,
-                Repository.updated_at: datetime.now(timezone.utc),
-            },
+            async with GitHubClient() as client:
+                # Repos polled here are either resolved or pushed back to a later slot, so this ends
+                while names := await queue.due():
+                    client.stats_pending.clear()
+                    resolved: dict[str, int | None] = {}
+                    failed: list[str] = []
+
+                    async def poll(full_name: str) -> None:
+                        owner, _, name = full_name.partition("/")
+                        try:
+                            activity = await client.get_commit_activity(owner, name)
+                        except Exception as e:
+                            logger.warning("Deferred commit stats failed for %s: %s", full_name, e)
+                            failed.append(full_name)
+                            return
+                        if full_name not in client.stats_pending:
+                            resolved[full_name] = commits_7d_from_activity(activity)
+
+                    await asyncio.gather(*(poll(fn) for fn in names))
+                    for full_name in [*client.stats_pending, *failed]:
+                        if not await queue.retry_later(full_name):
+                            logger.info("Giving up on commit stats for %s after repeated retries", full_name)
+                    await queue.resolved(resolved)
+                    commits = {fn: c for fn, c in resolved.items() if c is not None}
+                    if commits:
+                        backfilled += await self._backfill_commits_7d(commits)
+            next_due = await queue.next_due_in()
+        except Exception as e:
+            logger.warning("Deferred commit stats poll failed: %s", e)
+        finally:
+            await queue.aclose()
+        logger.info(
+            "Deferred commit stats: %s snapshots backfilled, next due in %s",
+            backfilled, "-" if next_due is None else f"{next_due:.0f}s",
         )
-        await self.session.execute(stmt)
-        await self.session.flush()
-
-        # Get repository_id for snapshot (we need it after upsert)
-        result = await self.session.execute(select(Repository.id).where(Repository.github_id == github_id))
-        repo_id = result.scalar_one()
-
-        # Deltas: compare to previous snapshots
-        prev = await self.session.execute(
-            select(TrendSnapshot)
-            .where(TrendSnapshot.repository_id == repo_id)
-            .order_by(TrendSnapshot.snapshot_at.desc())
-            .limit(2)
+        return backfilled, next_due
+
+    async def _backfill_commits_7d(self, commits: dict[str, int]) -> int:
+        """Set commits_7d on each repo's latest snapshot (if still null) in one UPDATE ... FROM (VALUES).
+        Only recent snapshots qualify, so the lookup prunes to the newest partitions."""
+        recent = datetime.now(timezone.utc) - BACKFILL_WINDOW
+        v = values(
+            column("full_name", String), column("commits_7d", Integer), name="v"
+        ).data(list(commits.items()))
+        latest = aliased(TrendSnapshot)
+        latest_id = (
+            select(latest.id)
+            .where(latest.repository_id == Repository.id, latest.snapshot_at >= recent)
+            .order_by(latest.snapshot_at.desc())
+            .limit(1)
+            .correlate(Repository)
+            .scalar_subquery()
+        )
+        stmt = (
+            update(TrendSnapshot)
+            .where(
+                Repository.full_name == v.c.full_name,
+                TrendSnapshot.repository_id == Repository.id,
+                TrendSnapshot.id == latest_id,
+                TrendSnapshot.snapshot_at >= recent,
+                TrendSnapshot.commits_7d.is_(None),
+            )
+            # Clearing the score queues the repo for the next incremental scoring run
+            .values(commits_7d=v.c.commits_7d, computed_trend_score=None)
+            .returning(TrendSnapshot.snapshot_at)
         )
-        prev_snapshots = list(prev.scalars().all())
-        stars_delta_1h: int | None = None
-        stars_delta_24h: int | None = None
-        forks_delta_24h: int | None = None
-        if len(prev_snapshots) >= 1:
-            stars_delta_1h = row["stars_count"] - prev_snapshots[0].stars_count
-        if len(prev_snapshots) >= 2:
-            stars_delta_24h = row["stars_count"] - prev_snapshots[1].stars_count
-            forks_delta_24h = row["forks_count"] - prev_snapshots[1].forks_count
-
-        # commits_7d from commit_activity (optional)
-        commits_7d: int | None = None
         try:
-            activity = await client.get_commit_activity(owner, name)
-            if activity:
-                commits_7d = sum(w.get("total", 0) or 0 for w in activity[-2:])  # last 2 weeks approx
-        except Exception:
-            pass
-
-        snapshot = TrendSnapshot(
-            repository_id=repo_id,
-            stars_count=row["stars_count"],
-            forks_count=row["forks_count"],
-            open_issues_count=row["open_issues_count"],
-            watchers_count=row["watchers_count"],
-            stars_delta_1h=stars_delta_1h,
-            stars_delta_24h=stars_delta_24h,
-            forks_delta_24h=forks_delta_24h,
-            commits_7d=commits_7d,
+            changed = (await self.session.execute(stmt)).scalars().all()
+            # Their days may already be rolled up; have the next rollup re-aggregate them
+            await mark_days_dirty(self.session, changed)
+            await self.session.commit()
+        except Exception as e:
+            await self.session.rollback()
+            logger.warning("Failed to backfill commits_7d for %s repos: %s", len(commits), e)
+            return 0
+        return len(changed)
+
+    async def _write_batch(self, items: list[tuple[dict[str, Any], int | None]]) -> list[str]:
+        """Upsert a batch of (row, commits_7d) and their snapshots in one transaction.
+        If the batch fails, rows are retried one by one so a bad row only loses itself.
+        Returns full names of the repos written."""
+        if not items:
+            return []
+        try:
+            await self._upsert_repos_and_snapshots(items)
+            await self.session.commit()
+            return [row["full_name"] for row, _ in items]
+        except Exception as e:
+            await self.session.rollback()
+            if len(items) == 1:
+                logger.warning("Failed to write %s: %s", items[0][0].get("full_name"), e)
+                return []
+            logger.warning("Batch write of %s repos failed, retrying individually: %s", len(items), e)
+        written: list[str] = []
+        for item in items:
+            written += await self._write_batch([item])
+        return written
+
+    async def _upsert_repos_and_snapshots(self, items: list[tuple[dict[str, Any], int | None]]) -> None:
+        """Multi-row upsert of repositories (RETURNING id) plus one multi-row snapshot insert."""
+        # ON CONFLICT can't touch the same row twice in one statement: last row per github_id wins
+        by_github_id = {row["github_id"]: (row, commits_7d) for row, commits_7d in items}
+        # Multi-row VALUES need identical keys, so group rows by the columns they carry
+        groups: dict[tuple[str, ...], list[dict[str, Any]]] = {}
+        for row, _ in by_github_id.values():
+            groups.setdefault(tuple(sorted(row)), []).append(row)
+        repo_ids: dict[int, int] = {}
+        now = datetime.now(timezone.utc)
+        for keys, rows in groups.items():
+            ins = pg_insert(Repository).values(rows)
+            stmt = ins.on_conflict_do_update(
+                index_elements=[Repository.github_id],
+                set_={
+                    **{k: ins.excluded[k] for k in keys if k not in UPSERT_IMMUTABLE_COLUMNS},
+                    "updated_at": now,
+                },
+            ).returning(Repository.id, Repository.github_id)
+            result = await self.session.execute(stmt)
+            repo_ids.update({github_id: repo_id for repo_id, github_id in result.all()})
+
+        await self._insert_snapshots([
+            {
+                "repository_id": repo_ids[github_id],
+                "stars_count": row["stars_count"],
+                "forks_count": row["forks_count"],
+                "open_issues_count": row["open_issues_count"],
+                "watchers_count": row["watchers_count"],
+                "commits_7d": commits_7d,
+            }
+            for github_id, (row, commits_7d) in by_github_id.items()
+        ])
+
+    async def _insert_snapshots(self, snapshots: list[dict[str, Any]]) -> None:
+        """Fill in time-anchored deltas for the batch in one query and insert all rows at once."""
+        if not snapshots:
+            return
+        deltas = await compute_snapshot_deltas(
+            self.session,
+            {s["repository_id"]: (s["stars_count"], s["forks_count"]) for s in snapshots},
         )
-        self.session.add(snapshot)
+        for snap in snapshots:
+            d = deltas.get(snap["repository_id"]) or SnapshotDeltas()
+            snap["stars_delta_1h"] = d.stars_delta_1h
+            snap["stars_delta_24h"] = d.stars_delta_24h
+            snap["forks_delta_24h"] = d.forks_delta_24h
+            snap["stars_delta_7d"] = d.stars_delta_7d
+        await self.session.execute(insert(TrendSnapshot).values(snapshots))
 
     async def reset_all_repo_data(self) -> int:
         """Delete all repositories (and cascade to trend_snapshots, repository_categories, generated_content, repo_embeddings).
@@ -329,11 +525,27 @@ class TrendIngestionService:
         await self.session.commit()
         return result.rowcount or 0
 
-    async def cleanup_old_snapshots(self, older_than_days: int = 30) -> int:
-        """Delete trend_snapshots older than given days. Returns deleted count."""
-        from sqlalchemy import delete
-
-        cutoff = datetime.now(timezone.utc) - timedelta(days=older_than_days)
-        result = await self.session.execute(delete(TrendSnapshot).where(TrendSnapshot.snapshot_at < cutoff))
-        await self.session.commit()
-        return result.rowcount or 0
+    async def cleanup_old_snapshots(self, older_than_days: int | None = None) -> int:
+        """Roll raw snapshots up into the daily/weekly tiers, then drop raw partitions (whole days)
+        older than given days (default SNAPSHOT_RAW_RETENTION_DAYS), prune expired rollups and delete
+        finished ingestion runs past INGESTION_RUN_RETENTION_DAYS.
+        Raw days at or after the newest daily bucket are never dropped, so nothing is lost if the
+        rollup is behind. Returns raw partitions dropped."""
+        settings = Settings()
+        days = older_than_days if older_than_days is not None else settings.snapshot_raw_retention_days
+        # Also drains the default partition into daily ones, so its rows expire like any other
+        await self._ensure_snapshot_partitions()
+        await rollup_snapshots(self.session)
+        cutoff = datetime.now(timezone.utc) - timedelta(days=days)
+        rolled_through = await latest_rollup_day(self.session)
+        if rolled_through is not None:
+            cutoff = min(cutoff, datetime.combine(rolled_through, dt_time.min, tzinfo=timezone.utc))
+        dropped = await drop_expired_snapshot_partitions(self.session, cutoff)
+        pruned_daily, pruned_weekly = await prune_rollups(
+            self.session, settings.snapshot_daily_retention_days, settings.snapshot_weekly_retention_days
+        )
+        logger.info("Pruned %s daily and %s weekly rollup rows", pruned_daily, pruned_weekly)
+        runs_before = datetime.now(timezone.utc) - timedelta(days=settings.ingestion_run_retention_days)
+        pruned_runs = await IngestionRunStore(self.session).prune(runs_before)
+        logger.info("Deleted %s finished ingestion runs older than %s days", pruned_runs, settings.ingestion_run_retention_days)
+        return len(dropped)
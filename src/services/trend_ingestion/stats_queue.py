@@ -0,0 +1,81 @@
+"""Deferred queue for GitHub stats endpoints that answer 202 while computing.
+
+/stats/commit_activity returns 202 Accepted for repos GitHub hasn't cached yet and starts
+computing in the background. Instead of waiting (or storing a null commits_7d forever),
+the ingestion pass parks those repos in a Redis sorted set scored by the next attempt
+time; a drain pass after ingestion (and a follow-up Celery task for leftovers) polls
+them with exponential backoff and backfills commits_7d on the repo's latest snapshot.
+"""
+
+from __future__ import annotations
+
+import logging
+import time
+from collections.abc import Iterable
+
+logger = logging.getLogger(__name__)
+
+QUEUE_KEY = "gh:stats:pending"
+ATTEMPTS_KEY = "gh:stats:attempts"
+RETRY_BASE_SECONDS = 15
+RETRY_MAX_SECONDS = 600
+MAX_ATTEMPTS = 6
+
+
+def backoff_seconds(attempt: int) -> float:
+    """Delay before retry number `attempt` (1-based): 15s, 30s, 60s, ... capped at 10 min."""
+    return min(RETRY_MAX_SECONDS, RETRY_BASE_SECONDS * 2 ** max(0, attempt - 1))
+
+
+class DeferredCommitStats:
+    """Redis sorted set of repo full names whose commit activity is still being computed."""
+
+    def __init__(self, redis_url: str) -> None:
+        import redis.asyncio as redis
+
+        self._redis = redis.from_url(redis_url)
+
+    async def defer(self, full_names: Iterable[str]) -> int:
+        """Queue repos for a first retry after the base backoff; already-queued repos keep their slot."""
+        now = time.time()
+        mapping = {fn: now + backoff_seconds(1) for fn in full_names}
+        if not mapping:
+            return 0
+        return await self._redis.zadd(QUEUE_KEY, mapping, nx=True)
+
+    async def due(self, limit: int = 100) -> list[str]:
+        """Repos whose next attempt time has passed, oldest first."""
+        members = await self._redis.zrangebyscore(QUEUE_KEY, "-inf", time.time(), start=0, num=limit)
+        return [m.decode() if isinstance(m, bytes) else m for m in members]
+
+    async def retry_later(self, full_name: str) -> bool:
+        """Push a still-computing repo back with exponential backoff. Returns False when the
+        repo has used up MAX_ATTEMPTS and was dropped from the queue."""
+        attempt = await self._redis.hincrby(ATTEMPTS_KEY, full_name, 1) + 1
+        if attempt > MAX_ATTEMPTS:
+            await self.resolved([full_name])
+            return False
+        await self._redis.zadd(QUEUE_KEY, {full_name: time.time() + backoff_seconds(attempt)})
+        return True
+
+    async def resolved(self, full_names: Iterable[str]) -> None:
+        names = list(full_names)
+        if not names:
+            return
+        async with self._redis.pipeline(transaction=False) as pipe:
+            pipe.zrem(QUEUE_KEY, *names)
+            pipe.hdel(ATTEMPTS_KEY, *names)
+            await pipe.execute()
+
+    async def next_due_in(self) -> float | None:
+        """Seconds until the earliest queued repo is due (0 if overdue), or None if the queue is empty."""
+        head = await self._redis.zrange(QUEUE_KEY, 0, 0, withscores=True)
+        if not head:
+            return None
+        return max(0.0, head[0][1] - time.time())
+
+    async def size(self) -> int:
+        return await self._redis.zcard(QUEUE_KEY)
+
+    async def aclose(self) -> None:
+        await self._redis.aclose()
@@ -0,0 +1,137 @@
+"""Transform step: map GitHub REST / GraphQL payloads to Repository row dicts."""
+
+from __future__ import annotations
+
+import base64
+from datetime import datetime, timezone
+from typing import Any
+
+README_MAX_CHARS = 15_000
+
+
+def parse_iso(s: str | None) -> datetime | None:
+    if not s:
+        return None
+    try:
+        return datetime.fromisoformat(s.replace("Z", "+00:00"))
+    except (ValueError, TypeError):
+        return None
+
+
+def repo_from_api(data: dict[str, Any]) -> dict[str, Any]:
+    """Build Repository row dict from GitHub API repo response."""
+    owner = (data.get("owner") or {}).get("login") or ""
+    name = data.get("name") or ""
+    full_name = data.get("full_name") or f"{owner}/{name}"
+    pushed_at = parse_iso(data.get("pushed_at")) or datetime.now(timezone.utc)
+    created_at_gh = parse_iso(data.get("created_at")) or pushed_at
+    license_obj = data.get("license")
+    license_spdx = license_obj.get("spdx_id") if isinstance(license_obj, dict) else None
+    if license_spdx == "NOASSERTION":
+        license_spdx = None
+    return {
+        "github_id": data.get("id"),
+        "full_name": full_name,
+        "owner": owner,
+        "name": name,
+        "description": (data.get("description") or "")[: 2**31 - 1] if data.get("description") else None,
+        "html_url": data.get("html_url") or "",
+        "homepage_url": (data.get("homepage") or "")[:512] if data.get("homepage") else None,
+        "primary_language": (data.get("language") or "")[:64] if data.get("language") else None,
+        "topics": data.get("topics") if isinstance(data.get("topics"), list) else None,
+        "license_spdx": license_spdx,
+        "has_readme": False,
+        "readme_content": None,
+        "readme_sha": None,
+        "stars_count": data.get("stargazers_count") or 0,
+        "forks_count": data.get("forks_count") or 0,
+        "open_issues_count": data.get("open_issues_count") or 0,
+        "watchers_count": data.get("watchers_count") or 0,
+        "default_branch": (data.get("default_branch") or "main")[:64],
+        "created_at_gh": created_at_gh,
+        "pushed_at_gh": pushed_at,
+        "is_fork": bool(data.get("fork")),
+        "is_archived": bool(data.get("archived")),
+        "is_mirror": bool(data.get("mirror_url")),
+    }
+
+
+def repo_from_graphql(node: dict[str, Any]) -> tuple[dict[str, Any], int | None]:
+    """Build the same Repository row dict as repo_from_api from a GraphQL RepoFields node,
+    with README and languages filled in. Returns (row, commits_7d)."""
+    open_issues = ((node.get("openIssues") or {}).get("totalCount") or 0) + (
+        (node.get("openPullRequests") or {}).get("totalCount") or 0
+    )
+    topics = [
+        (t.get("topic") or {}).get("name")
+        for t in ((node.get("repositoryTopics") or {}).get("nodes") or [])
+    ]
+    branch = node.get("defaultBranchRef") or {}
+    # Shape the node like a REST /repos payload so both paths share one mapping
+    row = repo_from_api({
+        "id": node.get("databaseId"),
+        "full_name": node.get("nameWithOwner"),
+        "owner": node.get("owner"),
+        "name": node.get("name"),
+        "description": node.get("description"),
+        "html_url": node.get("url"),
+        "homepage": node.get("homepageUrl"),
+        "language": (node.get("primaryLanguage") or {}).get("name"),
+        "topics": [t for t in topics if t],
+        "license": {"spdx_id": (node.get("licenseInfo") or {}).get("spdxId")},
+        "stargazers_count": node.get("stargazerCount"),
+        "forks_count": node.get("forkCount"),
+        "open_issues_count": open_issues,
+        # REST watchers_count mirrors stargazers_count
+        "watchers_count": node.get("stargazerCount"),
+        "default_branch": branch.get("name"),
+        "created_at": node.get("createdAt"),
+        "pushed_at": node.get("pushedAt"),
+        "fork": node.get("isFork"),
+        "archived": node.get("isArchived"),
+        "mirror_url": node.get("mirrorUrl"),
+    })
+    readme = next(
+        (node[k] for k in sorted(node) if k.startswith("readme") and node.get(k) and node[k].get("oid")),
+        None,
+    )
+    if readme:
+        # Only the blob sha comes back here; text is fetched separately when the sha changed
+        row["has_readme"] = True
+        row["readme_sha"] = readme["oid"]
+        del row["readme_content"]
+    langs = {
+        (e.get("node") or {}).get("name"): e.get("size") or 0
+        for e in ((node.get("languages") or {}).get("edges") or [])
+    }
+    langs.pop(None, None)
+    if langs:
+        row["languages_json"] = langs
+    history = (branch.get("target") or {}).get("history")
+    commits_7d = history.get("totalCount") if history else None
+    return row, commits_7d
+
+
+def keep_stored_readme(row: dict[str, Any]) -> None:
+    """Drop README columns from an upsert row so the stored README (and its sha) stay as they are."""
+    for key in ("has_readme", "readme_content", "readme_sha"):
+        row.pop(key, None)
+
+
+def commits_7d_from_activity(activity: list[dict[str, Any]] | None) -> int | None:
+    """commits_7d from /stats/commit_activity weekly buckets (last 2 weeks approx)."""
+    if not activity:
+        return None
+    return sum(w.get("total", 0) or 0 for w in activity[-2:])
+
+
+def decode_readme(content_b64: str | None, encoding: str | None) -> str | None:
+    if not content_b64:
+        return None
+    try:
+        raw = base64.b64decode(content_b64)
+        if encoding == "base64":
+            return raw.decode("utf-8", errors="replace")
+        return raw.decode(encoding or "utf-8", errors="replace")
+    except Exception:
+        return None
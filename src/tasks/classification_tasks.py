@@ -1,11 +1,11 @@
 """Classification tasks: assign categories to repos (keyword + embedding + language)."""
 
-import asyncio
 import logging
 
 from src.celery_app import celery
 from src.database import session_scope
 from src.services.classification.service import classify_new_repos
+from src.tasks.event_loop import run_async
 
 logger = logging.getLogger(__name__)
 
@@ -18,7 +18,7 @@ def classify_new_repos_task(self) -> None:
             async with session_scope() as session:
                 return await classify_new_repos(session, limit=500)
 
-        n = asyncio.run(_run())
+        n = run_async(_run())
         logger.info("classify_new_repos: assigned %s repo-category pairs", n)
     except Exception as exc:
         logger.exception("classify_new_repos failed: %s", exc)
@@ -1,11 +1,11 @@
 """Content generation tasks: generate LLM content for top repos."""
 
-import asyncio
 import logging
 
 from src.celery_app import celery
 from src.database import session_scope
 from src.services.content_generation.service import generate_content_for_top_repos
+from src.tasks.event_loop import run_async
 
 logger = logging.getLogger(__name__)
 
@@ -18,7 +18,7 @@ def generate_content_for_top_repos_task(self) -> None:
             async with session_scope() as session:
                 return await generate_content_for_top_repos(session)
 
-        n = asyncio.run(_run())
+        n = run_async(_run())
         logger.info("generate_content_for_top_repos: created %s content rows", n)
     except Exception as exc:
         logger.exception("generate_content_for_top_repos failed: %s", exc)
@@ -0,0 +1,64 @@
+"""Long-lived event loop per worker process (per thread for threaded pools).
+
+asyncio.run() creates and closes a loop per task, which throws away every pooled HTTP and
+DB connection bound to it. Tasks call run_async() instead, so connections opened by one
+task are reused by the next one on the same worker (the shared httpx clients and
+session_scope's engine are both kept per loop).
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import threading
+from collections.abc import Coroutine
+from typing import Any, TypeVar
+
+from celery.signals import worker_process_shutdown
+
+from src.database import dispose_loop_engine
+from src.services.trend_ingestion.http_pool import aclose_http_clients
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+_local = threading.local()
+
+
+def _worker_loop() -> asyncio.AbstractEventLoop:
+    loop: asyncio.AbstractEventLoop | None = getattr(_local, "loop", None)
+    # A forked child inherits the parent's loop object; never reuse it across processes
+    if loop is None or loop.is_closed() or getattr(_local, "pid", None) != os.getpid():
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        _local.loop = loop
+        _local.pid = os.getpid()
+    return loop
+
+
+def run_async(coro: Coroutine[Any, Any, T]) -> T:
+    """Run coro to completion on this worker's persistent event loop."""
+    return _worker_loop().run_until_complete(coro)
+
+
+def close_worker_loop() -> None:
+    """Close pooled HTTP clients, the DB engine and the loop (worker shutdown)."""
+    loop: asyncio.AbstractEventLoop | None = getattr(_local, "loop", None)
+    if loop is None or loop.is_closed() or getattr(_local, "pid", None) != os.getpid():
+        return
+    try:
+        loop.run_until_complete(aclose_http_clients())
+        loop.run_until_complete(dispose_loop_engine())
+        loop.run_until_complete(loop.shutdown_asyncgens())
+    except Exception as e:
+        logger.debug("Error closing worker event loop: %s", e)
+    finally:
+        loop.close()
+        _local.loop = None
+
+
+@worker_process_shutdown.connect
+def _close_on_shutdown(**kwargs: Any) -> None:
+    close_worker_loop()
@@ -1,25 +1,44 @@
 """Ingestion tasks: topic search (AI, agent, MCP, crypto), cleanup snapshots."""
 
-import asyncio
 import logging
 
 from src.celery_app import celery
 from src.database import session_scope
 from src.services.trend_ingestion.service import TrendIngestionService
+from src.services.trend_ingestion.stats_queue import RETRY_BASE_SECONDS
+from src.tasks.event_loop import run_async
+from src.tasks.scoring_tasks import score_and_filter_all_task
 
 logger = logging.getLogger(__name__)
 
 
-async def _run_topic_search_ingestion(topic_terms: list[str] | None = None) -> int:
+async def _run_topic_search_ingestion(
+    topic_terms: list[str] | None = None, run_id: str | None = None
+) -> tuple[int, int]:
     async with session_scope() as session:
         svc = TrendIngestionService(session)
-        return await svc.ingest_from_topic_search(topic_terms=topic_terms)
+        n = await svc.ingest_from_topic_search(topic_terms=topic_terms, run_id=run_id)
+        return n, svc.deferred_commit_stats
 
 
-async def _run_trending_ingestion() -> int:
+async def _run_trending_ingestion() -> tuple[int, int]:
     async with session_scope() as session:
         svc = TrendIngestionService(session)
-        return await svc.ingest_from_trending_pages()
+        n = await svc.ingest_from_trending_pages()
+        return n, svc.deferred_commit_stats
+
+
+async def _run_resolve_commit_stats() -> tuple[int, float | None]:
+    async with session_scope() as session:
+        svc = TrendIngestionService(session)
+        return await svc.resolve_deferred_commit_stats()
+
+
+def _schedule_commit_stats_followup(countdown: float | None) -> None:
+    """Leave commit activity still being computed to a follow-up task, run when the next
+    queued repo is due (None: nothing queued), instead of holding up the chain."""
+    if countdown is not None:
+        resolve_deferred_commit_stats.apply_async(countdown=countdown)
 
 
 async def _run_search_ingestion() -> int:
@@ -29,18 +48,22 @@ async def _run_search_ingestion() -> int:
         return await svc.ingest_from_topic_search()
 
 
-async def _run_cleanup(days: int = 30) -> int:
+async def _run_cleanup(days: int | None = None) -> int:
     async with session_scope() as session:
         svc = TrendIngestionService(session)
         return await svc.cleanup_old_snapshots(older_than_days=days)
 
 
 @celery.task(bind=True, acks_late=True, max_retries=3)
-def ingest_topic_search_repos(self, topic_terms: list[str] | None = None) -> None:
-    """Discover repos via topic search. Optional topic_terms restrict to those GitHub topics; else default terms (AI, agent, MCP, crypto)."""
+def ingest_topic_search_repos(self, topic_terms: list[str] | None = None, run_id: str | None = None) -> None:
+    """Discover repos via topic search. Optional topic_terms restrict to those GitHub topics; else default terms (AI, agent, MCP, crypto).
+    Checkpointed under run_id (default: this task's id, which retries keep), so a retry resumes where the last attempt stopped."""
     try:
-        n = asyncio.run(_run_topic_search_ingestion(topic_terms=topic_terms))
+        n, pending = run_async(
+            _run_topic_search_ingestion(topic_terms=topic_terms, run_id=run_id or self.request.id)
+        )
         logger.info("ingest_topic_search_repos: processed %s repos", n)
+        _schedule_commit_stats_followup(RETRY_BASE_SECONDS if pending else None)
     except Exception as exc:
         logger.exception("ingest_topic_search_repos failed: %s", exc)
         raise self.retry(exc=exc, countdown=120 * (2 ** self.request.retries))
@@ -50,8 +73,9 @@ def ingest_topic_search_repos(self, topic_terms: list[str] | None = None) -> Non
 def ingest_trending_repos(self) -> None:
     """Scrape github.com/trending and upsert repos + snapshots. (Legacy; pipeline uses topic search.)"""
     try:
-        n = asyncio.run(_run_trending_ingestion())
+        n, pending = run_async(_run_trending_ingestion())
         logger.info("ingest_trending_repos: processed %s repos", n)
+        _schedule_commit_stats_followup(RETRY_BASE_SECONDS if pending else None)
     except Exception as exc:
         logger.exception("ingest_trending_repos failed: %s", exc)
         raise self.retry(exc=exc, countdown=120 * (2 ** self.request.retries))
@@ -61,7 +85,7 @@ def ingest_trending_repos(self) -> None:
 def ingest_search_api_repos(self) -> None:
     """Run GitHub Search API queries per category and upsert. (Legacy; pipeline uses topic search.)"""
     try:
-        n = asyncio.run(_run_search_ingestion())
+        n = run_async(_run_search_ingestion())
         logger.info("ingest_search_api_repos: processed %s repos", n)
     except Exception as exc:
         logger.exception("ingest_search_api_repos failed: %s", exc)
@@ -70,10 +94,26 @@ def ingest_search_api_repos(self) -> None:
 
 @celery.task(bind=True, acks_late=True, max_retries=1)
 def cleanup_old_snapshots(self) -> None:
-    """Delete trend_snapshots older than 30 days."""
+    """Roll snapshots up into daily/weekly tiers, then drop raw partitions past retention."""
     try:
-        n = asyncio.run(_run_cleanup(30))
-        logger.info("cleanup_old_snapshots: deleted %s rows", n)
+        n = run_async(_run_cleanup())
+        logger.info("cleanup_old_snapshots: dropped %s daily partitions", n)
     except Exception as exc:
         logger.exception("cleanup_old_snapshots failed: %s", exc)
         raise self.retry(exc=exc, countdown=300)
+
+
+@celery.task(bind=True, acks_late=True, max_retries=3)
+def resolve_deferred_commit_stats(self) -> None:
+    """Backfill commits_7d for repos whose commit activity GitHub was still computing (202).
+    Polls only what is due, re-scores backfilled repos and reschedules itself for the rest."""
+    try:
+        n, next_due = run_async(_run_resolve_commit_stats())
+        logger.info("resolve_deferred_commit_stats: backfilled %s snapshots", n)
+        if n:
+            # The backfill cleared their scores; the incremental run picks exactly those repos up
+            score_and_filter_all_task.apply_async(kwargs={"full": False})
+        _schedule_commit_stats_followup(next_due)
+    except Exception as exc:
+        logger.exception("resolve_deferred_commit_stats failed: %s", exc)
+        raise self.retry(exc=exc, countdown=120 * (2 ** self.request.retries))
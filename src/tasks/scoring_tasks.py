@@ -1,25 +1,41 @@
 """Scoring tasks: compute trend scores and quality_passed."""
 
-import asyncio
 import logging
 
 from src.celery_app import celery
 from src.database import session_scope
-from src.services.repo_scoring.service import score_and_filter_all
+from src.services.repo_scoring.service import score_categories, score_repos
+from src.tasks.event_loop import run_async
 
 logger = logging.getLogger(__name__)
 
 
 @celery.task(bind=True, acks_late=True, max_retries=2)
-def score_and_filter_all_task(self) -> None:
-    """Compute trend scores and apply quality filters for all repos."""
+def score_and_filter_all_task(self, full: bool | None = None) -> None:
+    """Compute trend scores and apply quality filters: a full re-normalization every
+    SCORING_FULL_REFRESH_HOURS, otherwise only repos with new snapshots (full forces either)."""
     try:
         async def _run() -> int:
             async with session_scope() as session:
-                return await score_and_filter_all(session)
+                return await score_repos(session, full=full)
 
-        n = asyncio.run(_run())
-        logger.info("score_and_filter_all: updated %s repos", n)
+        n = run_async(_run())
+        logger.info("score_repos: updated %s repos", n)
     except Exception as exc:
         logger.exception("score_and_filter_all failed: %s", exc)
         raise self.retry(exc=exc, countdown=60)
+
+
+@celery.task(bind=True, acks_late=True, max_retries=2)
+def score_categories_task(self) -> None:
+    """Compute category-relative trend scores (repository_categories.category_trend_score)."""
+    try:
+        async def _run() -> int:
+            async with session_scope() as session:
+                return await score_categories(session)
+
+        n = run_async(_run())
+        logger.info("score_categories: updated %s repo-category pairs", n)
+    except Exception as exc:
+        logger.exception("score_categories failed: %s", exc)
+        raise self.retry(exc=exc, countdown=60)
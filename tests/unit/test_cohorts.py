@@ -0,0 +1,43 @@
+"""Cohort scoring normalizes each cohort on its own, aligned with the cohort's row indexes."""
+
+from __future__ import annotations
+
+import numpy as np
+
+from src.services.repo_scoring import cohorts
+from src.services.repo_scoring.scorer import FEATURE_WEIGHTS, score_features
+
+
+def _fixture() -> tuple[dict[str, np.ndarray], dict[cohorts.CohortKey, np.ndarray]]:
+    rng = np.random.default_rng(7)
+    n = 5_000
+    features = {name: rng.gamma(1.5, 20.0, n) for name in FEATURE_WEIGHTS}
+    features["commits_7d"][:200] = 0.0
+    members = {
+        (1, None): np.arange(0, 3_000),
+        (2, None): np.arange(2_500, 5_000),  # overlaps category 1
+        (3, "Python"): np.arange(0, 200),  # commits_7d has no spread here
+        (3, "Go"): np.array([4_999]),  # single repo: every feature has zero span
+        (4, None): rng.choice(n, 700, replace=False),
+    }
+    return features, members
+
+
+def test_each_cohort_is_normalized_on_its_own() -> None:
+    features, members = _fixture()
+    scores = cohorts.score_cohorts(features, members)
+    assert scores.keys() == members.keys()
+    for key, idx in members.items():
+        expected = score_features({name: col[idx] for name, col in features.items()})
+        np.testing.assert_array_equal(scores[key], expected)
+        assert scores[key].min() >= 0.0 and scores[key].max() <= 100.0
+    np.testing.assert_array_equal(scores[(3, "Go")], [0.0])
+
+
+def test_overlapping_cohorts_rank_a_repo_against_different_peers() -> None:
+    features, members = _fixture()
+    scores = cohorts.score_cohorts(features, members)
+    repo = 2_700  # in categories 1 and 2
+    in_1 = scores[(1, None)][np.searchsorted(members[(1, None)], repo)]
+    in_2 = scores[(2, None)][np.searchsorted(members[(2, None)], repo)]
+    assert in_1 != in_2
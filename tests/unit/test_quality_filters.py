@@ -0,0 +1,139 @@
+"""quality_filter_clause (SQL) must agree with passes_quality_filters (Python) row for row.
+
+The clause is evaluated on SQLite with btrim/char_length registered to Postgres semantics
+(strip the given characters / count characters), so the test covers the predicate logic and
+the _WHITESPACE set that stands in for str.strip().
+"""
+
+from __future__ import annotations
+
+import itertools
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+from typing import Any
+
+import pytest
+import sqlalchemy as sa
+
+from src.models.repository import Repository
+from src.services.repo_scoring import quality_filters as qf
+
+NOW = datetime(2026, 10, 17, 12, tzinfo=timezone.utc)
+COLUMNS = (
+    "id", "has_readme", "license_spdx", "pushed_at_gh", "is_fork", "is_archived", "is_mirror",
+    "description", "stars_count",
+)
+
+PASSING: dict[str, Any] = {
+    "has_readme": True,
+    "license_spdx": "MIT",
+    "pushed_at_gh": NOW - timedelta(days=1),
+    "is_fork": False,
+    "is_archived": False,
+    "is_mirror": False,
+    "description": "A perfectly good description",
+    "stars_count": 100,
+}
+
+DESCRIPTIONS = [
+    None,
+    "",
+    " " * 30,
+    "\t\n\r\x0b\x0c" * 6,
+    "  　" * 10,  # Unicode whitespace only
+    "x" * (qf.MIN_DESCRIPTION_LEN - 1),
+    "x" * qf.MIN_DESCRIPTION_LEN,
+    "  " + "x" * (qf.MIN_DESCRIPTION_LEN - 1) + "\n",
+    "　" + "x" * qf.MIN_DESCRIPTION_LEN + " ",
+    "é" * qf.MIN_DESCRIPTION_LEN,
+    "a b " * 5,
+]
+LICENSES = [None, "", "   ", "\t", "MIT", " Apache-2.0 "]
+PUSHED = [
+    NOW - timedelta(days=qf.ACTIVE_DAYS, seconds=-1),
+    NOW - timedelta(days=qf.ACTIVE_DAYS),
+    NOW - timedelta(days=qf.ACTIVE_DAYS, seconds=1),
+    NOW - timedelta(days=400),
+]
+STARS = [0, qf.MIN_STARS - 1, qf.MIN_STARS, 1000]
+FLAGS = [(False, False, False), (True, False, False), (False, True, False), (False, False, True)]
+
+
+# The filter columns with Repository's types, so values are stored the way the clause binds them
+REPOS = sa.Table(
+    "repositories",
+    sa.MetaData(),
+    *(
+        sa.Column(c.name, sa.Integer if c.name == "id" else c.type, primary_key=c.name == "id")
+        for c in Repository.__table__.columns
+        if c.name in COLUMNS
+    ),
+)
+
+
+@pytest.fixture
+def engine() -> sa.Engine:
+    eng = sa.create_engine("sqlite://")
+
+    @sa.event.listens_for(eng, "connect")
+    def _postgres_functions(conn: Any, _: Any) -> None:
+        conn.create_function("btrim", 2, lambda s, chars: None if s is None else s.strip(chars))
+        conn.create_function("char_length", 1, lambda s: None if s is None else len(s))
+
+    REPOS.metadata.create_all(eng)
+    return eng
+
+
+def _compare(engine: sa.Engine, rows: list[dict[str, Any]]) -> list[dict[str, Any]]:
+    """Rows where the SQL predicate and the Python function disagree."""
+    rows = [{"id": i, **row} for i, row in enumerate(rows)]
+    with engine.begin() as conn:
+        conn.execute(REPOS.insert(), rows)
+        in_sql = dict(conn.execute(sa.select(Repository.id, qf.quality_filter_clause(NOW))).all())
+    return [
+        row for row in rows
+        if bool(in_sql[row["id"]]) != qf.passes_quality_filters(SimpleNamespace(**row), NOW)
+    ]
+
+
+def test_passing_row_passes_both(engine: sa.Engine) -> None:
+    assert qf.passes_quality_filters(SimpleNamespace(**PASSING), NOW)
+    assert _compare(engine, [PASSING]) == []
+
+
+@pytest.mark.parametrize("field,values", [
+    ("description", DESCRIPTIONS),
+    ("license_spdx", LICENSES),
+    ("pushed_at_gh", PUSHED),
+    ("stars_count", STARS),
+    ("has_readme", [True, False]),
+])
+def test_single_field_edge_cases(engine: sa.Engine, field: str, values: list[Any]) -> None:
+    assert _compare(engine, [{**PASSING, field: v} for v in values]) == []
+
+
+@pytest.mark.parametrize("is_fork,is_archived,is_mirror", FLAGS[1:])
+def test_fork_archived_mirror_fail(engine: sa.Engine, is_fork: bool, is_archived: bool, is_mirror: bool) -> None:
+    row = {**PASSING, "is_fork": is_fork, "is_archived": is_archived, "is_mirror": is_mirror}
+    assert not qf.passes_quality_filters(SimpleNamespace(**row), NOW)
+    assert _compare(engine, [row]) == []
+
+
+def test_cross_product(engine: sa.Engine) -> None:
+    rows = [
+        {
+            **PASSING,
+            "description": desc,
+            "license_spdx": lic,
+            "pushed_at_gh": pushed,
+            "stars_count": stars,
+            "is_fork": flags[0],
+            "is_archived": flags[1],
+            "is_mirror": flags[2],
+            "has_readme": readme,
+        }
+        for desc, lic, pushed, stars, flags, readme in itertools.product(
+            DESCRIPTIONS, LICENSES, PUSHED[::2], STARS[1:3], FLAGS, [True, False]
+        )
+    ]
+    assert _compare(engine, rows) == []
@@ -0,0 +1,98 @@
+"""The vectorized scorer must reproduce the per-row implementation it replaced.
+
+_reference_scores is the pre-NumPy compute_trend_scores (lists, one repo at a time), with `now`
+passed in instead of read from the clock so both sides see the same recency.
+"""
+
+from __future__ import annotations
+
+import math
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import pytest
+
+from src.services.repo_scoring import scorer
+
+NOW = datetime(2026, 10, 17, 12, tzinfo=timezone.utc)
+
+
+def _reference_normalize(values: list[float], min_val: float | None = None, max_val: float | None = None) -> list[float]:
+    if not values:
+        return []
+    lo = min_val if min_val is not None else min(values)
+    hi = max_val if max_val is not None else max(values)
+    span = hi - lo
+    if span <= 0:
+        return [0.0] * len(values)
+    return [max(0, min(100, (v - lo) / span * 100)) for v in values]
+
+
+def _reference_recency(pushed_at: datetime, now: datetime) -> float:
+    if pushed_at.tzinfo is None:
+        pushed_at = pushed_at.replace(tzinfo=timezone.utc)
+    days = (now - pushed_at).total_seconds() / 86400
+    return max(0.0, scorer.RECENCY_DECAY_DAYS - days)
+
+
+def _reference_scores(rows: list[tuple], now: datetime = NOW) -> list[float]:
+    columns = [[(r[i] or 0) for r in rows] for i in range(1, 5)]
+    columns.append([_reference_recency(r[5], now) for r in rows])
+    normalized = [_reference_normalize(col) for col in columns]
+    weights = list(scorer.FEATURE_WEIGHTS.values())
+    return [sum(n[i] * w for n, w in zip(normalized, weights)) for i in range(len(rows))]
+
+
+def _vectorized_scores(rows: list[tuple], now: datetime = NOW) -> list[float]:
+    _, stars, forks, commits, issues, pushed = zip(*rows)
+    return scorer.trend_score_array(
+        stars, forks, commits, issues, [scorer._epoch(p) for p in pushed], now_epoch=now.timestamp()
+    ).tolist()
+
+
+FIXTURE = [
+    # (repo_id, stars_delta_24h, forks_delta_24h, commits_7d, issue_events_7d, pushed_at_gh)
+    (1, 120, 14, 33, 9, NOW - timedelta(hours=2)),
+    (2, 0, 0, 0, 0, NOW - timedelta(days=30)),
+    (3, None, 3, None, 2, NOW - timedelta(days=3, hours=7)),
+    (4, 45, None, 12, None, (NOW - timedelta(days=9, hours=23)).replace(tzinfo=None)),
+    (5, -8, 1, 5, 40, NOW - timedelta(days=10)),
+    (6, 7, 2, None, 0, NOW + timedelta(minutes=5)),  # clock skew: pushed "after" now
+    (7, 3000, 250, 400, 75, NOW - timedelta(days=1)),
+]
+
+
+def test_fixture_matches_reference() -> None:
+    assert _vectorized_scores(FIXTURE) == pytest.approx(_reference_scores(FIXTURE), abs=1e-9)
+
+
+def test_nan_is_treated_as_missing() -> None:
+    with_nan = [(r[0], *(math.nan if v is None else v for v in r[1:5]), r[5]) for r in FIXTURE]
+    assert _vectorized_scores(with_nan) == pytest.approx(_reference_scores(FIXTURE), abs=1e-9)
+
+
+@pytest.mark.parametrize("rows", [
+    [FIXTURE[0]],  # single repo: every span is zero
+    [(i, 5, 5, 5, 5, NOW - timedelta(days=20)) for i in range(4)],  # identical rows, recency all 0
+    [(i, None, None, None, None, NOW - timedelta(days=i)) for i in range(4)],  # only recency varies
+    [(1, None, 0, math.nan, None, NOW - timedelta(days=1)), (2, 0, None, None, math.nan, NOW - timedelta(days=1))],
+])
+def test_zero_spread_columns(rows: list[tuple]) -> None:
+    reference_rows = [(r[0], *(None if isinstance(v, float) and math.isnan(v) else v for v in r[1:5]), r[5]) for r in rows]
+    assert _vectorized_scores(rows) == pytest.approx(_reference_scores(reference_rows), abs=1e-9)
+
+
+def test_normalize_array_matches_normalize_with_bounds() -> None:
+    values = [-5.0, 0.0, 3.5, 10.0, 250.0]
+    for lo, hi in [(None, None), (0.0, 10.0), (-10.0, 1000.0), (4.0, 4.0), (10.0, 0.0)]:
+        assert scorer._normalize_array(np.array(values), lo, hi).tolist() == pytest.approx(
+            _reference_normalize(values, lo, hi)
+        )
+
+
+def test_compute_trend_scores_keeps_row_api() -> None:
+    # Pushes well outside the recency window, so the clock compute_trend_scores reads doesn't matter
+    rows = [(r[0], *r[1:5], NOW - timedelta(days=60)) for r in FIXTURE]
+    expected = [(r[0], round(s, 4)) for r, s in zip(rows, _reference_scores(rows))]
+    assert scorer.compute_trend_scores(rows) == expected
+    assert scorer.compute_trend_scores([]) == []
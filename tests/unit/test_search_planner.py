@@ -0,0 +1,118 @@
+"""SearchQueryPlanner against an in-memory search index that enforces the 1000-result cap."""
+
+from __future__ import annotations
+
+from datetime import date, timedelta
+from typing import Any
+
+from src.services.trend_ingestion.search_planner import (
+    GITHUB_EPOCH,
+    SEARCH_RESULT_CAP,
+    SearchQueryPlanner,
+    SearchShard,
+)
+
+
+def _repo(name: str, stars: int, created: date, topics: tuple[str, ...] = ("ml",)) -> dict[str, Any]:
+    return {"full_name": name, "stargazers_count": stars, "created": created, "topics": topics}
+
+
+class FakeSearchClient:
+    """Answers search_repositories for `topic:X stars:... created:...` queries, stars descending,
+    only the first SEARCH_RESULT_CAP results reachable (like GitHub)."""
+
+    def __init__(self, repos: list[dict[str, Any]], extra: list[dict[str, Any]] | None = None) -> None:
+        self.repos = repos
+        self.extra = extra or []  # returned on every page regardless of the query
+        self.queries: list[str] = []
+
+    def _matches(self, repo: dict[str, Any], query: str) -> bool:
+        for term in query.split():
+            key, _, value = term.partition(":")
+            if key == "topic" and value not in repo["topics"]:
+                return False
+            if key == "stars":
+                if value.startswith(">="):
+                    if repo["stargazers_count"] < int(value[2:]):
+                        return False
+                else:
+                    lo, hi = value.split("..")
+                    if not int(lo) <= repo["stargazers_count"] <= int(hi):
+                        return False
+            if key == "created":
+                lo, hi = value.split("..")
+                if not date.fromisoformat(lo) <= repo["created"] <= date.fromisoformat(hi):
+                    return False
+        return True
+
+    async def search_repositories(self, query: str, page: int = 1, per_page: int = 100) -> dict[str, Any]:
+        self.queries.append(query)
+        hits = sorted((r for r in self.repos if self._matches(r, query)), key=lambda r: -r["stargazers_count"])
+        reachable = hits[:SEARCH_RESULT_CAP]
+        items = reachable[(page - 1) * per_page : page * per_page]
+        return {"total_count": len(hits), "items": items + self.extra}
+
+
+async def _collect(planner: SearchQueryPlanner, queries: list[str], min_stars: int = 0) -> list[str]:
+    return [item["full_name"] async for item in planner.iter_repositories(queries, min_stars)]
+
+
+async def test_query_at_the_cap_is_not_split() -> None:
+    repos = [_repo(f"o/r{i}", i, date(2020, 1, 1)) for i in range(SEARCH_RESULT_CAP)]
+    client = FakeSearchClient(repos)
+    planner = SearchQueryPlanner(client)  # type: ignore[arg-type]
+    names = await _collect(planner, ["topic:ml"])
+    assert sorted(names) == sorted(r["full_name"] for r in repos)
+    assert planner.shards_split == 0
+    assert len(client.queries) == SEARCH_RESULT_CAP // 100
+
+
+async def test_query_over_the_cap_splits_by_stars() -> None:
+    repos = [_repo(f"o/r{i}", i, date(2020, 1, 1)) for i in range(SEARCH_RESULT_CAP + 1)]
+    client = FakeSearchClient(repos)
+    planner = SearchQueryPlanner(client)  # type: ignore[arg-type]
+    names = await _collect(planner, ["topic:ml"])
+    assert sorted(names) == sorted(r["full_name"] for r in repos)
+    assert planner.shards_split == 1
+    assert not any("created:" in q for q in client.queries)
+
+
+def test_split_halves_are_disjoint_and_cover_the_range() -> None:
+    lower, upper = SearchShard("topic:ml", stars_min=10).split(top_stars=5000)
+    assert lower.stars_min == 10 and upper.stars_max is None
+    assert lower.stars_max is not None and upper.stars_min == lower.stars_max + 1
+    assert 10 <= lower.stars_max < 5000
+
+
+def test_single_star_bucket_splits_by_created_date() -> None:
+    shard = SearchShard("topic:ml", stars_min=50, stars_max=50)
+    first, second = shard.split(top_stars=50)
+    assert (first.stars_min, first.stars_max) == (second.stars_min, second.stars_max) == (50, 50)
+    assert first.created_from == GITHUB_EPOCH
+    assert second.created_from == first.created_to + timedelta(days=1)
+    one_day = SearchShard("topic:ml", 50, 50, date(2024, 5, 1), date(2024, 5, 1))
+    assert one_day.split(top_stars=50) is None
+
+
+async def test_single_star_bucket_over_the_cap_falls_through_to_dates() -> None:
+    repos = [_repo(f"o/r{i}", 50, date(2020, 1, 1) + timedelta(days=i % 900)) for i in range(1500)]
+    client = FakeSearchClient(repos)
+    planner = SearchQueryPlanner(client)  # type: ignore[arg-type]
+    names = await _collect(planner, ["topic:ml"])
+    assert sorted(names) == sorted(r["full_name"] for r in repos)
+    # Bisection narrows stars to the open-ended top bucket (>=50), which can only split by date
+    assert any("stars:>=50 created:" in q for q in client.queries)
+
+
+async def test_repos_are_deduped_across_overlapping_shards() -> None:
+    repos = [_repo(f"o/ml{i}", i * 3, date(2021, 1, 1)) for i in range(800)]
+    repos += [_repo(f"o/both{i}", i * 7, date(2022, 1, 1), ("ml", "llm")) for i in range(400)]
+    repos += [_repo(f"o/llm{i}", i, date(2023, 1, 1), ("llm",)) for i in range(300)]
+    # A repo that gained stars mid-run shows up in several star shards
+    mover = _repo("o/mover", 999, date(2024, 1, 1), ("ml",))
+    client = FakeSearchClient(repos, extra=[mover])
+    planner = SearchQueryPlanner(client)  # type: ignore[arg-type]
+    names = await _collect(planner, ["topic:ml", "topic:llm"])
+    assert len(names) == len(set(names))
+    assert set(names) == {r["full_name"] for r in repos} | {"o/mover"}
+    assert planner.shards_split >= 1
@@ -0,0 +1,70 @@
+"""Quantile-rank normalization against stored sketches: robust to outliers, distinct at the top."""
+
+from __future__ import annotations
+
+import numpy as np
+
+from src.services.repo_scoring.scorer import FEATURE_WEIGHTS, W_STARS_24H, _rank_normalize, score_features
+from src.services.repo_scoring.sketches import SKETCH_POINTS, build_sketch, sketch_quantiles
+
+
+def _features(n: int = 1_000) -> dict[str, np.ndarray]:
+    rng = np.random.default_rng(3)
+    features = {name: rng.pareto(1.2, n) * 10 for name in FEATURE_WEIGHTS}
+    features["recency"] = np.clip(features["recency"], 0, 10)
+    return features
+
+
+def _full_run(features: dict[str, np.ndarray]) -> np.ndarray:
+    """Scores as a full run computes them: sketch the cohort, then rank against it."""
+    return score_features(features, sketch_quantiles({name: build_sketch(col) for name, col in features.items()}))
+
+
+def test_single_outlier_does_not_move_other_scores() -> None:
+    features = _features()
+    before = _full_run(features)
+    stars = features["stars_delta_24h"]
+    spiked = int(np.argmax(stars))
+    features["stars_delta_24h"] = stars.copy()
+    features["stars_delta_24h"][spiked] = stars[spiked] * 1_000
+    after = _full_run(features)
+
+    # Only the top sketch point moved, so only repos between p99 and p100 can change
+    p99 = np.quantile(stars, (SKETCH_POINTS - 2) / (SKETCH_POINTS - 1))
+    below_p99 = stars <= p99
+    np.testing.assert_array_equal(after[below_p99], before[below_p99])
+    assert below_p99.sum() >= 0.99 * len(stars)
+    assert after[spiked] == before[spiked]  # already ranked at the top
+
+    # Min-max normalization, by contrast, squashes everyone else's star contribution
+    minmax_before, minmax_after = score_features({**features, "stars_delta_24h": stars}), score_features(features)
+    assert np.mean(minmax_after[below_p99] < minmax_before[below_p99]) > 0.9
+
+
+def test_top_percentile_keeps_its_spread() -> None:
+    features = _features()
+    stars_only = {name: (col if name == "stars_delta_24h" else np.zeros_like(col)) for name, col in features.items()}
+    scores = _full_run(stars_only)
+    top = np.sort(scores)[-len(scores) // 100:]
+    assert len(np.unique(top)) == len(top)
+    assert scores.max() == W_STARS_24H * 100
+    assert scores.min() == 0.0
+
+
+def test_rank_interpolates_between_sketch_points_and_ties_rank_lowest() -> None:
+    quantiles = [0.0] * 51 + list(np.linspace(1.0, 50.0, 50))  # half the cohort at 0
+    ranks = _rank_normalize(np.array([-1.0, 0.0, 0.5, 1.0, 50.0, 51.0]), quantiles)
+    np.testing.assert_allclose(ranks, [0.0, 0.0, 25.5, 51.0, 100.0, 100.0])
+    assert _rank_normalize(np.array([3.0, 7.0]), [3.0] * SKETCH_POINTS).tolist() == [0.0, 0.0]
+
+
+def test_incremental_batch_ranks_against_stored_sketch() -> None:
+    features = _features()
+    quantiles = sketch_quantiles({name: build_sketch(col) for name, col in features.items()})
+    stored = quantiles["stars_delta_24h"]
+    batch = {name: np.array([quantiles[name][0]] * 3) for name in FEATURE_WEIGHTS}
+    batch["stars_delta_24h"] = np.array([stored[-1] * 10, stored[50], stored[0]])
+    scores = score_features(batch, quantiles)
+    assert scores[0] == W_STARS_24H * 100
+    assert scores[1] == W_STARS_24H * 50
+    assert scores[2] == 0.0